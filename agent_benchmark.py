@@ -0,0 +1,174 @@
+"""
+AGENT DÖNGÜSÜ BENCHMARK
+=======================
+Canlı API olmadan agent döngüsünün LLM dışındaki maliyetini ölçer.
+
+Model yerine SenaryoModeli (önceden yazılmış tool_use dizileri) kullanılır;
+her soru için iterasyon, araç çalıştırma, eski sonuç özetleme ve istek
+serileştirme süreleri raporlanır. Veri verilmezse sentetik_veri ile sabit
+tohumlu bir küp oluşturulur, sonuçlar makineden makineye karşılaştırılabilir.
+
+Kullanım:
+    python agent_benchmark.py                       # sentetik küp, 3 tekrar
+    python agent_benchmark.py --olcek 10            # 10× sentetik küp
+    python agent_benchmark.py --veri ./data --tekrar 5
+    python agent_benchmark.py --sicak --json sonuc.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from agent_tools import KupVeri, SenaryoModeli, agent_akisi
+from sentetik_veri import sentetik_kup
+
+
+# =============================================================================
+# SENARYOLAR
+# =============================================================================
+
+def senaryolar(kup: KupVeri) -> list:
+    """[(ad, soru, SenaryoModeli senaryosu), ...] - kodlar yüklenen küpten seçilir"""
+    df = kup.stok_satis
+    kategori = str(kup.urun_master['kategori_kod'].iloc[0]) if len(kup.urun_master) else '14'
+    urun = str(df.groupby('urun_kod')['satis'].sum().idxmax()) if len(df) else '1000000'
+    magaza = str(df['magaza_kod'].iloc[0]) if len(df) else '1000'
+
+    return [
+        ('genel', "Genel duruma bak, sorunları tespit et.", [
+            [{'metin': "Genel duruma bakıyorum."}, {'arac': 'genel_ozet'}],
+            [{'arac': 'fazla_stok_analiz', 'girdi': {'limit': 50}}, {'arac': 'sevkiyat_plani', 'girdi': {'limit': 50}}],
+            [{'arac': 'bolge_karsilastir'}],
+        ]),
+        ('kategori', f"{kategori} kategorisini detaylı analiz et.", [
+            [{'arac': 'kategori_analiz', 'girdi': {'kategori_kod': kategori}}],
+            [{'arac': 'urun_analiz', 'girdi': {'urun_kod': urun}}, {'arac': 'magaza_analiz', 'girdi': {'magaza_kod': magaza}}],
+            [{'arac': 'ihtiyac_hesapla', 'girdi': {'limit': 50}}],
+        ]),
+        ('sevkiyat', "Sevkiyat hesapla ve cover senaryolarını karşılaştır.", [
+            [{'metin': "Sevkiyatı hesaplıyorum."}, {'arac': 'sevkiyat_hesapla', 'girdi': {'kategori_kod': int(kategori)}}],
+            [{'arac': 'senaryo_karsilastir', 'girdi': {'forward_cover_listesi': [4, 7, 10], 'kategori_kod': int(kategori)}}],
+        ]),
+        ('rapor', "Trading, kapasite, cover ve sipariş raporlarını özetle.", [
+            [{'arac': 'trading_analiz'}, {'arac': 'kapasite_analiz'}],
+            [{'arac': 'cover_diagram_analiz'}, {'arac': 'siparis_takip_analiz'}, {'arac': 'cover_analiz'}],
+        ]),
+        ('tekrar', "Genel özeti iki kez iste (araç önbelleği).", [
+            [{'arac': 'genel_ozet'}],
+            [{'arac': 'genel_ozet'}, {'arac': 'bolge_karsilastir'}],
+        ]),
+    ]
+
+
+# =============================================================================
+# ÖLÇÜM
+# =============================================================================
+
+def soru_olc(kup: KupVeri, soru: str, senaryo: list) -> dict:
+    """Tek soruyu SenaryoModeli ile baştan sona çalıştır, süreleri topla"""
+    model = SenaryoModeli(senaryo)
+    olcum = {'toplam': 0.0, 'iterasyon': [], 'araclar': [], 'girdi_token': 0}
+
+    bas = time.perf_counter()
+    for olay in agent_akisi("", kup, soru, model=model):
+        if olay['tur'] == 'iterasyon':
+            olcum['iterasyon'].append({k: olay[k] for k in ('sure', 'model_sure', 'arac_sure', 'ozet_sure')})
+        elif olay['tur'] == 'arac_bitti':
+            olcum['araclar'].append({'arac': olay['arac'], 'sure': olay['sure'], 'karakter': olay['karakter']})
+        elif olay['tur'] == 'bitti':
+            olcum['girdi_token'] = olay['token']['girdi']
+    olcum['toplam'] = time.perf_counter() - bas
+    olcum['serilestirme'] = model.istatistik['serilestirme_sure']
+    olcum['istek_karakter'] = model.istatistik['istek_karakter']
+    return olcum
+
+
+def benchmark(kup: KupVeri, tekrar: int = 3, sicak: bool = False, ayrinti: bool = False) -> dict:
+    """Her senaryoyu 'tekrar' kez ölç; sicak=False ise her turdan önce araç önbelleği temizlenir"""
+    sonuclar = {}
+    for ad, soru, senaryo in senaryolar(kup):
+        olcumler = []
+        for _ in range(tekrar):
+            if not sicak:
+                kup.arac_onbellegi.temizle()
+            log = contextlib.nullcontext() if ayrinti else contextlib.redirect_stdout(io.StringIO())
+            with log:
+                olcumler.append(soru_olc(kup, soru, senaryo))
+        sonuclar[ad] = olcumler
+    return sonuclar
+
+
+def _medyan(olcumler: list, al) -> float:
+    return statistics.median(al(o) for o in olcumler)
+
+
+def rapor_yazdir(sonuclar: dict, yukleme_sure: float):
+    print(f"\n⏱️ Küp yükleme: {yukleme_sure:.2f}s")
+    print(f"\n{'Senaryo':<10} {'İter':>4} {'Toplam':>9} {'Araç':>9} {'Özet':>9} {'Serileş.':>9} {'İstek KB':>9} {'Girdi tok':>10}")
+    print("-" * 75)
+    for ad, olcumler in sonuclar.items():
+        print(f"{ad:<10} {len(olcumler[0]['iterasyon']):>4} "
+              f"{_medyan(olcumler, lambda o: o['toplam']) * 1000:>7.1f}ms "
+              f"{_medyan(olcumler, lambda o: sum(i['arac_sure'] for i in o['iterasyon'])) * 1000:>7.1f}ms "
+              f"{_medyan(olcumler, lambda o: sum(i['ozet_sure'] for i in o['iterasyon'])) * 1000:>7.1f}ms "
+              f"{_medyan(olcumler, lambda o: o['serilestirme']) * 1000:>7.1f}ms "
+              f"{olcumler[0]['istek_karakter'] / 1024:>9.1f} "
+              f"{olcumler[0]['girdi_token']:>10,}")
+
+    print(f"\n{'Araç':<22} {'Çağrı':>6} {'Medyan':>9} {'En uzun':>9} {'Karakter':>9}")
+    print("-" * 60)
+    araclar = {}
+    for olcumler in sonuclar.values():
+        for olcum in olcumler:
+            for arac in olcum['araclar']:
+                araclar.setdefault(arac['arac'], []).append(arac)
+    for ad, kayitlar in sorted(araclar.items(), key=lambda x: -max(k['sure'] for k in x[1])):
+        sureler = [k['sure'] for k in kayitlar]
+        print(f"{ad:<22} {len(kayitlar):>6} {statistics.median(sureler) * 1000:>7.1f}ms "
+              f"{max(sureler) * 1000:>7.1f}ms {max(k['karakter'] for k in kayitlar):>9,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent döngüsü çevrimdışı benchmark (SenaryoModeli)")
+    parser.add_argument('--veri', help="Veri klasörü (verilmezse sentetik küp üretilir)")
+    parser.add_argument('--olcek', type=float, default=1.0, help="Sentetik küp ölçeği (1, 10, 100...)")
+    parser.add_argument('--carpiklik', type=float, default=1.0, help="Sentetik küp çarpıklığı (Zipf üssü)")
+    parser.add_argument('--tekrar', type=int, default=3, help="Senaryo başına tekrar (medyan raporlanır)")
+    parser.add_argument('--sicak', action='store_true', help="Araç önbelleğini tekrarlar arasında temizleme")
+    parser.add_argument('--ayrinti', action='store_true', help="Agent loglarını göster")
+    parser.add_argument('--json', help="Ham ölçümleri bu dosyaya yaz")
+    args = parser.parse_args()
+
+    gecici = tempfile.mkdtemp(prefix='agent_benchmark_')
+    try:
+        veri = args.veri
+        if not veri:
+            veri = os.path.join(gecici, 'veri')
+            with contextlib.redirect_stdout(io.StringIO()):
+                sentetik_kup(veri, olcek=args.olcek, carpiklik=args.carpiklik)
+        bas = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            # Ayrı snapshot klasörü: önceki çalışmaların snapshot'ı ölçümü etkilemesin
+            kup = KupVeri(veri, snapshot_klasoru=os.path.join(gecici, 'snapshot'))
+        yukleme_sure = time.perf_counter() - bas
+        print(f"📦 Küp: {len(kup.stok_satis):,} satır ({veri})")
+
+        sonuclar = benchmark(kup, args.tekrar, args.sicak, args.ayrinti)
+        rapor_yazdir(sonuclar, yukleme_sure)
+
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump({'yukleme_sure': yukleme_sure, 'sonuclar': sonuclar}, f, ensure_ascii=False, indent=2)
+            print(f"\n💾 Ham ölçümler: {args.json}")
+    finally:
+        shutil.rmtree(gecici, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
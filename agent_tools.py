@@ -11,128 +11,749 @@ import anthropic
 import os
 import glob
 import sys
+import hashlib
+import shutil
+import tempfile
+import csv
+import re
+import threading
+import asyncio
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from types import SimpleNamespace
+
+# Sevkiyat dağıtımı sevkiyat_motoru'ndaki ortak çekirdekle yapılır
+from sevkiyat_motoru import SevkiyatMotoru, depo_tablosu_hazirla, ihtiyac_birlestir, depo_stok_dagit
+SEVKIYAT_MOTORU_AVAILABLE = True
+
+# =============================================================================
+# SNAPSHOT (Columnar disk önbelleği)
+# =============================================================================
+
+# _hazirla çıktısının şekli değiştiğinde artır - eski snapshot'lar geçersiz olur
+SNAPSHOT_SURUMU = 3
+
+try:
+    import pyarrow  # noqa: F401 - parquet yazma/okuma için
+    SNAPSHOT_AVAILABLE = True
+except ImportError:
+    SNAPSHOT_AVAILABLE = False
+    print("⚠️ pyarrow yüklü değil, veri snapshot'ı devre dışı (pip install pyarrow)")
+
+
+class KupSnapshot:
+    """
+    KupVeri'nin hazırlanmış (post-_hazirla) tablolarını parquet olarak saklar.
+
+    Her grup (küp CSV'leri, trading, SC, cover, kapasite, sipariş) kendi
+    kaynak dosyalarının içerik hash'i ile anahtarlanır. Dosyalar değişmediyse
+    bir sonraki KupVeri(...) hiç parse etmeden parquet'ten yüklenir.
+    """
+
+    HASH_BELLEGI = "hash_bellegi.json"
+    GRUP_BASINA_SAKLA = 3  # Grup başına tutulacak en yeni snapshot sayısı
+
+    def __init__(self, klasor: str = None):
+        """
+        klasor: Snapshot kök klasörü. None ise SANAL_PLANNER_SNAPSHOT ortam
+                değişkeni, o da yoksa sistem temp klasörü kullanılır.
+        """
+        if klasor is None:
+            klasor = os.environ.get(
+                "SANAL_PLANNER_SNAPSHOT",
+                os.path.join(tempfile.gettempdir(), "sanal_planner_snapshot")
+            )
+        self.klasor = klasor
+        self.aktif = SNAPSHOT_AVAILABLE
+        self._hash_bellegi = None
+        self._hash_bellegi_degisti = False
+
+    # -------------------------------------------------------------------------
+    # Anahtar hesaplama
+    # -------------------------------------------------------------------------
+
+    def _hash_bellegini_yukle(self) -> dict:
+        if self._hash_bellegi is None:
+            try:
+                with open(os.path.join(self.klasor, self.HASH_BELLEGI), encoding='utf-8') as f:
+                    self._hash_bellegi = json.load(f)
+            except (OSError, ValueError):
+                self._hash_bellegi = {}
+        return self._hash_bellegi
+
+    def hash_bellegini_kaydet(self):
+        """Yeni hash hesaplandıysa belleği yaz (geçici dosya + os.replace - klasör oturumlar arası ortak)"""
+        if not self._hash_bellegi_degisti:
+            return
+        gecici = None
+        try:
+            os.makedirs(self.klasor, exist_ok=True)
+            fd, gecici = tempfile.mkstemp(prefix=self.HASH_BELLEGI, suffix=".tmp", dir=self.klasor)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self._hash_bellegi or {}, f)
+            os.replace(gecici, os.path.join(self.klasor, self.HASH_BELLEGI))
+            self._hash_bellegi_degisti = False
+        except OSError:
+            if gecici and os.path.exists(gecici):
+                os.remove(gecici)
+
+    def dosya_hash(self, yol: str) -> str:
+        """
+        Dosya içerik hash'i - boyut ve mtime değişmediyse bellekteki değer kullanılır.
+        Bellek diske yazılmaz, toplu hesaplama sonunda hash_bellegini_kaydet çağrılmalı.
+        """
+        st = os.stat(yol)
+        bellek = self._hash_bellegini_yukle()
+        tam_yol = os.path.abspath(yol)
+        kayit = bellek.get(tam_yol)
+        if kayit and kayit[0] == st.st_size and kayit[1] == st.st_mtime_ns:
+            return kayit[2]
+
+        h = hashlib.sha1()
+        with open(yol, 'rb') as f:
+            for parca in iter(lambda: f.read(1 << 20), b''):
+                h.update(parca)
+        ozet = h.hexdigest()
+        bellek[tam_yol] = [st.st_size, st.st_mtime_ns, ozet]
+        self._hash_bellegi_degisti = True
+        return ozet
+
+    def anahtar(self, dosyalar: List[str]) -> str:
+        """Dosya listesinin (ad + içerik hash) birleşik anahtarı"""
+        try:
+            parcalar = sorted((os.path.basename(f), self.dosya_hash(f)) for f in dosyalar)
+        finally:
+            self.hash_bellegini_kaydet()
+        icerik = json.dumps([SNAPSHOT_SURUMU, parcalar])
+        return hashlib.sha1(icerik.encode('utf-8')).hexdigest()[:20]
+
+    # -------------------------------------------------------------------------
+    # Okuma / yazma
+    # -------------------------------------------------------------------------
+
+    def _grup_klasoru(self, grup: str, anahtar: str) -> str:
+        return os.path.join(self.klasor, f"{grup}_{anahtar}")
+
+    def yukle(self, grup: str, anahtar: str) -> Optional[Dict[str, object]]:
+        """
+        Snapshot varsa {ad: DataFrame} (veya sayfa sözlükleri için
+        {ad: {sayfa: DataFrame}}) döner, yoksa None.
+        """
+        if not self.aktif:
+            return None
+        hedef = self._grup_klasoru(grup, anahtar)
+        manifest_yol = os.path.join(hedef, "manifest.json")
+        if not os.path.exists(manifest_yol):
+            return None
+
+        try:
+            with open(manifest_yol, encoding='utf-8') as f:
+                manifest = json.load(f)
+
+            tablolar = {}
+            for ad, bilgi in manifest['tablolar'].items():
+                if bilgi['tur'] == 'sozluk':
+                    tablolar[ad] = {
+                        sayfa: self._tablo_oku(hedef, alt)
+                        for sayfa, alt in bilgi['sayfalar'].items()
+                    }
+                else:
+                    tablolar[ad] = self._tablo_oku(hedef, bilgi)
+            os.utime(hedef)  # En son kullanılan snapshot'ları korumak için
+            return tablolar
+        except Exception as e:
+            print(f"   ⚠️ Snapshot okunamadı ({grup}): {e}")
+            return None
+
+    def _tablo_oku(self, hedef: str, bilgi: dict) -> pd.DataFrame:
+        df = pd.read_parquet(os.path.join(hedef, bilgi['dosya']))
+        df.columns = bilgi['kolonlar']
+        return df
+
+    def kaydet(self, grup: str, anahtar: str, tablolar: Dict[str, object]):
+        """Grubu parquet olarak yaz (önce geçici klasöre, sonra atomik rename)"""
+        if not self.aktif:
+            return
+        hedef = self._grup_klasoru(grup, anahtar)
+        if os.path.exists(hedef):
+            return
+
+        gecici = hedef + f".tmp{os.getpid()}"
+        try:
+            os.makedirs(gecici, exist_ok=True)
+            manifest = {'grup': grup, 'surum': SNAPSHOT_SURUMU, 'tablolar': {}}
+            for ad, tablo in tablolar.items():
+                if isinstance(tablo, dict):
+                    sayfalar = {}
+                    for i, (sayfa, df) in enumerate(tablo.items()):
+                        sayfalar[sayfa] = self._tablo_yaz(gecici, f"{ad}__{i}", df)
+                    manifest['tablolar'][ad] = {'tur': 'sozluk', 'sayfalar': sayfalar}
+                else:
+                    manifest['tablolar'][ad] = self._tablo_yaz(gecici, ad, tablo)
+
+            with open(os.path.join(gecici, "manifest.json"), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False)
+            os.replace(gecici, hedef)
+            self._eskileri_temizle(grup)
+        except Exception as e:
+            print(f"   ⚠️ Snapshot yazılamadı ({grup}): {e}")
+            shutil.rmtree(gecici, ignore_errors=True)
+
+    def _tablo_yaz(self, klasor: str, ad: str, df: pd.DataFrame) -> dict:
+        # Parquet sadece string kolon adı kabul eder - orijinal adlar manifest'te saklanır
+        kolonlar = [c if isinstance(c, (str, int, float)) else str(c) for c in df.columns]
+        yazilacak = df.copy(deep=False)
+        yazilacak.columns = [str(c) for c in df.columns]
+        dosya = f"{ad}.parquet"
+        try:
+            yazilacak.to_parquet(os.path.join(klasor, dosya))
+        except (ValueError, TypeError) as e:
+            # Excel'den gelen karışık tipli (sayı + metin) kolonlar parquet'e yazılamaz.
+            # Metne çevirmek sıcak yüklemede tipleri değiştirir - grup snapshot'lanmaz, kaynak okunur
+            raise ValueError(f"{ad} karışık tipli kolon içeriyor, snapshot atlandı ({e})") from e
+        return {'tur': 'tablo', 'dosya': dosya, 'kolonlar': kolonlar}
+
+    def _eskileri_temizle(self, grup: str):
+        """Grup başına sadece en yeni GRUP_BASINA_SAKLA snapshot'ı tut"""
+        onek = f"{grup}_"
+        adaylar = [
+            os.path.join(self.klasor, d) for d in os.listdir(self.klasor)
+            if d.startswith(onek) and '.tmp' not in d
+            and os.path.isdir(os.path.join(self.klasor, d))
+        ]
+        adaylar.sort(key=os.path.getmtime, reverse=True)
+        for eski in adaylar[self.GRUP_BASINA_SAKLA:]:
+            shutil.rmtree(eski, ignore_errors=True)
+
+
+# =============================================================================
+# ŞEMA (Kaynak dosya kolon tipleri)
+# =============================================================================
+
+# Kolon türleri:
+#   'anahtar'  → int32 kod (taşarsa int64), boş/bozuk değer 0
+#   'adet'     → int32; boş veya kesirli değer varsa float32 (NaN korunur)
+#   'olcu'     → float32 (tutar, oran, cover)
+#   'kategori' → pandas category (az sayıda tekrarlı metin)
+# Şemada olmayan kolonlar okunduğu gibi bırakılır.
+KAYNAK_SEMALARI = {
+    'stok_satis': {
+        'magaza_kod': 'anahtar', 'urun_kod': 'anahtar',
+        'stok': 'adet', 'yol': 'adet', 'satis': 'adet',
+        'ciro': 'olcu', 'smm': 'olcu',
+        # _hazirla ile eklenen kolonlar
+        'kar': 'olcu', 'kar_marji': 'olcu', 'haftalik_satis': 'adet', 'cover': 'olcu',
+        'min_deger': 'olcu', 'max_deger': 'olcu', 'forward_cover': 'olcu',
+    },
+    'urun_master': {
+        'urun_kod': 'anahtar', 'kategori_kod': 'anahtar', 'umg': 'anahtar', 'mg': 'anahtar',
+        'marka_kod': 'kategori', 'nitelik': 'kategori', 'durum': 'kategori',
+    },
+    'magaza_master': {
+        'magaza_kod': 'anahtar', 'depo_kod': 'anahtar',
+        'il': 'kategori', 'bolge': 'kategori', 'tip': 'kategori',
+    },
+    'depo_stok': {
+        'depo_kod': 'anahtar', 'urun_kod': 'anahtar', 'stok': 'adet',
+    },
+    'kpi': {
+        'mg_id': 'anahtar', 'mg': 'anahtar',
+        'min_deger': 'olcu', 'max_deger': 'olcu', 'forward_cover': 'olcu',
+    },
+}
+
+# stok_durum değerleri - sabit kategori sırası
+STOK_DURUMLARI = ['NORMAL', 'SEVK_GEREKLI', 'FAZLA_STOK', 'YAVAS']
+
+_INT32 = np.iinfo(np.int32)
+
+
+def _kolonlari_temizle(df: pd.DataFrame) -> pd.DataFrame:
+    """BOM karakterini temizle ve kolon isimlerini normalize et"""
+    df.columns = df.columns.astype(str).str.replace('\ufeff', '').str.lower().str.strip()
+    return df
+
+
+def _anahtar_serisi(seri: pd.Series) -> pd.Series:
+    """Kod kolonu → int32 (int32'ye sığmıyorsa int64)"""
+    sayi = pd.to_numeric(seri, errors='coerce').fillna(0)
+    if len(sayi) and (sayi.max() > _INT32.max or sayi.min() < _INT32.min):
+        return sayi.astype('int64')
+    return sayi.astype('int32')
+
+
+def _adet_serisi(seri: pd.Series) -> pd.Series:
+    """Miktar kolonu → tam sayı ise int32, değilse float32"""
+    sayi = pd.to_numeric(seri, errors='coerce')
+    if sayi.dtype.kind in 'iub':
+        if len(sayi) == 0 or (sayi.max() <= _INT32.max and sayi.min() >= _INT32.min):
+            return sayi.astype('int32')
+        return sayi
+    degerler = sayi.to_numpy(dtype='float64', na_value=np.nan)
+    if (not np.isnan(degerler).any() and np.array_equal(degerler, np.trunc(degerler))
+            and (len(degerler) == 0 or (degerler.max() <= _INT32.max and degerler.min() >= _INT32.min))):
+        return sayi.astype('int32')
+    return sayi.astype('float32')
+
+
+def _sayi_serisi(seri: pd.Series) -> pd.Series:
+    """
+    Rapor hücrelerini float'a çevir (Türkçe biçim): '%' ve boşluklar atılır,
+    ondalık virgül noktaya döner; boş / okunamayan hücre 0 olur.
+    """
+    if pd.api.types.is_numeric_dtype(seri) and not pd.api.types.is_bool_dtype(seri):
+        return seri.astype('float64').fillna(0.0)
+    metin = (seri.astype(str)
+             .str.replace('%', '', regex=False)
+             .str.replace(',', '.', regex=False)
+             .str.replace(' ', '', regex=False)
+             .str.strip())
+    return pd.to_numeric(metin, errors='coerce').fillna(0.0)
+
+
+def _yuzde_serisi(seri: pd.Series) -> pd.Series:
+    """Yüzde serisi - ondalık gelen değerler (-2 < v < 2) 100 ile çarpılır"""
+    deger = _sayi_serisi(seri)
+    ondalik = (deger > -2) & (deger < 2) & (deger != 0)
+    return deger.mask(ondalik, deger * 100)
+
+
+def _metin_serisi(seri: pd.Series) -> pd.Series:
+    """Hiyerarşi hücresi: NaN / 'nan' -> '', diğerleri kırpılmış metin"""
+    metin = seri.astype(str)
+    return metin.str.strip().mask(seri.isna() | (metin.str.lower() == 'nan'), '')
+
+
+def _semaya_uygula(df: pd.DataFrame, kaynak: str) -> pd.DataFrame:
+    """Kaynağın şemasındaki kolonları kompakt tiplere çevir (yerinde)"""
+    sema = KAYNAK_SEMALARI.get(kaynak, {})
+    for kol, tur in sema.items():
+        if kol not in df.columns:
+            continue
+        seri = df[kol]
+        try:
+            if tur == 'anahtar':
+                if seri.dtype != np.int32:
+                    df[kol] = _anahtar_serisi(seri)
+            elif tur == 'adet':
+                if seri.dtype not in (np.int32, np.float32):
+                    df[kol] = _adet_serisi(seri)
+            elif tur == 'olcu':
+                if seri.dtype != np.float32:
+                    df[kol] = pd.to_numeric(seri, errors='coerce').astype('float32')
+            elif tur == 'kategori':
+                if not isinstance(seri.dtype, pd.CategoricalDtype):
+                    df[kol] = seri.astype('category')
+        except (ValueError, TypeError) as e:
+            print(f"   ⚠️ Şema uygulanamadı ({kaynak}.{kol}): {e}")
+    return df
+
+
+def _bellek_mb(df: pd.DataFrame) -> float:
+    """DataFrame'in gerçek bellek kullanımı (object string'ler dahil), MB"""
+    if df is None or len(df.columns) == 0:
+        return 0.0
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
+
+
+def _indeks_degeri(seri: pd.Series, deger):
+    """Filtre değerini kolon tipine çevirir (konum indeksi anahtarı); çevrilemezse None"""
+    if isinstance(deger, str):
+        deger = deger.strip()
+    # Kategorik kolonda anahtar tipi kategorilerin tipidir (ör. int marka kodları)
+    dtype = seri.dtype.categories.dtype if isinstance(seri.dtype, pd.CategoricalDtype) else seri.dtype
+    try:
+        if pd.api.types.is_integer_dtype(dtype):
+            sayi = float(deger)
+            return int(sayi) if sayi.is_integer() else None
+        if pd.api.types.is_float_dtype(dtype):
+            return float(deger)
+        return str(deger)
+    except (ValueError, TypeError):
+        return None
+
+
+def _konum_indeksi_kur(seri: pd.Series) -> dict:
+    """Kolon değeri -> artan satır konumları (np.ndarray) sözlüğü; NaN değerler dahil edilmez"""
+    kodlar, degerler = pd.factorize(seri)
+    sira = np.argsort(kodlar, kind='stable')
+    sinirlar = np.searchsorted(kodlar[sira], np.arange(len(degerler) + 1))
+    return {deger: sira[sinirlar[i]:sinirlar[i + 1]] for i, deger in enumerate(degerler)}
+
+
+# =============================================================================
+# CSV OKUYUCU (Paralel parça okuma)
+# =============================================================================
+
+CSV_ORNEK_BOYUTU = 64 * 1024  # Ayraç/encoding tespiti için okunan başlık örneği (byte)
+
+
+def _csv_bicimi(yol: str) -> tuple:
+    """Dosya başından küçük bir örnek okuyup (encoding, ayraç) tespit et"""
+    with open(yol, 'rb') as f:
+        ham = f.read(CSV_ORNEK_BOYUTU)
+
+    # Yarım kalan son satırı (ve yarım UTF-8 karakterini) at
+    if len(ham) == CSV_ORNEK_BOYUTU and b'\n' in ham:
+        ham = ham[:ham.rfind(b'\n')]
+
+    try:
+        metin = ham.decode('utf-8')
+        encoding = 'utf-8'
+    except UnicodeDecodeError:
+        metin = ham.decode('latin-1')
+        encoding = 'latin-1'
+
+    try:
+        ayrac = csv.Sniffer().sniff(metin, delimiters=',;\t|').delimiter
+    except csv.Error:
+        ilk_satir = metin.split('\n', 1)[0]
+        ayrac = ';' if ilk_satir.count(';') > ilk_satir.count(',') else ','
+
+    return encoding, ayrac
+
+
+def _csv_oku(yol: str) -> pd.DataFrame:
+    """Tek CSV dosyasını C motoruyla oku, sorun çıkarsa eski python/sniff yoluna düş"""
+    try:
+        encoding, ayrac = _csv_bicimi(yol)
+        return pd.read_csv(yol, encoding=encoding, sep=ayrac, engine='c', low_memory=False)
+    except Exception as e:
+        print(f"   ⚠️ Hızlı CSV okuma başarısız ({os.path.basename(yol)}): {e}")
+
+    try:
+        return pd.read_csv(yol, encoding='utf-8', sep=None, engine='python')
+    except:
+        try:
+            return pd.read_csv(yol, encoding='latin-1', sep=None, engine='python')
+        except:
+            return pd.read_csv(yol, encoding='utf-8', sep=';')
+
+
+def _kaynak_oku(yol: str, kaynak: str = None) -> tuple:
+    """
+    CSV'yi oku, kolonları temizle ve kaynağın şemasını uygula.
+    (df, ham_bellek_mb) döner - ham bellek şema öncesi ölçümdür.
+    """
+    df = _kolonlari_temizle(_csv_oku(yol))
+    ham_mb = _bellek_mb(df)
+    if kaynak:
+        df = _semaya_uygula(df, kaynak)
+    return df, ham_mb
+
+
+def _csvleri_paralel_oku(yollar: List[str], max_workers: int = None, okuyucu=_csv_oku) -> list:
+    """CSV dosyalarını thread havuzunda oku (C parser GIL'i bırakır), sırayı koru"""
+    if not yollar:
+        return []
+    if max_workers is None:
+        max_workers = min(len(yollar), os.cpu_count() or 4)
+    if max_workers <= 1:
+        return [okuyucu(y) for y in yollar]
+    with ThreadPoolExecutor(max_workers=max_workers) as havuz:
+        return list(havuz.map(okuyucu, yollar))
+
+
+# =============================================================================
+# EXCEL OKUYUCU (Takılabilir motor)
+# =============================================================================
+
+# calamine (Rust) openpyxl'den kat kat hızlı - yüklüyse varsayılan tercih
+try:
+    import python_calamine  # noqa: F401 - pandas engine='calamine' için
+    CALAMINE_AVAILABLE = True
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
+try:
+    import xlrd  # noqa: F401 - eski .xls dosyaları için
+    XLRD_AVAILABLE = True
+except ImportError:
+    XLRD_AVAILABLE = False
+
+# Uzantı bazında denenecek motor sırası (yüklü olmayanlar atlanır).
+# pandas'ın openpyxl motoru zaten read_only=True + data_only=True ile akış modunda okur.
+EXCEL_MOTOR_SIRASI = {
+    '.xlsx': ['calamine', 'openpyxl'],
+    '.xlsm': ['calamine', 'openpyxl'],
+    '.xls': ['calamine', 'xlrd'],
+    '.xlsb': ['calamine', 'pyxlsb'],
+}
+
+# Kaynak türü bazında sabit motor seçimi (None = otomatik). KupVeri(excel_motorlari=...) ile ezilebilir.
+EXCEL_MOTOR_TERCIHI = {
+    'trading': None,
+    'sc_sayfalari': None,
+    'cover_diagram': None,
+    'kapasite': None,
+    'siparis_takip': None,
+}
+
+
+def _excel_motoru_yuklu_mu(motor: str) -> bool:
+    if motor == 'calamine':
+        return CALAMINE_AVAILABLE
+    if motor == 'xlrd':
+        return XLRD_AVAILABLE
+    if motor == 'openpyxl':
+        return True  # pandas Excel desteği için zaten gerekli
+    try:
+        __import__(motor)
+        return True
+    except ImportError:
+        return False
+
+
+def _excel_motorlari(yol: str, tercih: str = None) -> List[str]:
+    """Dosya için denenecek motorlar - tercih edilen (yüklüyse) başta"""
+    uzanti = os.path.splitext(yol)[1].lower()
+    sira = list(EXCEL_MOTOR_SIRASI.get(uzanti, ['calamine', 'openpyxl']))
+    if tercih:
+        sira = [tercih] + [m for m in sira if m != tercih]
+    return [m for m in sira if _excel_motoru_yuklu_mu(m)] or [None]
+
+
+def _excel_dene(yol: str, tercih: str, okuyucu):
+    """okuyucu(motor) çağrısını motor sırasıyla dene, ilk başarılı (sonuç, motor) döner"""
+    son_hata = None
+    for motor in _excel_motorlari(yol, tercih):
+        try:
+            return okuyucu(motor), motor
+        except Exception as e:
+            # Sayfa bulunamadı gibi dosya kaynaklı hatalar motor değiştirince düzelmez
+            if 'worksheet' in str(e).lower() or isinstance(e, FileNotFoundError):
+                raise
+            print(f"   ⚠️ Excel motoru '{motor}' başarısız ({os.path.basename(yol)}): {e}")
+            son_hata = e
+    raise son_hata
+
+
+def _excel_oku(yol: str, sheet_name=0, motor: str = None) -> tuple:
+    """Tek sayfa oku → (DataFrame, kullanılan motor)"""
+    return _excel_dene(yol, motor, lambda m: pd.read_excel(yol, sheet_name=sheet_name, engine=m))
+
+
+def _excel_dosyasi(yol: str, motor: str = None) -> tuple:
+    """Çok sayfalı okuma için ExcelFile aç → (ExcelFile, kullanılan motor)"""
+    return _excel_dene(yol, motor, lambda m: pd.ExcelFile(yol, engine=m))
+
+
+# =============================================================================
+# ARAÇ SONUÇ ÖNBELLEĞİ
+# =============================================================================
+
+# Sonucu çağrıdan çağrıya değişebilen araçlar önbelleğe alınmaz
+ONBELLEKSIZ_ARACLAR = {'web_arama'}
+ARAC_ONBELLEK_BOYUTU = 128
+
+
+def _arac_girdisi(tool_input: dict) -> dict:
+    """Araç girdisini normalize et: None alanlar atılır (aracın varsayılanı geçerli olur), metinler kırpılır"""
+    return {k: (v.strip() if isinstance(v, str) else v)
+            for k, v in (tool_input or {}).items() if v is not None}
+
+
+def _girdi_anahtari(girdi: dict) -> str:
+    """Normalize girdinin karşılaştırılabilir metni (anahtarlar sıralı)"""
+    return json.dumps(girdi, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class AracOnbellegi:
+    """
+    Araç sonuçları için LRU önbellek: (araç, normalize girdi, veri_surumu) -> sonuç metni.
+
+    Model aynı oturumda genel_ozet, trading_analiz() gibi araçları aynı girdiyle
+    tekrar tekrar çağırır; veri değişmediyse sonuç aynıdır. KupVeri'ye bağlıdır,
+    yenile() sonrası temizlenir.
+    """
+
+    def __init__(self, max_boyut: int = ARAC_ONBELLEK_BOYUTU):
+        self.max_boyut = max_boyut
+        self.isabet = 0
+        self.iska = 0
+        self._kayitlar = OrderedDict()
+        self._kilit = threading.Lock()
+
+    @staticmethod
+    def onbelleklenir_mi(tool_name: str, tool_input: dict) -> bool:
+        if tool_name in ONBELLEKSIZ_ARACLAR:
+            return False
+        # Excel dosyası yazan çağrı her seferinde çalışmalı
+        return not (tool_input or {}).get('export_excel')
+
+    def al(self, anahtar: tuple) -> Optional[str]:
+        with self._kilit:
+            sonuc = self._kayitlar.get(anahtar)
+            if sonuc is None:
+                self.iska += 1
+                return None
+            self._kayitlar.move_to_end(anahtar)
+            self.isabet += 1
+            return sonuc
+
+    def koy(self, anahtar: tuple, sonuc: str):
+        with self._kilit:
+            self._kayitlar[anahtar] = sonuc
+            self._kayitlar.move_to_end(anahtar)
+            while len(self._kayitlar) > self.max_boyut:
+                self._kayitlar.popitem(last=False)
+
+    def temizle(self):
+        with self._kilit:
+            self._kayitlar.clear()
+
+    def istatistik(self) -> dict:
+        with self._kilit:
+            toplam = self.isabet + self.iska
+            return {'boyut': len(self._kayitlar), 'max_boyut': self.max_boyut,
+                    'isabet': self.isabet, 'iska': self.iska,
+                    'isabet_orani': round(self.isabet / toplam, 3) if toplam else 0.0}
 
-# Sevkiyat motoru artık INLINE - ayrı modül yok
-SEVKIYAT_MOTORU_AVAILABLE = True  # Her zaman True çünkü inline
-print("✅ Sevkiyat hesaplama INLINE modda çalışıyor")
 
 # =============================================================================
 # VERİ YÜKLEYİCİ
 # =============================================================================
 
+def _rapor_ozelligi(ad: str) -> property:
+    """Excel raporu için tembel özellik: ilk erişimde snapshot/dosyadan yüklenir"""
+
+    def oku(self):
+        if ad not in self._raporlar:
+            with self._rapor_kilidi:
+                if ad not in self._raporlar:  # Kilit beklerken başka thread yüklemiş olabilir
+                    self._rapor_yukle(ad)
+        return self._raporlar[ad]
+
+    def yaz(self, deger):
+        self._raporlar[ad] = deger
+
+    return property(oku, yaz, doc=f"{ad} raporu (ilk erişimde yüklenir)")
+
+
 class KupVeri:
     """CSV ve Excel tabanlı küp verisi yönetimi"""
-    
-    def __init__(self, veri_klasoru: str):
+
+    # Küp grubu: _hazirla sonrası birlikte snapshot'lanan CSV tabloları
+    KUP_TABLOLARI = ['stok_satis', 'urun_master', 'magaza_master', 'depo_stok', 'kpi']
+    # Excel raporları: her biri kendi kaynak dosyasıyla ayrı snapshot'lanır
+    RAPORLAR = ['trading', 'sc_sayfalari', 'cover_diagram', 'kapasite', 'siparis_takip']
+
+    # Raporlar tembel yüklenir - sadece ilgili analiz aracı çağrıldığında parse edilir
+    trading = _rapor_ozelligi('trading')
+    sc_sayfalari = _rapor_ozelligi('sc_sayfalari')
+    cover_diagram = _rapor_ozelligi('cover_diagram')
+    kapasite = _rapor_ozelligi('kapasite')
+    siparis_takip = _rapor_ozelligi('siparis_takip')
+
+    def __init__(self, veri_klasoru: str, snapshot_klasoru: str = None, excel_motorlari: Dict[str, str] = None):
         """
         veri_klasoru: CSV ve Excel dosyalarının bulunduğu klasör
+        snapshot_klasoru: Parquet snapshot klasörü (None=varsayılan, False=kapalı)
+        excel_motorlari: Rapor bazında Excel motoru, ör. {'sc_sayfalari': 'openpyxl'}
         """
         self.veri_klasoru = veri_klasoru
-        self._yukle()
-        self._hazirla()
-    
-    def _yukle(self):
-        """Tüm veri dosyalarını yükle"""
-        
-        # =====================================================================
-        # 1. ANLIK STOK SATIŞ (CSV - parçalı dosyalar)
-        # =====================================================================
-        stok_satis_files = glob.glob(os.path.join(self.veri_klasoru, "anlik_stok_satis*.csv"))
-        if stok_satis_files:
-            dfs = []
-            for f in stok_satis_files:
-                try:
-                    df = pd.read_csv(f, encoding='utf-8', sep=None, engine='python')
-                except:
-                    try:
-                        df = pd.read_csv(f, encoding='latin-1', sep=None, engine='python')
-                    except:
-                        df = pd.read_csv(f, encoding='utf-8', sep=';')
-                dfs.append(df)
-            self.stok_satis = pd.concat(dfs, ignore_index=True)
-        else:
-            self.stok_satis = pd.DataFrame()
-        
-        
-        # =====================================================================
-        # 2. MASTER TABLOLAR (CSV)
-        # =====================================================================
-        urun_path = os.path.join(self.veri_klasoru, "urun_master.csv")
-        if os.path.exists(urun_path):
-            try:
-                self.urun_master = pd.read_csv(urun_path, encoding='utf-8', sep=None, engine='python')
-            except:
-                self.urun_master = pd.read_csv(urun_path, encoding='latin-1', sep=None, engine='python')
-        else:
-            self.urun_master = pd.DataFrame()
-        
-        magaza_path = os.path.join(self.veri_klasoru, "magaza_master.csv")
-        if os.path.exists(magaza_path):
-            try:
-                self.magaza_master = pd.read_csv(magaza_path, encoding='utf-8', sep=None, engine='python')
-            except:
-                self.magaza_master = pd.read_csv(magaza_path, encoding='latin-1', sep=None, engine='python')
-        else:
-            self.magaza_master = pd.DataFrame()
-        
-        depo_path = os.path.join(self.veri_klasoru, "depo_stok.csv")
-        if os.path.exists(depo_path):
-            try:
-                self.depo_stok = pd.read_csv(depo_path, encoding='utf-8', sep=None, engine='python')
-            except:
-                self.depo_stok = pd.read_csv(depo_path, encoding='latin-1', sep=None, engine='python')
+        self.excel_motorlari = {**EXCEL_MOTOR_TERCIHI, **(excel_motorlari or {})}
+        self.okuma_sureleri = {}  # {rapor: {'dosya', 'motor', 'sure'}} - Excel parse süreleri
+        self._raporlar = {}
+        self._rapor_kilidi = threading.RLock()
+        self.snapshot = KupSnapshot(snapshot_klasoru or None)
+        if snapshot_klasoru is False:
+            self.snapshot.aktif = False
+
+        self.veri_surumu = 1  # Her içerik değişikliğinde (yenile) artar
+        self.son_yenileme = None
+        self._parca_satirlari = []  # [[parça dosya adı, satır sayısı], ...] - küpteki sırayla
+        self._sevkiyat_motoru = None
+        self._konum_indeksleri = {}  # {(tablo, kolon): (anahtar, {değer: satır konumları})}
+        self._indeks_kilidi = threading.Lock()
+        self._ozetler = {}  # {(boyutlar, durumlar): (anahtar, özet tablo)}
+        self._rapor_turevleri = {}  # {(rapor, tür, ...): (anahtar, türetilen tablo/seri/harita)}
+        self.arac_onbellegi = AracOnbellegi()
+
+        self._kaynaklari_bul()
+        self._imzalar = self._kaynak_imzalari()
+
+        # 1. Küp (CSV) - snapshot varsa parse ve _hazirla atlanır
+        kup_anahtar = self._snapshot_anahtari(self._kup_dosyalari())
+        tablolar = self.snapshot.yukle('kup', kup_anahtar) if kup_anahtar else None
+        if tablolar is not None:
+            for ad in self.KUP_TABLOLARI:
+                setattr(self, ad, tablolar[ad])
+            if '_parcalar' in tablolar:
+                self._parca_satirlari = tablolar['_parcalar'].values.tolist()
+            print(f"⚡ Küp snapshot'tan yüklendi ({len(self.stok_satis):,} satır)")
         else:
-            self.depo_stok = pd.DataFrame()
-        
-        kpi_path = os.path.join(self.veri_klasoru, "kpi.csv")
-        if os.path.exists(kpi_path):
+            self._csv_yukle()
+            self._hazirla()
+            self._kup_snapshot_kaydet(kup_anahtar)
+        self._bellek_raporu_olustur()
+        self._indeksleri_kur()
+
+        # 2. Excel raporları - burada sadece yolları biliniyor, parse ilk erişimde
+        self._yukleme_logu()
+
+    def _kup_snapshot_kaydet(self, kup_anahtar: Optional[str]):
+        if not kup_anahtar:
+            return
+        tablolar = {ad: getattr(self, ad) for ad in self.KUP_TABLOLARI}
+        tablolar['_parcalar'] = pd.DataFrame(self._parca_satirlari, columns=['dosya', 'satir'])
+        self.snapshot.kaydet('kup', kup_anahtar, tablolar)
+
+    def _snapshot_anahtari(self, dosyalar: List[str]) -> Optional[str]:
+        if not self.snapshot.aktif:
+            return None
+        try:
+            return self.snapshot.anahtar(dosyalar)
+        except OSError as e:
+            print(f"   ⚠️ Snapshot anahtarı hesaplanamadı: {e}")
+            return None
+
+    def _kaynak_imzalari(self) -> Dict[str, str]:
+        """Tüm kaynak dosyaların içerik hash'i {yol: hash} - değişiklik tespiti için"""
+        dosyalar = self._kup_dosyalari() + [self.kaynaklar[r] for r in self.RAPORLAR if self.kaynaklar[r]]
+        imzalar = {}
+        for yol in dosyalar:
             try:
-                self.kpi = pd.read_csv(kpi_path, encoding='utf-8', sep=None, engine='python')
-            except:
-                self.kpi = pd.read_csv(kpi_path, encoding='latin-1', sep=None, engine='python')
-        else:
-            self.kpi = pd.DataFrame()
-        
-        # =====================================================================
-        # 3. TRADING RAPORU (Excel)
-        # =====================================================================
+                imzalar[yol] = self.snapshot.dosya_hash(yol)
+            except OSError:
+                pass
+        self.snapshot.hash_bellegini_kaydet()
+        return imzalar
+
+    def _kup_dosyalari(self) -> List[str]:
+        dosyalar = list(self.kaynaklar['stok_satis'])
+        for ad in ['urun_master', 'magaza_master', 'depo_stok', 'kpi']:
+            if self.kaynaklar[ad]:
+                dosyalar.append(self.kaynaklar[ad])
+        return dosyalar
+
+    def _kaynaklari_bul(self):
+        """Klasördeki kaynak dosyaları bul (sadece yollar, parse yok)"""
+
+        self.kaynaklar = {}
+
+        # Anlık stok satış (parçalı CSV)
+        self.kaynaklar['stok_satis'] = glob.glob(os.path.join(self.veri_klasoru, "anlik_stok_satis*.csv"))
+
+        # Master tablolar (CSV)
+        for ad in ['urun_master', 'magaza_master', 'depo_stok', 'kpi']:
+            yol = os.path.join(self.veri_klasoru, f"{ad}.csv")
+            self.kaynaklar[ad] = yol if os.path.exists(yol) else None
+
+        # Trading raporu (Excel)
         trading_path = os.path.join(self.veri_klasoru, "trading.xlsx")
-        if os.path.exists(trading_path):
-            try:
-                self.trading = pd.read_excel(trading_path, sheet_name='mtd')
-            except:
-                try:
-                    self.trading = pd.read_excel(trading_path, sheet_name=0)
-                except:
-                    self.trading = pd.DataFrame()
-        else:
-            self.trading = pd.DataFrame()
-        
-        # =====================================================================
-        # 4. SC TABLOSU (Excel - birden fazla sayfa)
-        # =====================================================================
+        self.kaynaklar['trading'] = trading_path if os.path.exists(trading_path) else None
+
+        # SC tablosu (Excel - birden fazla sayfa)
         sc_files = glob.glob(os.path.join(self.veri_klasoru, "*SC*.xlsx")) + \
                    glob.glob(os.path.join(self.veri_klasoru, "*sc*.xlsx")) + \
                    glob.glob(os.path.join(self.veri_klasoru, "*Tablosu*.xlsx"))
-        
-        self.sc_sayfalari = {}
-        if sc_files:
-            sc_path = sc_files[0]  # İlk bulunan SC dosyası
-            try:
-                xl = pd.ExcelFile(sc_path)
-                for sheet_name in xl.sheet_names:
-                    try:
-                        self.sc_sayfalari[sheet_name] = pd.read_excel(xl, sheet_name=sheet_name)
-                    except:
-                        pass
-            except Exception as e:
-                print(f"SC dosyası okunamadı: {e}")
-        
-        # =====================================================================
-        # 5. COVER DİAGRAM (Excel) - Mağaza×AltGrup cover analizi
-        # =====================================================================
+        self.kaynaklar['sc_sayfalari'] = sc_files[0] if sc_files else None  # İlk bulunan SC dosyası
+
+        # Cover diagram (Excel) - Mağaza×AltGrup cover analizi
         cover_files = []
-        
+
         # Tüm xlsx dosyalarını tara
         for f in os.listdir(self.veri_klasoru):
             if not f.endswith('.xlsx') and not f.endswith('.xls'):
@@ -143,23 +764,12 @@ class KupVeri:
                 full_path = os.path.join(self.veri_klasoru, f)
                 cover_files.append(full_path)
                 print(f"   📂 Cover dosyası bulundu: {f}")
-        
-        self.cover_diagram = pd.DataFrame()
-        if cover_files:
-            try:
-                print(f"   📖 Cover okunuyor: {cover_files[0]}")
-                self.cover_diagram = pd.read_excel(cover_files[0], sheet_name=0)
-                print(f"   ✅ Cover Diagram yüklendi: {len(self.cover_diagram)} satır, {len(self.cover_diagram.columns)} kolon")
-            except Exception as e:
-                print(f"   ⚠️ Cover Diagram okunamadı: {e}")
-        else:
-            print(f"   ⚠️ Cover dosyası bulunamadı")
-        
-        # =====================================================================
-        # 6. KAPASİTE-PERFORMANS (Excel) - Mağaza doluluk analizi
-        # =====================================================================
+
+        self.kaynaklar['cover_diagram'] = cover_files[0] if cover_files else None
+
+        # Kapasite-performans (Excel) - Mağaza doluluk analizi
         kapasite_files = []
-        
+
         # Tüm xlsx dosyalarını tara
         for f in os.listdir(self.veri_klasoru):
             if not f.endswith('.xlsx') and not f.endswith('.xls'):
@@ -170,22 +780,10 @@ class KupVeri:
                 full_path = os.path.join(self.veri_klasoru, f)
                 kapasite_files.append(full_path)
                 print(f"   📂 Kapasite dosyası bulundu: {f}")
-        
-        self.kapasite = pd.DataFrame()
-        if kapasite_files:
-            try:
-                print(f"   📖 Kapasite okunuyor: {kapasite_files[0]}")
-                self.kapasite = pd.read_excel(kapasite_files[0], sheet_name=0)
-                print(f"   ✅ Kapasite yüklendi: {len(self.kapasite)} satır, {len(self.kapasite.columns)} kolon")
-                print(f"   📋 Kolonlar: {list(self.kapasite.columns)[:5]}...")
-            except Exception as e:
-                print(f"   ⚠️ Kapasite okunamadı: {e}")
-        else:
-            print(f"   ⚠️ Kapasite dosyası bulunamadı")
-        
-        # =====================================================================
-        # 7. SİPARİŞ TAKİP (Excel) - Satınalma ve sipariş durumu
-        # =====================================================================
+
+        self.kaynaklar['kapasite'] = kapasite_files[0] if kapasite_files else None
+
+        # Sipariş takip (Excel) - Satınalma ve sipariş durumu
         siparis_files = []
         
         print(f"\n   🔍 SİPARİŞ DOSYASI ARANIYOR...")
@@ -215,17 +813,538 @@ class KupVeri:
                 siparis_files.append(full_path)
                 print(f"   ✅ Sipariş dosyası BULUNDU: {f}")
         
-        self.siparis_takip = pd.DataFrame()
-        if siparis_files:
-            try:
-                print(f"   📖 Sipariş okunuyor: {siparis_files[0]}")
-                self.siparis_takip = pd.read_excel(siparis_files[0], sheet_name=0)
-                print(f"   ✅ Sipariş Takip yüklendi: {len(self.siparis_takip)} satır, {len(self.siparis_takip.columns)} kolon")
-            except Exception as e:
-                print(f"   ⚠️ Sipariş Takip okunamadı: {e}")
+        self.kaynaklar['siparis_takip'] = siparis_files[0] if siparis_files else None
+
+    def rapor_yuklendi_mi(self, rapor: str) -> bool:
+        """Rapor belleğe alındı mı (erişim parse tetiklemez)"""
+        return rapor in self._raporlar
+
+    def rapor_mevcut_mu(self, rapor: str) -> bool:
+        """Rapor için kaynak dosya bulundu mu (erişim parse tetiklemez)"""
+        return bool(self.kaynaklar.get(rapor))
+
+    def raporlari_yukle(self):
+        """Tüm Excel raporlarını şimdi yükle (tembel yüklemeyi atlamak için)"""
+        for rapor in self.RAPORLAR:
+            getattr(self, rapor)
+
+    def _csv_yukle(self):
+        """Küp CSV dosyalarını yükle (parçalar ve master'lar paralel okunur, şema okurken uygulanır)"""
+        import time
+        baslangic = time.time()
+
+        master_adlari = [ad for ad in ['urun_master', 'magaza_master', 'depo_stok', 'kpi'] if self.kaynaklar[ad]]
+        stok_satis_files = self.kaynaklar['stok_satis']
+        isler = [(y, 'stok_satis') for y in stok_satis_files] + [(self.kaynaklar[ad], ad) for ad in master_adlari]
+        okunanlar = _csvleri_paralel_oku(isler, okuyucu=lambda is_: _kaynak_oku(*is_))
+
+        # Okuma anı bellek ölçümü: ham (pandas varsayılan tipleri) → şema uygulanmış
+        self.bellek_raporu = {}
+
+        # =====================================================================
+        # 1. ANLIK STOK SATIŞ (CSV - parçalı dosyalar)
+        # =====================================================================
+        parcalar = okunanlar[:len(stok_satis_files)]
+        self._parca_satirlari = [[os.path.basename(y), len(df)] for y, (df, _) in zip(stok_satis_files, parcalar)]
+        if parcalar:
+            self.stok_satis = pd.concat([df for df, _ in parcalar], ignore_index=True)
+            # Parçalar arasında tip farkı (ör. biri int32 biri float32) concat'te genişler - tekrar daralt
+            self.stok_satis = _semaya_uygula(self.stok_satis, 'stok_satis')
+            self.bellek_raporu['stok_satis'] = {'ham': sum(mb for _, mb in parcalar), 'sema': _bellek_mb(self.stok_satis)}
         else:
-            print(f"   ⚠️ Sipariş dosyası bulunamadı")
-        
+            self.stok_satis = pd.DataFrame()
+
+        # =====================================================================
+        # 2. MASTER TABLOLAR (CSV)
+        # =====================================================================
+        for ad in ['urun_master', 'magaza_master', 'depo_stok', 'kpi']:
+            setattr(self, ad, pd.DataFrame())
+        for ad, (df, ham_mb) in zip(master_adlari, okunanlar[len(stok_satis_files):]):
+            setattr(self, ad, df)
+            self.bellek_raporu[ad] = {'ham': ham_mb, 'sema': _bellek_mb(df)}
+
+        print(f"   ⚡ {len(okunanlar)} CSV dosyası okundu ({len(stok_satis_files)} stok/satış parçası): {time.time() - baslangic:.1f}s")
+
+    # -------------------------------------------------------------------------
+    # Artımlı yenileme
+    # -------------------------------------------------------------------------
+
+    # Nokta sorguları için satır konum indeksi kurulan kolonlar (yükleme/yenileme sonrası)
+    INDEKS_KOLONLARI = {
+        'stok_satis': ['magaza_kod', 'urun_kod', 'kategori_kod', 'mg', 'bolge', 'depo_kod'],
+        'urun_master': ['urun_kod'],
+        'magaza_master': ['magaza_kod'],
+        'depo_stok': ['urun_kod'],
+    }
+
+    # Master değişince yeniden çalışması gereken _hazirla adımları (bu sırayla)
+    HAZIRLIK_ADIMLARI = ['_urun_zenginlestir', '_magaza_zenginlestir', '_kpi_zenginlestir', '_metrikleri_hesapla']
+    ADIM_BAGIMLILIKLARI = {
+        'urun_master': ['_urun_zenginlestir', '_kpi_zenginlestir', '_metrikleri_hesapla'],  # mg → KPI → durum
+        'magaza_master': ['_magaza_zenginlestir'],
+        'kpi': ['_kpi_zenginlestir', '_metrikleri_hesapla'],
+        'depo_stok': [],  # Küpe join'lenmiyor - sadece tablo yenilenir
+    }
+
+    def yenile(self, degisen_dosyalar: List[str] = None) -> dict:
+        """
+        Sadece değişen kaynakları yeniden oku ve bağımlı adımları yeniden çalıştır.
+
+        degisen_dosyalar: Değiştiği bilinen dosyalar (yol veya dosya adı).
+                          None ise klasör yeniden taranır ve içerik hash'i ile tespit edilir.
+
+        Örn. yeni depo_stok.csv sadece depo tablosunu yeniler; ürün/mağaza join'i
+        tekrar edilmez. Değişen stok/satış parçalarının yalnızca kendi satırları
+        yeniden okunup hazırlanır.
+        """
+        import time
+        baslangic = time.time()
+
+        eski_kaynaklar = self.kaynaklar
+        eski_imzalar = self._imzalar
+        self._kaynaklari_bul()
+        self._imzalar = self._kaynak_imzalari()
+
+        tum_yollar = set(eski_imzalar) | set(self._imzalar)
+        if degisen_dosyalar is None:
+            degisen = {y for y in tum_yollar if eski_imzalar.get(y) != self._imzalar.get(y)}
+        else:
+            adlar = {os.path.basename(d) for d in degisen_dosyalar}
+            degisen = {y for y in tum_yollar if os.path.basename(y) in adlar}
+
+        roller = self._degisen_roller(degisen, eski_kaynaklar)
+        sonuc = {'degisen_dosyalar': sorted(os.path.basename(y) for y in degisen),
+                 'roller': sorted(roller), 'adimlar': [], 'sure': 0.0}
+        if not roller:
+            print("✅ Değişen kaynak dosya yok - yenileme gerekmedi")
+            self.son_yenileme = sonuc
+            return sonuc
+
+        print(f"\n🔄 YENİLEME: {', '.join(sonuc['degisen_dosyalar'])}")
+
+        # Excel raporları: yüklüyse bırak, ilk erişimde yeniden okunsun
+        for rapor in self.RAPORLAR:
+            if rapor in roller:
+                self._raporlar.pop(rapor, None)
+                self.okuma_sureleri.pop(rapor, None)
+
+        kup_rolleri = roller & {'stok_satis', 'urun_master', 'magaza_master', 'depo_stok', 'kpi'}
+        if kup_rolleri:
+            # Master eklendi/silindi ya da küp boştu → kısmi yenileme anlamsız, baştan kur
+            yapi_degisti = any(bool(eski_kaynaklar[ad]) != bool(self.kaynaklar[ad])
+                               for ad in kup_rolleri if ad != 'stok_satis')
+            if yapi_degisti or len(self.stok_satis) == 0 or not self._parca_satirlari:
+                self._csv_yukle()
+                self._hazirla()
+                sonuc['adimlar'] = ['_csv_yukle', '_hazirla']
+            else:
+                sonuc['adimlar'] = self._kupu_kismi_yenile(kup_rolleri, degisen)
+            self._kup_snapshot_kaydet(self._snapshot_anahtari(self._kup_dosyalari()))
+
+        self.veri_surumu += 1
+        self.arac_onbellegi.temizle()
+        if kup_rolleri:
+            self._indeksleri_kur()
+        sonuc['sure'] = round(time.time() - baslangic, 2)
+        self.son_yenileme = sonuc
+        print(f"✅ Yenileme tamamlandı ({sonuc['sure']:.2f}s) - adımlar: {sonuc['adimlar'] or 'sadece rapor'}")
+        self._yukleme_logu()
+        return sonuc
+
+    def _degisen_roller(self, degisen: set, eski_kaynaklar: dict) -> set:
+        """Değişen dosya yollarını kaynak rollerine (stok_satis, kpi, trading...) çevir"""
+        roller = set()
+        for kaynaklar in (eski_kaynaklar, self.kaynaklar):
+            for rol, yol in kaynaklar.items():
+                yollar = yol if isinstance(yol, list) else [yol]
+                if any(y in degisen for y in yollar if y):
+                    roller.add(rol)
+        return roller
+
+    def _kupu_kismi_yenile(self, roller: set, degisen: set) -> List[str]:
+        """
+        Değişen master'ları oku, bağımlı adımları çalıştır, değişen parçaları değiştir.
+
+        _master_ekle kolon ekler/üzerine yazar ama silmez: master'ın kolonları
+        değiştiyse (eklenen/çıkan/sırası değişen kolon) eski join kolonları küpte
+        kalır ve tam yüklemeden farklı bir küp çıkar. Bu durumda baştan kurulur.
+        """
+        masterlar = [ad for ad in ['urun_master', 'magaza_master', 'depo_stok', 'kpi'] if ad in roller]
+        okunanlar = _csvleri_paralel_oku([(self.kaynaklar[ad], ad) for ad in masterlar],
+                                         okuyucu=lambda is_: _kaynak_oku(*is_))
+        sema_degisen = [ad for ad, (df, _) in zip(masterlar, okunanlar)
+                        if list(df.columns) != list(getattr(self, ad).columns)]
+        if sema_degisen:
+            print(f"   🔁 Kolonları değişen master: {sema_degisen} - küp baştan kuruluyor")
+            self._csv_yukle()
+            self._hazirla()
+            return ['_csv_yukle', '_hazirla']
+
+        for ad, (df, _) in zip(masterlar, okunanlar):
+            setattr(self, ad, df)
+            print(f"   📄 {ad} yeniden okundu: {len(df):,} satır")
+
+        # Master'a bağlı adımlar - mevcut (değişmemiş) parçaların satırlarında
+        adimlar = [a for a in self.HAZIRLIK_ADIMLARI
+                   if any(a in self.ADIM_BAGIMLILIKLARI[ad] for ad in masterlar)]
+        if adimlar:
+            self.join_raporu = getattr(self, 'join_raporu', {})
+            for adim in adimlar:
+                getattr(self, adim)()
+            self.stok_satis = _semaya_uygula(self.stok_satis, 'stok_satis')
+
+        if 'stok_satis' in roller:
+            self._parcalari_yenile(degisen)
+            adimlar = adimlar + ['_parcalari_yenile']
+        return adimlar
+
+    def _parcalari_yenile(self, degisen: set):
+        """Değişen/eklenen parçaları okuyup hazırla, silinenleri çıkar; diğer satırlara dokunma"""
+        sinirlar = np.cumsum([0] + [n for _, n in self._parca_satirlari])
+        eski_araliklar = {ad: (sinirlar[i], sinirlar[i + 1]) for i, (ad, _) in enumerate(self._parca_satirlari)}
+
+        yeni_liste = self.kaynaklar['stok_satis']
+        okunacak = [y for y in yeni_liste if y in degisen or os.path.basename(y) not in eski_araliklar]
+        okunanlar = dict(zip(okunacak, _csvleri_paralel_oku([(y, 'stok_satis') for y in okunacak],
+                                                            okuyucu=lambda is_: _kaynak_oku(*is_))))
+
+        parcalar = []
+        for yol in yeni_liste:
+            if yol in okunanlar:
+                df = self._parcayi_hazirla(okunanlar[yol][0])
+                print(f"   📄 {os.path.basename(yol)} yeniden okundu: {len(df):,} satır")
+            else:
+                bas, son = eski_araliklar[os.path.basename(yol)]
+                df = self.stok_satis.iloc[bas:son]
+            parcalar.append((yol, df))
+
+        silinen = set(eski_araliklar) - {os.path.basename(y) for y in yeni_liste}
+        if silinen:
+            print(f"   🗑️ Çıkarılan parçalar: {sorted(silinen)}")
+
+        if parcalar:
+            self.stok_satis = pd.concat([df for _, df in parcalar], ignore_index=True)
+            self.stok_satis = _semaya_uygula(self.stok_satis, 'stok_satis')
+        else:
+            self.stok_satis = pd.DataFrame()
+        self._parca_satirlari = [[os.path.basename(y), len(df)] for y, df in parcalar]
+
+    def _parcayi_hazirla(self, parca: pd.DataFrame) -> pd.DataFrame:
+        """Tek parçayı mevcut master'larla zenginleştir (küpün geri kalanına dokunmadan)"""
+        kup, join_raporu = self.stok_satis, getattr(self, 'join_raporu', {})
+        try:
+            self.stok_satis = parca
+            self._hazirla()
+            return self.stok_satis
+        finally:
+            self.stok_satis, self.join_raporu = kup, join_raporu
+
+    def _bellek_raporu_olustur(self):
+        """
+        Küp tablolarının bellek kullanımını raporla.
+        ham → sema: aynı kolonlar, okuma tipleri vs kompakt şema
+        hazir: _hazirla sonrası (join'lenmiş ve hesaplanmış kolonlar dahil) son hal
+        """
+        rapor = getattr(self, 'bellek_raporu', None) or {}
+        print(f"\n💾 BELLEK KULLANIMI:")
+        for ad in self.KUP_TABLOLARI:
+            if len(getattr(self, ad)) == 0:
+                continue
+            kayit = rapor.setdefault(ad, {})
+            kayit['hazir'] = _bellek_mb(getattr(self, ad))
+            if 'ham' in kayit:
+                print(f"   - {ad}: okuma {kayit['ham']:,.1f} MB → şema {kayit['sema']:,.1f} MB | hazır: {kayit['hazir']:,.1f} MB")
+            else:
+                print(f"   - {ad}: {kayit['hazir']:,.1f} MB")
+        self.bellek_raporu = rapor
+
+    def _rapor_yukle(self, rapor: str):
+        """Excel raporunu snapshot'tan, yoksa dosyadan yükle"""
+        yol = self.kaynaklar[rapor]
+        anahtar = self._snapshot_anahtari([yol]) if yol else None
+        tablolar = self.snapshot.yukle(rapor, anahtar) if anahtar else None
+        if tablolar is not None:
+            setattr(self, rapor, tablolar[rapor])
+            return
+
+        self._rapor_oku(rapor)
+        if anahtar:
+            self.snapshot.kaydet(rapor, anahtar, {rapor: getattr(self, rapor)})
+
+    def _rapor_oku(self, rapor: str):
+        """Excel raporunu dosyadan parse et"""
+        import time
+        yol = self.kaynaklar[rapor]
+        tercih = self.excel_motorlari.get(rapor)
+        motor = None
+        baslangic = time.time()
+
+        # =====================================================================
+        # 3. TRADING RAPORU (Excel)
+        # =====================================================================
+        if rapor == 'trading':
+            self.trading = pd.DataFrame()
+            if yol:
+                try:
+                    self.trading, motor = _excel_oku(yol, sheet_name='mtd', motor=tercih)
+                except:
+                    try:
+                        self.trading, motor = _excel_oku(yol, sheet_name=0, motor=tercih)
+                    except:
+                        self.trading = pd.DataFrame()
+
+        # =====================================================================
+        # 4. SC TABLOSU (Excel - birden fazla sayfa)
+        # =====================================================================
+        elif rapor == 'sc_sayfalari':
+            self.sc_sayfalari = {}
+            if yol:
+                try:
+                    xl, motor = _excel_dosyasi(yol, motor=tercih)
+                    for sheet_name in xl.sheet_names:
+                        try:
+                            self.sc_sayfalari[sheet_name] = pd.read_excel(xl, sheet_name=sheet_name)
+                        except:
+                            pass
+                except Exception as e:
+                    print(f"SC dosyası okunamadı: {e}")
+
+        # =====================================================================
+        # 5. COVER DİAGRAM (Excel) - Mağaza×AltGrup cover analizi
+        # =====================================================================
+        elif rapor == 'cover_diagram':
+            self.cover_diagram = pd.DataFrame()
+            if yol:
+                try:
+                    print(f"   📖 Cover okunuyor: {yol}")
+                    self.cover_diagram, motor = _excel_oku(yol, sheet_name=0, motor=tercih)
+                    print(f"   ✅ Cover Diagram yüklendi: {len(self.cover_diagram)} satır, {len(self.cover_diagram.columns)} kolon")
+                except Exception as e:
+                    print(f"   ⚠️ Cover Diagram okunamadı: {e}")
+            else:
+                print(f"   ⚠️ Cover dosyası bulunamadı")
+
+        # =====================================================================
+        # 6. KAPASİTE-PERFORMANS (Excel) - Mağaza doluluk analizi
+        # =====================================================================
+        elif rapor == 'kapasite':
+            self.kapasite = pd.DataFrame()
+            if yol:
+                try:
+                    print(f"   📖 Kapasite okunuyor: {yol}")
+                    self.kapasite, motor = _excel_oku(yol, sheet_name=0, motor=tercih)
+                    print(f"   ✅ Kapasite yüklendi: {len(self.kapasite)} satır, {len(self.kapasite.columns)} kolon")
+                    print(f"   📋 Kolonlar: {list(self.kapasite.columns)[:5]}...")
+                except Exception as e:
+                    print(f"   ⚠️ Kapasite okunamadı: {e}")
+            else:
+                print(f"   ⚠️ Kapasite dosyası bulunamadı")
+
+        # =====================================================================
+        # 7. SİPARİŞ TAKİP (Excel) - Satınalma ve sipariş durumu
+        # =====================================================================
+        elif rapor == 'siparis_takip':
+            self.siparis_takip = pd.DataFrame()
+            if yol:
+                try:
+                    print(f"   📖 Sipariş okunuyor: {yol}")
+                    self.siparis_takip, motor = _excel_oku(yol, sheet_name=0, motor=tercih)
+                    print(f"   ✅ Sipariş Takip yüklendi: {len(self.siparis_takip)} satır, {len(self.siparis_takip.columns)} kolon")
+                except Exception as e:
+                    print(f"   ⚠️ Sipariş Takip okunamadı: {e}")
+            else:
+                print(f"   ⚠️ Sipariş dosyası bulunamadı")
+
+        if yol:
+            sure = time.time() - baslangic
+            self.okuma_sureleri[rapor] = {'dosya': os.path.basename(yol), 'motor': motor or 'varsayılan', 'sure': round(sure, 3)}
+            print(f"   ⏱️ {os.path.basename(yol)}: {sure:.2f}s ({motor or 'varsayılan'} motoru)")
+
+    def okuma_raporu(self) -> str:
+        """Excel dosyalarının parse süreleri (snapshot'tan gelenler listelenmez)"""
+        if not self.okuma_sureleri:
+            return "Henüz parse edilmiş Excel dosyası yok."
+        satirlar = [f"{'Dosya':<35} | {'Motor':<10} | {'Süre':>7}", "-" * 58]
+        for bilgi in sorted(self.okuma_sureleri.values(), key=lambda b: -b['sure']):
+            satirlar.append(f"{bilgi['dosya'][:35]:<35} | {bilgi['motor']:<10} | {bilgi['sure']:>6.2f}s")
+        satirlar.append(f"Toplam: {sum(b['sure'] for b in self.okuma_sureleri.values()):.2f}s")
+        return "\n".join(satirlar)
+
+    # =====================================================================
+    # SATIR KONUM İNDEKSİ (önce filtre, sonra kopya)
+    # =====================================================================
+    def _konum_indeksi(self, kolon: str, tablo: str = 'stok_satis') -> dict:
+        """Tablo kolonu için değer -> satır konumları indeksi (veri_surumu değişince yeniden kurulur)"""
+        df = getattr(self, tablo)
+        anahtar = (self.veri_surumu, id(df), len(df))
+        with self._indeks_kilidi:
+            kayit = self._konum_indeksleri.get((tablo, kolon))
+            if kayit is None or kayit[0] != anahtar:
+                kayit = (anahtar, _konum_indeksi_kur(df[kolon]))
+                self._konum_indeksleri[(tablo, kolon)] = kayit
+        return kayit[1]
+
+    def _indeksleri_kur(self):
+        """INDEKS_KOLONLARI için indeksleri önceden kur - ilk araç çağrısı beklemesin"""
+        import time
+        baslangic = time.time()
+        sayi = 0
+        for tablo, kolonlar in self.INDEKS_KOLONLARI.items():
+            df = getattr(self, tablo)
+            for kolon in kolonlar:
+                if kolon in df.columns:
+                    self._konum_indeksi(kolon, tablo)
+                    sayi += 1
+        print(f"🗂️ Boyut indeksleri hazır: {sayi} kolon ({time.time() - baslangic:.2f}s)")
+
+    def satir_konumlari(self, tablo: str = 'stok_satis', **filtreler) -> np.ndarray:
+        """
+        Tabloda tüm filtrelere uyan satırların konumları (artan sırada).
+
+        Örn: kup.satir_konumlari(kategori_kod=14, marka_kod='7')
+             kup.satir_konumlari('depo_stok', urun_kod='1017239')
+        Tabloda olmayan kolon filtresi yok sayılır, filtre yoksa tüm satırlar döner.
+        """
+        df = getattr(self, tablo)
+        konum = None
+        for kolon, deger in filtreler.items():
+            if deger is None or kolon not in df.columns:
+                continue
+            secili = self._konum_indeksi(kolon, tablo).get(_indeks_degeri(df[kolon], deger))
+            if secili is None:
+                return np.array([], dtype=np.intp)
+            konum = secili if konum is None else np.intersect1d(konum, secili, assume_unique=True)
+        return konum if konum is not None else np.arange(len(df))
+
+    def satirlar(self, tablo: str, **filtreler) -> pd.DataFrame:
+        """Tabloda filtrelere uyan satırlar (tüm kolonlar) - kolon taraması yerine indeks"""
+        df = getattr(self, tablo)
+        if any(kolon not in df.columns for kolon in filtreler):
+            return df.iloc[0:0]
+        return df.take(self.satir_konumlari(tablo, **filtreler))
+
+    def secili_satirlar(self, kolonlar: List[str] = None, **filtreler) -> pd.DataFrame:
+        """
+        Filtrelere uyan satırların yalnızca istenen kolonlarının kopyası.
+
+        Tüm küp kopyalanıp sonra filtrelenmez; önce satır konumları indeksten
+        bulunur, sadece o satırlar × kolonlar kopyalanır. Index etiketleri
+        küpteki satır numaralarıdır.
+        """
+        kolonlar = [c for c in (kolonlar or self.stok_satis.columns) if c in self.stok_satis.columns]
+        konum = self.satir_konumlari(**filtreler)
+        return pd.DataFrame({kol: self.stok_satis[kol].take(konum) for kol in kolonlar})
+
+    # =====================================================================
+    # ROLLUP (özet araçlar için önceden toplanmış tablolar)
+    # =====================================================================
+    def ozet(self, boyutlar: tuple = (), durumlar: tuple = None) -> pd.DataFrame:
+        """
+        stok_satis'in boyutlar bazında toplanmış özeti (opsiyonel stok_durum filtresiyle).
+
+        Örn: kup.ozet(('bolge',)), kup.ozet(('kategori_kod', 'urun_kod'), durumlar=('SEVK_GEREKLI',))
+        Kolonlar: boyutlar + satir, magaza_sayisi, urun_sayisi, stok, satis, ciro, kar (toplam),
+        min_deger (grubun ilk değeri). boyutlar=() tek satırlık genel toplamdır.
+
+        Her tablo veri yüklemesi başına bir kez hesaplanır ve veri_surumu değişene
+        kadar saklanır. Dönen tablo paylaşılır - değiştirilecekse kopyalanmalı.
+        """
+        boyutlar = tuple(boyutlar)
+        durumlar = tuple(durumlar) if durumlar else None
+        anahtar = (self.veri_surumu, id(self.stok_satis), len(self.stok_satis))
+        with self._indeks_kilidi:
+            kayit = self._ozetler.get((boyutlar, durumlar))
+            if kayit is None or kayit[0] != anahtar:
+                kayit = (anahtar, self._ozet_hesapla(boyutlar, durumlar))
+                self._ozetler[(boyutlar, durumlar)] = kayit
+        return kayit[1]
+
+    def _ozet_hesapla(self, boyutlar: tuple, durumlar: tuple = None) -> pd.DataFrame:
+        df = self.stok_satis
+        if durumlar is not None:
+            df = df[df['stok_durum'].isin(list(durumlar))]
+
+        olculer = {}
+        if 'magaza_kod' in df.columns:
+            olculer['magaza_sayisi'] = ('magaza_kod', 'nunique')
+        if 'urun_kod' in df.columns:
+            olculer['urun_sayisi'] = ('urun_kod', 'nunique')
+        for kol in ['stok', 'satis', 'ciro', 'kar']:
+            if kol in df.columns:
+                olculer[kol] = (kol, 'sum')
+        if 'min_deger' in df.columns:
+            olculer['min_deger'] = ('min_deger', 'first')
+
+        # Genel toplam
+        if not boyutlar:
+            satir = {'satir': len(df)}
+            for ad, (kol, fonksiyon) in olculer.items():
+                if fonksiyon == 'first':
+                    satir[ad] = df[kol].iloc[0] if len(df) > 0 else np.nan
+                else:
+                    satir[ad] = getattr(df[kol], fonksiyon)()
+            return pd.DataFrame([satir])
+
+        gruplar = df.groupby(list(boyutlar), observed=True)
+        tablo = gruplar.agg(**olculer) if olculer else pd.DataFrame(index=gruplar.size().index)
+        tablo.insert(0, 'satir', gruplar.size())
+        return tablo.reset_index()
+
+    def sevkiyat_motoru(self) -> SevkiyatMotoru:
+        """Küpe bağlı tek SevkiyatMotoru - segment önbelleği çağrılar arasında korunur"""
+        with self._indeks_kilidi:  # Paralel araç çağrıları tek motoru paylaşsın
+            if self._sevkiyat_motoru is None:
+                self._sevkiyat_motoru = SevkiyatMotoru(self)
+        return self._sevkiyat_motoru
+
+    # =====================================================================
+    # NORMALİZE RAPOR TABLOLARI (araç çağrısı başına değil, yükleme başına)
+    # =====================================================================
+    def _rapor_turevi(self, rapor: str, tur: tuple, hesapla):
+        """Ham rapordan hesapla(df) ile türetilen değer - rapor yeniden yüklenene kadar saklanır"""
+        ham = getattr(self, rapor)
+        anahtar = (self.veri_surumu, id(ham), len(ham))
+        with self._rapor_kilidi:
+            kayit = self._rapor_turevleri.get((rapor,) + tur)
+            if kayit is None or kayit[0] != anahtar:
+                kayit = (anahtar, hesapla(ham))
+                self._rapor_turevleri[(rapor,) + tur] = kayit
+        return kayit[1]
+
+    def kolon_haritasi(self, rapor: str) -> Dict[str, Optional[str]]:
+        """
+        Raporun kanonik metrik adı -> ham başlık eşlemesi (bulunamayan None).
+
+        Örn: kup.kolon_haritasi('kapasite')['fiili_doluluk'] -> '#Fiili Doluluk_'
+        Tanımlar RAPOR_KOLONLARI'ndadır; başlıklar yükleme başına bir kez çözülür.
+        Dönen sözlük paylaşılır - değiştirilmemeli.
+        """
+        tanimlar = RAPOR_KOLONLARI[rapor]
+        degisimler = BASLIK_DEGISIMLERI.get(rapor, ())
+        return self._rapor_turevi(rapor, ('kolonlar',), lambda ham: _baslik_esle(ham.columns, tanimlar, degisimler))
+
+    def sayisal_kolon(self, rapor: str, kolon: str, yuzde: bool = False) -> pd.Series:
+        """
+        Rapor kolonunun float hali (_sayi_serisi / yuzde=True ise _yuzde_serisi).
+
+        Rapor yüklemesi başına bir kez parse edilir. Index ham raporla aynıdır,
+        filtrelenmiş kopyaya atanınca satırlar index üzerinden eşleşir.
+        """
+        ayristir = _yuzde_serisi if yuzde else _sayi_serisi
+        return self._rapor_turevi(rapor, ('sayi', kolon, yuzde), lambda ham: ayristir(ham[kolon]))
+
+    def trading_tablosu(self) -> pd.DataFrame:
+        """
+        Trading raporunun tipli hali: ana_grup, ara_grup, alt_grup, seviye, ad + sayısal metrikler.
+
+        seviye: ANA / ARA (grup toplamları), ALT (mal grubu detayı), GENEL (genel toplam)
+        genel_toplam: "Genel Toplam" satırı işareti
+        Dönen tablo paylaşılır - değiştirilecekse kopyalanmalı.
+        """
+        return self._rapor_turevi('trading', ('tablo',),
+                                  lambda ham: _trading_normallestir(ham, self.kolon_haritasi('trading')))
+
+    def _yukleme_logu(self):
         # =====================================================================
         # LOG
         # =====================================================================
@@ -235,113 +1354,157 @@ class KupVeri:
         print(f"   - Mağaza Master: {len(self.magaza_master):,} mağaza")
         print(f"   - Depo Stok: {len(self.depo_stok):,} satır")
         print(f"   - KPI: {len(self.kpi):,} satır")
-        print(f"   - Trading: {len(self.trading):,} satır")
-        print(f"   - SC Sayfaları: {list(self.sc_sayfalari.keys())}")
-        print(f"   - Cover Diagram: {len(self.cover_diagram):,} satır")
-        print(f"   - Kapasite: {len(self.kapasite):,} satır")
-        print(f"   - Sipariş Takip: {len(self.siparis_takip):,} satır")
-    
+        etiketler = {'trading': 'Trading', 'sc_sayfalari': 'SC Sayfaları', 'cover_diagram': 'Cover Diagram',
+                     'kapasite': 'Kapasite', 'siparis_takip': 'Sipariş Takip'}
+        for rapor in self.RAPORLAR:
+            if not self.rapor_yuklendi_mi(rapor):
+                durum = "ilk kullanımda yüklenecek" if self.rapor_mevcut_mu(rapor) else "dosya yok"
+                print(f"   - {etiketler[rapor]}: {durum}")
+            elif rapor == 'sc_sayfalari':
+                print(f"   - {etiketler[rapor]}: {list(self.sc_sayfalari.keys())}")
+            else:
+                print(f"   - {etiketler[rapor]}: {len(getattr(self, rapor)):,} satır")
+
+    def _anahtarlari_esitle(self, master: pd.DataFrame, kolon: str):
+        """Join öncesi küp ve master anahtarını aynı tam sayı genişliğine getir (yerinde)"""
+        master[kolon] = _anahtar_serisi(master[kolon])
+        self.stok_satis[kolon] = _anahtar_serisi(self.stok_satis[kolon])
+        if master[kolon].dtype != self.stok_satis[kolon].dtype:
+            master[kolon] = master[kolon].astype('int64')
+            self.stok_satis[kolon] = self.stok_satis[kolon].astype('int64')
+
     def _hazirla(self):
         """Veriyi zenginleştir ve hesaplamalar yap"""
         
         if len(self.stok_satis) == 0:
             return
         
-        # BOM karakterini temizle ve kolon isimlerini normalize et
-        def temizle_kolonlar(df):
-            df.columns = df.columns.str.replace('\ufeff', '').str.lower().str.strip()
-            return df
-        
-        self.stok_satis = temizle_kolonlar(self.stok_satis)
-        if len(self.urun_master) > 0:
-            self.urun_master = temizle_kolonlar(self.urun_master)
-        if len(self.magaza_master) > 0:
-            self.magaza_master = temizle_kolonlar(self.magaza_master)
-        if len(self.depo_stok) > 0:
-            self.depo_stok = temizle_kolonlar(self.depo_stok)
-        if len(self.kpi) > 0:
-            self.kpi = temizle_kolonlar(self.kpi)
+        # Kolon temizliği ve şema okuma sırasında yapıldı (_kaynak_oku) - burada
+        # sadece dışarıdan atanmış tablolar için tekrar uygulanır (zaten uygunsa işlem yapmaz)
+        for ad in self.KUP_TABLOLARI:
+            df = getattr(self, ad)
+            if len(df) > 0:
+                setattr(self, ad, _semaya_uygula(_kolonlari_temizle(df), ad))
         
         print(f"\n🔍 JOIN ÖNCESİ KONTROL:")
         print(f"   Stok/Satış kolonları: {list(self.stok_satis.columns)}")
         print(f"   Ürün Master kolonları: {list(self.urun_master.columns) if len(self.urun_master) > 0 else 'BOŞ'}")
         print(f"   Mağaza Master kolonları: {list(self.magaza_master.columns) if len(self.magaza_master) > 0 else 'BOŞ'}")
         
-        # Ürün master ile join
-        if len(self.urun_master) > 0 and 'urun_kod' in self.stok_satis.columns and 'urun_kod' in self.urun_master.columns:
-            # Veri tiplerini eşitle (integer olarak tut, sonra string yap)
-            self.stok_satis['urun_kod'] = pd.to_numeric(self.stok_satis['urun_kod'], errors='coerce').fillna(0).astype(int).astype(str)
-            self.urun_master['urun_kod'] = pd.to_numeric(self.urun_master['urun_kod'], errors='coerce').fillna(0).astype(int).astype(str)
-            
-            urun_kolonlar = ['urun_kod']
-            for kol in ['kategori_kod', 'umg', 'mg', 'marka_kod', 'nitelik', 'durum']:
-                if kol in self.urun_master.columns:
-                    urun_kolonlar.append(kol)
-            
-            print(f"   Ürün join kolonları: {urun_kolonlar}")
-            print(f"   Stok urun_kod örnek: {self.stok_satis['urun_kod'].head(3).tolist()}")
-            print(f"   Master urun_kod örnek: {self.urun_master['urun_kod'].head(3).tolist()}")
-            
-            if len(urun_kolonlar) > 1:
-                before_len = len(self.stok_satis)
-                self.stok_satis = self.stok_satis.merge(
-                    self.urun_master[urun_kolonlar],
-                    on='urun_kod',
-                    how='left'
-                )
-                print(f"   ✅ Ürün join: {before_len} → {len(self.stok_satis)} satır")
-                
-                # Join sonrası kontrol
-                if 'kategori_kod' in self.stok_satis.columns:
-                    non_null = self.stok_satis['kategori_kod'].notna().sum()
-                    print(f"   kategori_kod dolu: {non_null:,} / {len(self.stok_satis):,}")
-        
-        # Mağaza master ile join
-        if len(self.magaza_master) > 0 and 'magaza_kod' in self.stok_satis.columns and 'magaza_kod' in self.magaza_master.columns:
-            # Veri tiplerini eşitle
-            self.stok_satis['magaza_kod'] = pd.to_numeric(self.stok_satis['magaza_kod'], errors='coerce').fillna(0).astype(int).astype(str)
-            self.magaza_master['magaza_kod'] = pd.to_numeric(self.magaza_master['magaza_kod'], errors='coerce').fillna(0).astype(int).astype(str)
-            
-            mag_kolonlar = ['magaza_kod']
-            for kol in ['il', 'bolge', 'tip', 'depo_kod']:
-                if kol in self.magaza_master.columns:
-                    mag_kolonlar.append(kol)
+        # Master eşleştirmeleri merge yerine anahtar konumu + take ile yapılır:
+        # küp kopyalanmaz, satır sayısı değişmez, sadece yeni kolonlar eklenir
+        self.join_raporu = {}
+        self._urun_zenginlestir()
+        self._magaza_zenginlestir()
+        self._kpi_zenginlestir()
+        self._metrikleri_hesapla()
+
+    def _master_ekle(self, ad: str, master: pd.DataFrame, anahtar: str, kolonlar: List[str]):
+        """
+        Master tablodaki kolonları küpe anahtar eşleşmesiyle ekle (left join eşdeğeri).
+
+        Master'da tekrar eden anahtar varsa merge satırları çoğaltırdı; burada ilk kayıt
+        kullanılır ve durum join_raporu'na yazılır (satır patlaması uygulanmaz, raporlanır).
+        """
+        import time
+        baslangic = time.time()
+        kup_anahtar = self.stok_satis[anahtar]
+
+        tekrar = master[anahtar].duplicated()
+        rapor = {'kolonlar': kolonlar, 'tekrar_anahtar': int(tekrar.sum()), 'onlenen_satir': 0}
+        if rapor['tekrar_anahtar'] > 0:
+            fazla = master[anahtar].value_counts() - 1
+            fazla = fazla[fazla > 0]
+            rapor['onlenen_satir'] = int(kup_anahtar.map(fazla).fillna(0).sum())
+            rapor['ornek'] = fazla.index[:5].tolist()
+            print(f"   ⚠️ {ad}: {rapor['tekrar_anahtar']:,} tekrar eden {anahtar} - ilk kayıt kullanıldı "
+                  f"(merge {rapor['onlenen_satir']:,} fazla satır üretecekti). Örnek: {rapor['ornek']}")
+            master = master[~tekrar]
+
+        konum = pd.Index(master[anahtar]).get_indexer(kup_anahtar)
+        rapor['eslesen'] = int((konum >= 0).sum())
+        for kol in kolonlar:
+            # -1 (eşleşmeyen) konumlar NaN olur - merge(how='left') ile aynı davranış
+            degerler = pd.api.extensions.take(master[kol].values, konum, allow_fill=True)
+            self.stok_satis[kol] = pd.Series(degerler, index=self.stok_satis.index)
+
+        rapor['sure'] = round(time.time() - baslangic, 3)
+        self.join_raporu[ad] = rapor
+        return rapor
+
+    def _urun_zenginlestir(self):
+        """Ürün master kolonlarını (kategori, mg, marka...) küpe ekle"""
+        if not (len(self.urun_master) > 0 and 'urun_kod' in self.stok_satis.columns and 'urun_kod' in self.urun_master.columns):
+            return
+        
+        # Anahtarlar şemadan int32/int64 geliyor - iki taraf aynı genişlikte olsun
+        self._anahtarlari_esitle(self.urun_master, 'urun_kod')
+        
+        urun_kolonlar = ['urun_kod']
+        for kol in ['kategori_kod', 'umg', 'mg', 'marka_kod', 'nitelik', 'durum']:
+            if kol in self.urun_master.columns:
+                urun_kolonlar.append(kol)
+        
+        print(f"   Ürün join kolonları: {urun_kolonlar}")
+        print(f"   Stok urun_kod örnek: {self.stok_satis['urun_kod'].head(3).tolist()}")
+        print(f"   Master urun_kod örnek: {self.urun_master['urun_kod'].head(3).tolist()}")
+        
+        if len(urun_kolonlar) > 1:
+            before_len = len(self.stok_satis)
+            rapor = self._master_ekle('urun', self.urun_master, 'urun_kod', urun_kolonlar[1:])
+            print(f"   ✅ Ürün join: {before_len} → {len(self.stok_satis)} satır ({rapor['sure']:.2f}s)")
             
-            print(f"   Mağaza join kolonları: {mag_kolonlar}")
-            print(f"   Stok magaza_kod örnek: {self.stok_satis['magaza_kod'].head(3).tolist()}")
-            print(f"   Master magaza_kod örnek: {self.magaza_master['magaza_kod'].head(3).tolist()}")
+            # Join sonrası kontrol
+            if 'kategori_kod' in self.stok_satis.columns:
+                non_null = self.stok_satis['kategori_kod'].notna().sum()
+                print(f"   kategori_kod dolu: {non_null:,} / {len(self.stok_satis):,}")
+
+    def _magaza_zenginlestir(self):
+        """Mağaza master kolonlarını (il, bölge, tip, depo) küpe ekle"""
+        if not (len(self.magaza_master) > 0 and 'magaza_kod' in self.stok_satis.columns and 'magaza_kod' in self.magaza_master.columns):
+            return
+        
+        self._anahtarlari_esitle(self.magaza_master, 'magaza_kod')
+        
+        mag_kolonlar = ['magaza_kod']
+        for kol in ['il', 'bolge', 'tip', 'depo_kod']:
+            if kol in self.magaza_master.columns:
+                mag_kolonlar.append(kol)
+        
+        print(f"   Mağaza join kolonları: {mag_kolonlar}")
+        print(f"   Stok magaza_kod örnek: {self.stok_satis['magaza_kod'].head(3).tolist()}")
+        print(f"   Master magaza_kod örnek: {self.magaza_master['magaza_kod'].head(3).tolist()}")
+        
+        if len(mag_kolonlar) > 1:
+            before_len = len(self.stok_satis)
+            rapor = self._master_ekle('magaza', self.magaza_master, 'magaza_kod', mag_kolonlar[1:])
+            print(f"   ✅ Mağaza join: {before_len} → {len(self.stok_satis)} satır ({rapor['sure']:.2f}s)")
             
-            if len(mag_kolonlar) > 1:
-                before_len = len(self.stok_satis)
-                self.stok_satis = self.stok_satis.merge(
-                    self.magaza_master[mag_kolonlar],
-                    on='magaza_kod',
-                    how='left'
-                )
-                print(f"   ✅ Mağaza join: {before_len} → {len(self.stok_satis)} satır")
-                
-                # Join sonrası kontrol
-                if 'bolge' in self.stok_satis.columns:
-                    non_null = self.stok_satis['bolge'].notna().sum()
-                    print(f"   bolge dolu: {non_null:,} / {len(self.stok_satis):,}")
-        
-        # KPI ile join (mg bazlı)
-        if len(self.kpi) > 0 and 'mg' in self.stok_satis.columns:
-            kpi_df = self.kpi.copy()
-            if 'mg_id' in kpi_df.columns:
-                kpi_df = kpi_df.rename(columns={'mg_id': 'mg'})
+            # Join sonrası kontrol
+            if 'bolge' in self.stok_satis.columns:
+                non_null = self.stok_satis['bolge'].notna().sum()
+                print(f"   bolge dolu: {non_null:,} / {len(self.stok_satis):,}")
+
+    def _kpi_zenginlestir(self):
+        """KPI hedeflerini (min/max/forward cover) mg bazında küpe ekle"""
+        if not (len(self.kpi) > 0 and 'mg' in self.stok_satis.columns):
+            return
+        
+        kpi_df = self.kpi.copy()
+        if 'mg_id' in kpi_df.columns:
+            kpi_df = kpi_df.rename(columns={'mg_id': 'mg'})
+        
+        if 'mg' in kpi_df.columns:
+            # Eşleşmeyen ürünlerde mg NaN (float) kalır → 0 ile anahtar tipine çevir
+            self.stok_satis['mg'] = _anahtar_serisi(self.stok_satis['mg'])
+            self._anahtarlari_esitle(kpi_df, 'mg')
             
-            if 'mg' in kpi_df.columns:
-                # Veri tiplerini eşitle
-                self.stok_satis['mg'] = pd.to_numeric(self.stok_satis['mg'], errors='coerce').fillna(0).astype(int).astype(str)
-                kpi_df['mg'] = pd.to_numeric(kpi_df['mg'], errors='coerce').fillna(0).astype(int).astype(str)
-                
-                self.stok_satis = self.stok_satis.merge(
-                    kpi_df,
-                    on='mg',
-                    how='left'
-                )
-                print(f"   ✅ KPI join tamamlandı")
+            kpi_kolonlar = [k for k in kpi_df.columns if k != 'mg']
+            rapor = self._master_ekle('kpi', kpi_df, 'mg', kpi_kolonlar)
+            print(f"   ✅ KPI join tamamlandı ({rapor['sure']:.2f}s)")
+
+    def _metrikleri_hesapla(self):
+        """Kar, cover ve stok durumu gibi türetilmiş kolonları hesapla"""
         
         # Kar hesapla (kolonlar varsa)
         if 'ciro' in self.stok_satis.columns and 'smm' in self.stok_satis.columns:
@@ -377,8 +1540,10 @@ class KupVeri:
             self.stok_satis['cover'] = 0
             self.stok_satis['stok'] = 0
         
-        # Stok durumu değerlendirme
-        self.stok_satis['stok_durum'] = 'NORMAL'
+        # Stok durumu değerlendirme (sabit kategorili - satır başına string tutulmaz)
+        self.stok_satis['stok_durum'] = pd.Categorical.from_codes(
+            np.zeros(len(self.stok_satis), dtype='int8'), categories=STOK_DURUMLARI
+        )
         
         # min_deger ve max_deger kolonları yoksa varsayılan değer kullan
         if 'min_deger' not in self.stok_satis.columns:
@@ -400,6 +1565,9 @@ class KupVeri:
         mask_cover = self.stok_satis['cover'] > self.stok_satis['forward_cover'].fillna(4) * 3
         self.stok_satis.loc[mask_cover & (self.stok_satis['stok_durum'] == 'NORMAL'), 'stok_durum'] = 'YAVAS'
         
+        # Hesaplanan kolonları (kar, cover, varsayılan KPI'lar) da kompakt tiplere çek
+        self.stok_satis = _semaya_uygula(self.stok_satis, 'stok_satis')
+        
         # Detaylı debug bilgisi
         print(f"\n📊 VERİ DURUMU:")
         print(f"   - Toplam kayıt: {len(self.stok_satis):,}")
@@ -415,6 +1583,155 @@ class KupVeri:
                 print(f"   ❌ {kol}: KOLON YOK")
 
 
+# =============================================================================
+# RAPOR KOLON ÇÖZÜMLEME
+# =============================================================================
+
+# Rapor başlıkları: rapor -> {kanonik ad: [(anahtar kelimeler, hariç kelimeler), ...]}
+# Alternatifler sırayla denenir; her alternatifte rapordaki ilk uyan başlık alınır.
+RAPOR_KOLONLARI = {
+    'trading': {
+        'ana_grup': [(['ana grup'], []), (['ana_grup'], [])],
+        'ara_grup': [(['ara grup'], []), (['ara_grup'], [])],
+        'alt_grup': [(['alt grup'], []), (['alt_grup'], [])],
+        'ciro_achieved': [(['achieved', 'sales', 'budget', 'value', 'try'], ['profit', 'unit'])],
+        'ty_cover': [(['ty', 'store', 'cover'], ['lfl', 'ly'])],
+        'ly_cover': [(['ly', 'store', 'cover'], ['lfl'])],
+        'ty_marj': [(['ty', 'gross', 'margin', 'try'], ['lfl', 'ly', 'budget'])],
+        'ly_marj': [(['ly', 'lfl', 'gross', 'margin'], ['ty', 'budget'])],
+        'lfl_ciro': [(['lfl', 'sales', 'value', 'tyvsly', 'lc'], ['unit', 'profit', 'vat'])],
+        'lfl_adet': [(['lfl', 'sales', 'unit', 'tyvsly'], ['value', 'cost', 'price'])],
+        'lfl_stok': [(['lfl', 'stock', 'unit', 'tyvsly'], [])],
+        'lfl_kar': [(['lfl', 'profit', 'tyvsly'], ['unit'])],
+        'fiyat_artis': [(['lfl', 'unit', 'sales', 'price', 'tyvsly', 'lc'], ['cost', 'stock'])],
+        # Pay kolonları
+        'adet_pay': [(['ty', 'lfl', 'sales', 'unit'], ['tyvsly', 'price', 'cost', 'budget'])],
+        'stok_pay': [(['ty', 'avg', 'store', 'stock', 'cost', 'lc'], ['tyvsly'])],
+        'ciro_pay': [(['ty', 'lfl', 'sales', 'value', 'lc'], ['tyvsly'])],
+        'kar_pay': [(['ty', 'lfl', 'gross', 'profit', 'lc'], ['tyvsly'])],
+    },
+    'cover_diagram': {
+        'alt_grup': [(['alt', 'grup'], []), (['grup'], [])],
+        'magaza': [(['store'], []), (['mağaza'], [])],
+        'cover': [(['cover'], []), (['back', 'cover'], [])],
+        'stok': [(['stock', 'unit'], []), (['stok'], [])],
+        'satis_adet': [(['sales', 'unit'], []), (['satış', 'adet'], [])],
+        'satis_tutar': [(['sales', 'value'], []), (['satış', 'tutar'], [])],
+        'siparis': [(['sipariş'], []), (['toplam', 'sip'], [])],
+        'lfl_stok': [(['lfl', 'stok'], []), (['stok', 'değişim'], [])],
+        'lfl_satis': [(['lfl', 'satış'], []), (['satış', 'değişim'], [])],
+    },
+    'kapasite': {
+        'magaza': [(['store'], []), (['mağaza'], [])],
+        'karli_hizli': [(['karlı'], []), (['hızlı'], []), (['metrik'], [])],
+        'kapasite_dm3': [(['capacity', 'dm3'], []), (['kapasite'], [])],
+        'fiili_doluluk': [(['fiili', 'doluluk'], [])],
+        'nihai_doluluk': [(['nihai', 'doluluk'], [])],
+        'cover': [(['store', 'cover'], []), (['cover'], [])],
+        'stok_adet': [(['avg', 'store', 'stock', 'unit'], []), (['stok', 'adet'], [])],
+        'satis_adet': [(['sales', 'unit'], []), (['satış', 'adet'], [])],
+        'satis_tutar': [(['sales', 'value'], []), (['satış', 'tutar'], [])],
+        'lfl_stok': [(['lfl', 'stok'], [])],
+        'lfl_satis_adet': [(['lfl', 'satış', 'adet'], [])],
+        'lfl_satis_tutar': [(['lfl', 'satış', 'tutar'], [])],
+        'kar_marj': [(['kar', 'marj'], []), (['marj'], [])],
+    },
+    'siparis_takip': {
+        'ana_grup': [(['ana', 'grup'], []), (['yeni', 'ana'], [])],
+        'ara_grup': [(['ara', 'grup'], [])],
+        'alt_grup': [(['alt', 'grup'], []), (['yeni', 'alt'], [])],
+        'alim_butce': [(['onaylı', 'alım', 'bütçe', 'tutar'], ['adet'])],
+        'siparis': [(['total', 'sipariş', 'tutar'], ['adet', 'hariç'])],
+        'depo_giren': [(['depoya', 'giren', 'tutar'], ['adet', 'hariç'])],
+        'bekleyen': [(['bekleyen', 'sipariş', 'tutar'], ['adet', 'hariç'])],
+        'gerceklesme': [(['depo', 'giriş', 'alım', 'bütçe', 'oran'], [])],
+    },
+}
+
+# Eşleştirmeden önce başlıkta yapılan ek değişiklikler (küçük harfe çevirmeye ek olarak)
+BASLIK_DEGISIMLERI = {
+    'kapasite': [('_', ' '), ('#', '')],
+}
+
+# Trading metrikleri (hiyerarşi dışı) ve yüzde olarak okunmayanlar
+TRADING_METRIKLERI = [ad for ad in RAPOR_KOLONLARI['trading'] if ad not in ('ana_grup', 'ara_grup', 'alt_grup')]
+TRADING_DUZ_METRIKLER = {'ty_cover', 'ly_cover'}
+
+
+def _baslik_esle(kolonlar, tanimlar: dict, degisimler=()) -> Dict[str, Optional[str]]:
+    """Ham başlıkları kanonik adlara eşle (bulunamayan None) - her başlık bir kez normalize edilir"""
+    normal = []
+    for kol in kolonlar:
+        ad = str(kol).strip().lower()
+        for eski, yeni in degisimler:
+            ad = ad.replace(eski, yeni)
+        normal.append((kol, ad))
+
+    harita = {}
+    for kanonik, alternatifler in tanimlar.items():
+        harita[kanonik] = None
+        for anahtarlar, haric in alternatifler:
+            bulunan = next((kol for kol, ad in normal
+                            if all(k in ad for k in anahtarlar) and not any(e in ad for e in haric)), None)
+            if bulunan is not None:
+                harita[kanonik] = bulunan
+                break
+    return harita
+
+
+# =============================================================================
+# TRADING NORMALİZASYONU
+# =============================================================================
+
+def _trading_normallestir(ham: pd.DataFrame, harita: Dict[str, Optional[str]]) -> pd.DataFrame:
+    """
+    Trading raporunu bir kez tipli tabloya çevirir (satır başına parse yerine kolon bazlı).
+    harita: KupVeri.kolon_haritasi('trading')
+
+    Hiyerarşi:
+    - ANA: ana grup dolu, ara ve alt boş (veya eski format "Toplam SOFRA")
+    - ARA: ana ve ara dolu, alt boş (veya eski format "Toplam ÇAY KAHVE")
+    - ALT: alt grup dolu ve toplam satırı değil
+    - GENEL: yukarıdakilere girmeyen "Genel Toplam" satırı (genel_toplam kolonu her durumda işaretler)
+    """
+    print(f"Trading kolonları: {[str(c).strip() for c in ham.columns][:10]}")
+    print(f"Hiyerarşi kolonları: ana={harita['ana_grup']}, ara={harita['ara_grup']}, alt={harita['alt_grup']}")
+
+    bos = pd.Series('', index=ham.index)
+    tablo = pd.DataFrame({
+        ad: _metin_serisi(ham[harita[ad]]) if harita[ad] is not None else bos
+        for ad in ('ana_grup', 'ara_grup', 'alt_grup')
+    })
+
+    for ad in TRADING_METRIKLERI:
+        kol = harita[ad]
+        if kol is None:
+            tablo[ad] = 0.0
+        else:
+            tablo[ad] = _sayi_serisi(ham[kol]) if ad in TRADING_DUZ_METRIKLER else _yuzde_serisi(ham[kol])
+
+    # Seviye
+    ana, ara, alt = tablo['ana_grup'], tablo['ara_grup'], tablo['alt_grup']
+    ana_lower = ana.str.lower()
+    genel = ana_lower.str.contains('genel toplam', regex=False)
+    ana_toplam = ~genel & (ana_lower != 'toplam') & (ana != '') & (ara == '') & (alt == '')
+    ara_toplam = (((ana != '') & (ara != '')) | ara.str.startswith('Toplam ')) & (alt == '')
+    alt_detay = (alt != '') & ~alt.str.startswith('Toplam')
+
+    tablo['seviye'] = np.select([ana_toplam, ara_toplam, alt_detay, genel],
+                                ['ANA', 'ARA', 'ALT', 'GENEL'], default='')
+    tablo['genel_toplam'] = genel
+    tablo['ad'] = np.select([ana_toplam, ara_toplam],
+                            [ana.str.replace('Toplam ', '', regex=False),
+                             ara.str.replace('Toplam ', '', regex=False)], default=alt)
+    return tablo
+
+
+def _ciroya_gore(secili: pd.DataFrame) -> List[dict]:
+    """Seçili satırlar ciro payına göre azalan (eşitlikte rapor sırası korunur)"""
+    return secili.sort_values('ciro_pay', ascending=False, kind='stable').to_dict('records')
+
+
 # =============================================================================
 # ARAÇ FONKSİYONLARI
 # =============================================================================
@@ -438,187 +1755,18 @@ def trading_analiz(kup: KupVeri, ana_grup: str = None, ara_grup: str = None) ->
         return "❌ Trading raporu yüklenmemiş."
     
     sonuc = []
-    df = kup.trading.copy()
-    
-    # Kolon isimlerini normalize et
-    df.columns = [str(c).strip() for c in df.columns]
-    kolonlar = list(df.columns)
-    print(f"Trading kolonları: {kolonlar[:10]}")
-    
-    # Hiyerarşi kolonlarını bul
-    col_ana_grup = None
-    col_ara_grup = None
-    col_alt_grup = None
-    
-    for kol in df.columns:
-        kol_lower = str(kol).lower()
-        if 'ana grup' in kol_lower or 'ana_grup' in kol_lower:
-            col_ana_grup = kol
-        elif 'ara grup' in kol_lower or 'ara_grup' in kol_lower:
-            col_ara_grup = kol
-        elif 'alt grup' in kol_lower or 'alt_grup' in kol_lower:
-            col_alt_grup = kol
-    
-    print(f"Hiyerarşi kolonları: ana={col_ana_grup}, ara={col_ara_grup}, alt={col_alt_grup}")
-    
-    # Kolon mapping fonksiyonu
-    def find_col(keywords, exclude=[]):
-        for kol in df.columns:
-            kol_lower = str(kol).lower()
-            if all(k in kol_lower for k in keywords) and not any(e in kol_lower for e in exclude):
-                return kol
-        return None
-    
-    # Kritik kolonları bul
-    col_ciro_achieved = find_col(['achieved', 'sales', 'budget', 'value', 'try'], ['profit', 'unit'])
-    col_ty_cover = find_col(['ty', 'store', 'cover'], ['lfl', 'ly'])
-    col_ly_cover = find_col(['ly', 'store', 'cover'], ['lfl'])
-    col_ty_marj = find_col(['ty', 'gross', 'margin', 'try'], ['lfl', 'ly', 'budget'])
-    col_ly_marj = find_col(['ly', 'lfl', 'gross', 'margin'], ['ty', 'budget'])
-    col_lfl_ciro = find_col(['lfl', 'sales', 'value', 'tyvsly', 'lc'], ['unit', 'profit', 'vat'])
-    col_lfl_adet = find_col(['lfl', 'sales', 'unit', 'tyvsly'], ['value', 'cost', 'price'])
-    col_lfl_stok = find_col(['lfl', 'stock', 'unit', 'tyvsly'], [])
-    col_fiyat_artis = find_col(['lfl', 'unit', 'sales', 'price', 'tyvsly', 'lc'], ['cost', 'stock'])
-    col_lfl_kar = find_col(['lfl', 'profit', 'tyvsly'], ['unit'])
-    
-    # PAY KOLONLARI
-    col_adet_pay = find_col(['ty', 'lfl', 'sales', 'unit'], ['tyvsly', 'price', 'cost', 'budget'])
-    col_stok_pay = find_col(['ty', 'avg', 'store', 'stock', 'cost', 'lc'], ['tyvsly'])
-    col_ciro_pay = find_col(['ty', 'lfl', 'sales', 'value', 'lc'], ['tyvsly'])
-    col_kar_pay = find_col(['ty', 'lfl', 'gross', 'profit', 'lc'], ['tyvsly'])
-    
-    # Parse fonksiyonu
-    def parse_val(val):
-        if pd.isna(val):
-            return 0
-        if isinstance(val, str):
-            val = val.replace('%', '').replace(',', '.').replace(' ', '').strip()
-            try:
-                return float(val)
-            except:
-                return 0
-        try:
-            return float(val)
-        except:
-            return 0
-    
-    def parse_pct(val):
-        """Yüzde değeri parse et - ondalık ise 100 ile çarp"""
-        v = parse_val(val)
-        if -2 < v < 2 and v != 0:
-            return v * 100
-        return v
-    
-    # Satır verilerini çıkar
-    def extract_row(row):
-        # NaN değerleri boş string'e çevir
-        def clean_str(val):
-            if pd.isna(val) or str(val).lower() == 'nan':
-                return ''
-            return str(val).strip()
-        
-        return {
-            'ana_grup': clean_str(row.get(col_ana_grup, '')) if col_ana_grup else '',
-            'ara_grup': clean_str(row.get(col_ara_grup, '')) if col_ara_grup else '',
-            'alt_grup': clean_str(row.get(col_alt_grup, '')) if col_alt_grup else '',
-            'ciro_achieved': parse_pct(row.get(col_ciro_achieved, 0)),
-            'ty_cover': parse_val(row.get(col_ty_cover, 0)),
-            'ly_cover': parse_val(row.get(col_ly_cover, 0)),
-            'ty_marj': parse_pct(row.get(col_ty_marj, 0)),
-            'ly_marj': parse_pct(row.get(col_ly_marj, 0)),
-            'lfl_ciro': parse_pct(row.get(col_lfl_ciro, 0)),
-            'lfl_adet': parse_pct(row.get(col_lfl_adet, 0)),
-            'lfl_stok': parse_pct(row.get(col_lfl_stok, 0)),
-            'lfl_kar': parse_pct(row.get(col_lfl_kar, 0)),
-            'fiyat_artis': parse_pct(row.get(col_fiyat_artis, 0)),
-            'adet_pay': parse_pct(row.get(col_adet_pay, 0)),
-            'stok_pay': parse_pct(row.get(col_stok_pay, 0)),
-            'ciro_pay': parse_pct(row.get(col_ciro_pay, 0)),
-            'kar_pay': parse_pct(row.get(col_kar_pay, 0))
-        }
-    
-    # Toplam satırlarını filtrele
-    def is_toplam(row_data):
-        """Toplam satırı mı kontrol et"""
-        ana = row_data['ana_grup'].lower()
-        ara = row_data['ara_grup'].lower()
-        if 'toplam' in ana or 'genel toplam' in ana:
-            return True
-        if 'toplam' in ara:
-            return True
-        return False
-    
-    def is_ana_grup_toplam(row_data):
-        """Ana grup toplam satırı mı?
-        Yeni mantık: Ara grup ve Alt grup BOŞ ise bu ana grup toplamıdır
-        Örn: Sofra, NaN, NaN → Ana Grup Toplamı
-        """
-        ana = row_data['ana_grup'].strip()
-        ara = row_data['ara_grup'].strip()
-        alt = row_data['alt_grup'].strip()
-        
-        # Genel Toplam satırını hariç tut
-        if 'genel toplam' in ana.lower() or 'toplam' == ana.lower():
-            return False
-        
-        # Ana grup dolu, ara ve alt grup boş ise → Ana Grup Toplamı
-        if ana != '' and ara == '' and alt == '':
-            return True
-        
-        # Eski format: "Toplam SOFRA" gibi
-        if ana.startswith('Toplam ') and ara == '' and alt == '':
-            return True
-            
-        return False
-    
-    def is_ara_grup_toplam(row_data):
-        """Ara grup toplam satırı mı?
-        Yeni mantık: Alt grup BOŞ ise bu ara grup toplamıdır
-        Örn: Sofra, Çay Kahve, NaN → Ara Grup Toplamı
-        """
-        ana = row_data['ana_grup'].strip()
-        ara = row_data['ara_grup'].strip()
-        alt = row_data['alt_grup'].strip()
-        
-        # Ana ve Ara dolu, Alt boş ise → Ara Grup Toplamı
-        if ana != '' and ara != '' and alt == '':
-            return True
-        
-        # Eski format: "Toplam ÇAY KAHVE" gibi
-        if ara.startswith('Toplam ') and alt == '':
-            return True
-            
-        return False
-    
-    def is_alt_grup_detay(row_data):
-        """Alt grup detay satırı mı? (3 seviye de dolu)"""
-        ana = row_data['ana_grup'].strip()
-        ara = row_data['ara_grup'].strip()
-        alt = row_data['alt_grup'].strip()
-        return ana != '' and ara != '' and alt != ''
-    
-    # ====================================================================
-    # VERİYİ SEVİYEYE GÖRE FİLTRELE
-    # ====================================================================
-    
-    all_rows = [extract_row(row) for _, row in df.iterrows()]
+    tablo = kup.trading_tablosu()
+    seviye = tablo['seviye']
     
     # Genel Toplam satırını bul
-    genel_toplam = None
-    for r in all_rows:
-        if r['ana_grup'] == 'Genel Toplam' or 'genel toplam' in r['ana_grup'].lower():
-            genel_toplam = r
-            break
+    genel_satirlar = tablo[tablo['genel_toplam']]
+    genel_toplam = genel_satirlar.iloc[0].to_dict() if len(genel_satirlar) > 0 else None
     
     if ana_grup is None:
         # ŞİRKET ÖZETİ + ANA GRUPLAR
         # Ana grup toplamlarını bul (Toplam RENKLİ KOZMETİK, Toplam CİLT BAKIM...)
-        ana_gruplar = [r for r in all_rows if is_ana_grup_toplam(r)]
-        
-        # Toplam kelimesini kaldır ve sırala
-        for ag in ana_gruplar:
-            ag['ad'] = ag['ana_grup'].replace('Toplam ', '')
-        ana_gruplar.sort(key=lambda x: x['ciro_pay'], reverse=True)
+        # ('Toplam ' öneki ad kolonunda zaten kaldırılmış)
+        ana_gruplar = _ciroya_gore(tablo[seviye == 'ANA'])
         
         # Şirket özeti
         sonuc.append("=" * 60)
@@ -692,35 +1840,20 @@ def trading_analiz(kup: KupVeri, ana_grup: str = None, ara_grup: str = None) ->
         
         # Bu ana grubun ara grup toplamlarını bul
         # Hem tam eşleşme hem de içerme kontrolü yap
-        ara_gruplar = []
-        for r in all_rows:
-            r_ana = r['ana_grup'].upper().strip()
-            # "Toplam SOFRA" veya "SOFRA" eşleşmesi
-            ana_match = (r_ana == ana_grup_upper or 
-                        r_ana == f"TOPLAM {ana_grup_upper}" or
-                        ana_grup_upper in r_ana or
-                        r_ana.replace('TOPLAM ', '') == ana_grup_upper)
-            
-            if ana_match and is_ara_grup_toplam(r):
-                r['ad'] = r['ara_grup'].replace('Toplam ', '')
-                ara_gruplar.append(r)
+        r_ana = tablo['ana_grup'].str.upper().str.strip()
+        # "Toplam SOFRA" veya "SOFRA" eşleşmesi
+        ana_match = ((r_ana == ana_grup_upper) |
+                     r_ana.str.contains(ana_grup_upper, regex=False) |
+                     (r_ana.str.replace('TOPLAM ', '', regex=False) == ana_grup_upper))
+        
+        ara_gruplar = _ciroya_gore(tablo[ana_match & (seviye == 'ARA')])
         
         if not ara_gruplar:
             # Belki direkt alt gruplar var, ara grup olmadan
-            for r in all_rows:
-                r_ana = r['ana_grup'].upper().strip()
-                ana_match = (r_ana == ana_grup_upper or 
-                            ana_grup_upper in r_ana or
-                            r_ana.replace('TOPLAM ', '') == ana_grup_upper)
-                
-                if ana_match and r['alt_grup'] != '' and not r['alt_grup'].startswith('Toplam'):
-                    r['ad'] = r['alt_grup']
-                    ara_gruplar.append(r)
+            ara_gruplar = _ciroya_gore(tablo[ana_match & (seviye == 'ALT')])
             
             if ara_gruplar:
                 # Alt grupları göster
-                ara_gruplar.sort(key=lambda x: x['ciro_pay'], reverse=True)
-                
                 sonuc.append("=" * 60)
                 sonuc.append(f"📊 {ana_grup_upper} - ALT GRUP DETAYI")
                 sonuc.append("=" * 60 + "\n")
@@ -738,8 +1871,6 @@ def trading_analiz(kup: KupVeri, ana_grup: str = None, ara_grup: str = None) ->
             
             return f"❌ '{ana_grup}' ana grubu bulunamadı. Mevcut ana grupları görmek için trading_analiz() çağırın."
         
-        ara_gruplar.sort(key=lambda x: x['ciro_pay'], reverse=True)
-        
         sonuc.append("=" * 60)
         sonuc.append(f"📊 {ana_grup_upper} - ARA GRUP DETAYI")
         sonuc.append("=" * 60 + "\n")
@@ -771,21 +1902,13 @@ def trading_analiz(kup: KupVeri, ana_grup: str = None, ara_grup: str = None) ->
         ara_grup_upper = ara_grup.upper()
         
         # Bu ara grubun alt gruplarını bul (toplam olmayanlar)
-        alt_gruplar = []
-        for r in all_rows:
-            ana_match = r['ana_grup'].upper() == ana_grup_upper
-            ara_match = r['ara_grup'].upper() == ara_grup_upper
-            has_alt = r['alt_grup'] != '' and not r['alt_grup'].startswith('Toplam')
-            
-            if ana_match and ara_match and has_alt:
-                r['ad'] = r['alt_grup']
-                alt_gruplar.append(r)
+        ana_match = tablo['ana_grup'].str.upper() == ana_grup_upper
+        ara_match = tablo['ara_grup'].str.upper() == ara_grup_upper
+        alt_gruplar = _ciroya_gore(tablo[ana_match & ara_match & (seviye == 'ALT')])
         
         if not alt_gruplar:
             return f"❌ '{ana_grup} > {ara_grup}' altında ürün grubu bulunamadı."
         
-        alt_gruplar.sort(key=lambda x: x['ciro_pay'], reverse=True)
-        
         sonuc.append("=" * 60)
         sonuc.append(f"📊 {ana_grup_upper} > {ara_grup_upper} - MAL GRUBU DETAYI")
         sonuc.append("=" * 60 + "\n")
@@ -885,23 +2008,12 @@ def cover_diagram_analiz(kup: KupVeri, alt_grup: str = None, magaza: str = None)
     sonuc.append("📊 COVER DİAGRAM ANALİZİ")
     sonuc.append("=" * 60 + "\n")
     
-    # Kolon mapping
-    def find_col(keywords):
-        for kol in kolonlar:
-            kol_lower = str(kol).lower()
-            if all(k in kol_lower for k in keywords):
-                return kol
-        return None
-    
-    col_alt_grup = find_col(['alt', 'grup']) or find_col(['grup'])
-    col_magaza = find_col(['store']) or find_col(['mağaza'])
-    col_cover = find_col(['cover']) or find_col(['back', 'cover'])
-    col_stok = find_col(['stock', 'unit']) or find_col(['stok'])
-    col_satis_adet = find_col(['sales', 'unit']) or find_col(['satış', 'adet'])
-    col_satis_tutar = find_col(['sales', 'value']) or find_col(['satış', 'tutar'])
-    col_siparis = find_col(['sipariş']) or find_col(['toplam', 'sip'])
-    col_lfl_stok = find_col(['lfl', 'stok']) or find_col(['stok', 'değişim'])
-    col_lfl_satis = find_col(['lfl', 'satış']) or find_col(['satış', 'değişim'])
+    # Kolon mapping (yükleme başına bir kez çözülür)
+    harita = kup.kolon_haritasi('cover_diagram')
+    col_alt_grup = harita['alt_grup']
+    col_magaza = harita['magaza']
+    col_cover = harita['cover']
+    col_lfl_satis = harita['lfl_satis']
     
     print(f"Cover Diagram kolonları: {kolonlar[:10]}")
     
@@ -917,21 +2029,12 @@ def cover_diagram_analiz(kup: KupVeri, alt_grup: str = None, magaza: str = None)
     if len(df) == 0:
         return "❌ Filtreye uygun veri bulunamadı."
     
-    # Parse fonksiyonu
-    def parse_val(val):
-        if pd.isna(val):
-            return 0
-        try:
-            return float(str(val).replace('%', '').replace(',', '.').strip())
-        except:
-            return 0
-    
     # ÖZET ANALİZ
     sonuc.append(f"📊 GENEL ÖZET ({len(df)} satır)")
     sonuc.append("-" * 50)
     
     if col_cover:
-        df['_cover'] = df[col_cover].apply(parse_val)
+        df['_cover'] = kup.sayisal_kolon('cover_diagram', col_cover)
         avg_cover = df['_cover'].mean()
         cover_yuksek = len(df[df['_cover'] > 12])
         cover_dusuk = len(df[df['_cover'] < 4])
@@ -940,7 +2043,7 @@ def cover_diagram_analiz(kup: KupVeri, alt_grup: str = None, magaza: str = None)
         sonuc.append(f"   ⚠️ Cover < 4 hafta: {cover_dusuk} satır")
     
     if col_lfl_satis:
-        df['_lfl_satis'] = df[col_lfl_satis].apply(parse_val)
+        df['_lfl_satis'] = kup.sayisal_kolon('cover_diagram', col_lfl_satis)
         avg_lfl = df['_lfl_satis'].mean()
         lfl_neg = len(df[df['_lfl_satis'] < -20])
         sonuc.append(f"   LFL Satış Ort: %{avg_lfl:+.1f}")
@@ -994,27 +2097,17 @@ def kapasite_analiz(kup: KupVeri, magaza: str = None) -> str:
     sonuc.append("📦 MAĞAZA KAPASİTE VE PERFORMANS ANALİZİ")
     sonuc.append("=" * 70 + "\n")
     
-    # Kolon mapping - daha esnek
-    def find_col(keywords):
-        for kol in kolonlar:
-            kol_lower = str(kol).lower().replace('_', ' ').replace('#', '')
-            if all(k in kol_lower for k in keywords):
-                return kol
-        return None
-    
-    col_magaza = find_col(['store']) or find_col(['mağaza']) or kolonlar[0]
-    col_karli_hizli = find_col(['karlı']) or find_col(['hızlı']) or find_col(['metrik'])
-    col_kapasite_dm3 = find_col(['capacity', 'dm3']) or find_col(['kapasite'])
-    col_fiili_doluluk = find_col(['fiili', 'doluluk'])
-    col_nihai_doluluk = find_col(['nihai', 'doluluk'])
-    col_cover = find_col(['store', 'cover']) or find_col(['cover'])
-    col_stok_adet = find_col(['avg', 'store', 'stock', 'unit']) or find_col(['stok', 'adet'])
-    col_satis_adet = find_col(['sales', 'unit']) or find_col(['satış', 'adet'])
-    col_satis_tutar = find_col(['sales', 'value']) or find_col(['satış', 'tutar'])
-    col_lfl_stok = find_col(['lfl', 'stok'])
-    col_lfl_satis_adet = find_col(['lfl', 'satış', 'adet'])
-    col_lfl_satis_tutar = find_col(['lfl', 'satış', 'tutar'])
-    col_kar_marj = find_col(['kar', 'marj']) or find_col(['marj'])
+    # Kolon mapping (yükleme başına bir kez çözülür, '_' ve '#' başlıkta yok sayılır)
+    harita = kup.kolon_haritasi('kapasite')
+    col_magaza = harita['magaza'] or kolonlar[0]
+    col_karli_hizli = harita['karli_hizli']
+    col_fiili_doluluk = harita['fiili_doluluk']
+    col_cover = harita['cover']
+    col_stok_adet = harita['stok_adet']
+    col_satis_adet = harita['satis_adet']
+    col_satis_tutar = harita['satis_tutar']
+    col_lfl_satis_tutar = harita['lfl_satis_tutar']
+    col_kar_marj = harita['kar_marj']
     
     print(f"Kapasite kolonları bulundu: magaza={col_magaza}, doluluk={col_fiili_doluluk}, cover={col_cover}, stok={col_stok_adet}, satis={col_satis_adet}")
     
@@ -1024,38 +2117,15 @@ def kapasite_analiz(kup: KupVeri, magaza: str = None) -> str:
         sonuc.append(f"🏪 Mağaza Filtresi: {magaza}\n")
     
     if len(df) == 0:
-        return "❌ Filtreye uygun mağaza bulunamadı."
-    
-    # Parse fonksiyonları
-    def parse_val(val):
-        if pd.isna(val):
-            return 0
-        try:
-            return float(str(val).replace('%', '').replace(',', '.').strip())
-        except:
-            return 0
-    
-    def parse_pct(val):
-        v = parse_val(val)
-        if -2 < v < 2 and v != 0:
-            return v * 100
-        return v
+        return "❌ Filtreye uygun mağaza bulunamadı."
     
-    # Kolonları parse et
-    if col_fiili_doluluk:
-        df['_fiili'] = df[col_fiili_doluluk].apply(parse_pct)
-    if col_cover:
-        df['_cover'] = df[col_cover].apply(parse_val)
-    if col_stok_adet:
-        df['_stok_adet'] = df[col_stok_adet].apply(parse_val)
-    if col_satis_adet:
-        df['_satis_adet'] = df[col_satis_adet].apply(parse_val)
-    if col_satis_tutar:
-        df['_satis_tutar'] = df[col_satis_tutar].apply(parse_val)
-    if col_lfl_satis_tutar:
-        df['_lfl_satis'] = df[col_lfl_satis_tutar].apply(parse_pct)
-    if col_kar_marj:
-        df['_marj'] = df[col_kar_marj].apply(parse_pct)
+    # Kolonları parse et (rapor yüklemesi başına bir kez, index ile eşleşir)
+    for hedef, kol, yuzde in [('_fiili', col_fiili_doluluk, True), ('_cover', col_cover, False),
+                              ('_stok_adet', col_stok_adet, False), ('_satis_adet', col_satis_adet, False),
+                              ('_satis_tutar', col_satis_tutar, False), ('_lfl_satis', col_lfl_satis_tutar, True),
+                              ('_marj', col_kar_marj, True)]:
+        if kol:
+            df[hedef] = kup.sayisal_kolon('kapasite', kol, yuzde)
     
     # =========================================
     # 1. GENEL ÖZET
@@ -1263,22 +2333,14 @@ def siparis_takip_analiz(kup: KupVeri, ana_grup: str = None) -> str:
     sonuc.append("📦 SİPARİŞ VE SATINALMA TAKİP")
     sonuc.append("=" * 60 + "\n")
     
-    # Kolon mapping
-    def find_col(keywords, exclude=[]):
-        for kol in kolonlar:
-            kol_lower = str(kol).lower()
-            if all(k in kol_lower for k in keywords) and not any(e in kol_lower for e in exclude):
-                return kol
-        return None
-    
-    col_ana_grup = find_col(['ana', 'grup']) or find_col(['yeni', 'ana'])
-    col_ara_grup = find_col(['ara', 'grup'])
-    col_alt_grup = find_col(['alt', 'grup']) or find_col(['yeni', 'alt'])
-    col_alim_butce = find_col(['onaylı', 'alım', 'bütçe', 'tutar'], ['adet'])
-    col_siparis = find_col(['total', 'sipariş', 'tutar'], ['adet', 'hariç'])
-    col_depo_giren = find_col(['depoya', 'giren', 'tutar'], ['adet', 'hariç'])
-    col_bekleyen = find_col(['bekleyen', 'sipariş', 'tutar'], ['adet', 'hariç'])
-    col_gerceklesme = find_col(['depo', 'giriş', 'alım', 'bütçe', 'oran'])
+    # Kolon mapping (yükleme başına bir kez çözülür)
+    harita = kup.kolon_haritasi('siparis_takip')
+    col_ana_grup = harita['ana_grup']
+    col_alt_grup = harita['alt_grup']
+    col_alim_butce = harita['alim_butce']
+    col_siparis = harita['siparis']
+    col_depo_giren = harita['depo_giren']
+    col_bekleyen = harita['bekleyen']
     
     print(f"Sipariş Takip kolonları: {kolonlar[:10]}")
     
@@ -1290,45 +2352,35 @@ def siparis_takip_analiz(kup: KupVeri, ana_grup: str = None) -> str:
     if len(df) == 0:
         return "❌ Filtreye uygun veri bulunamadı."
     
-    # Parse fonksiyonu
-    def parse_val(val):
-        if pd.isna(val):
-            return 0
-        try:
-            return float(str(val).replace('%', '').replace(',', '.').replace(' ', '').strip())
-        except:
-            return 0
-    
-    def parse_pct(val):
-        v = parse_val(val)
-        if -2 < v < 2 and v != 0:
-            return v * 100
-        return v
+    # Tutar kolonları (rapor yüklemesi başına bir kez parse edilir, index ile eşleşir)
+    for hedef, kol in [('_butce', col_alim_butce), ('_siparis', col_siparis),
+                       ('_giren', col_depo_giren), ('_bekleyen', col_bekleyen)]:
+        df[hedef] = kup.sayisal_kolon('siparis_takip', kol) if kol else 0
     
     # GENEL ÖZET
     sonuc.append(f"📊 GENEL ÖZET ({len(df)} satır)")
     sonuc.append("-" * 50)
     
     if col_alim_butce:
-        toplam_butce = df[col_alim_butce].apply(parse_val).sum()
+        toplam_butce = df['_butce'].sum()
         sonuc.append(f"   Onaylı Alım Bütçe: {toplam_butce/1e6:,.1f}M TL")
     
     if col_siparis:
-        toplam_siparis = df[col_siparis].apply(parse_val).sum()
+        toplam_siparis = df['_siparis'].sum()
         sonuc.append(f"   Total Sipariş: {toplam_siparis/1e6:,.1f}M TL")
     
     if col_depo_giren:
-        toplam_giren = df[col_depo_giren].apply(parse_val).sum()
+        toplam_giren = df['_giren'].sum()
         sonuc.append(f"   Depoya Giren: {toplam_giren/1e6:,.1f}M TL")
     
     if col_bekleyen:
-        toplam_bekleyen = df[col_bekleyen].apply(parse_val).sum()
+        toplam_bekleyen = df['_bekleyen'].sum()
         sonuc.append(f"   Bekleyen Sipariş: {toplam_bekleyen/1e6:,.1f}M TL")
     
     # Gerçekleşme oranı
     if col_alim_butce and col_depo_giren:
-        butce = df[col_alim_butce].apply(parse_val).sum()
-        giren = df[col_depo_giren].apply(parse_val).sum()
+        butce = df['_butce'].sum()
+        giren = df['_giren'].sum()
         if butce > 0:
             oran = giren / butce * 100
             emoji = "✅" if oran >= 80 else ("⚠️" if oran >= 60 else "🔴")
@@ -1340,11 +2392,6 @@ def siparis_takip_analiz(kup: KupVeri, ana_grup: str = None) -> str:
         sonuc.append("-" * 60)
         
         # Grupla
-        df['_butce'] = df[col_alim_butce].apply(parse_val) if col_alim_butce else 0
-        df['_siparis'] = df[col_siparis].apply(parse_val) if col_siparis else 0
-        df['_giren'] = df[col_depo_giren].apply(parse_val) if col_depo_giren else 0
-        df['_bekleyen'] = df[col_bekleyen].apply(parse_val) if col_bekleyen else 0
-        
         grup_ozet = df.groupby(col_ana_grup).agg({
             '_butce': 'sum',
             '_siparis': 'sum',
@@ -1367,7 +2414,6 @@ def siparis_takip_analiz(kup: KupVeri, ana_grup: str = None) -> str:
     
     # BEKLEYEN SİPARİŞ UYARISI
     if col_bekleyen:
-        df['_bekleyen'] = df[col_bekleyen].apply(parse_val)
         bekleyen_yuksek = df[df['_bekleyen'] > df['_bekleyen'].quantile(0.9)]
         
         if len(bekleyen_yuksek) > 0:
@@ -1576,21 +2622,23 @@ def genel_ozet(kup: KupVeri) -> str:
     
     sonuc = []
     
-    # Toplam metrikler
-    toplam_stok = kup.stok_satis['stok'].sum() if 'stok' in kup.stok_satis.columns else 0
-    toplam_satis = kup.stok_satis['satis'].sum() if 'satis' in kup.stok_satis.columns else 0
-    toplam_ciro = kup.stok_satis['ciro'].sum() if 'ciro' in kup.stok_satis.columns else 0
-    toplam_kar = kup.stok_satis['kar'].sum() if 'kar' in kup.stok_satis.columns else 0
+    # Toplam metrikler (önceden toplanmış özetten)
+    toplam = kup.ozet().iloc[0]
+    toplam_stok = toplam.get('stok', 0)
+    toplam_satis = toplam.get('satis', 0)
+    toplam_ciro = toplam.get('ciro', 0)
+    toplam_kar = toplam.get('kar', 0)
     
     # Depo stok
     depo_toplam = kup.depo_stok['stok'].sum() if len(kup.depo_stok) > 0 else 0
     
     # Stok durumu sayıları
-    sevk_gerekli = len(kup.stok_satis[kup.stok_satis['stok_durum'] == 'SEVK_GEREKLI'])
-    fazla_stok = len(kup.stok_satis[kup.stok_satis['stok_durum'] == 'FAZLA_STOK'])
-    yavas = len(kup.stok_satis[kup.stok_satis['stok_durum'] == 'YAVAS'])
-    normal = len(kup.stok_satis[kup.stok_satis['stok_durum'] == 'NORMAL'])
-    toplam_kayit = len(kup.stok_satis)
+    durum_sayilari = kup.ozet(('stok_durum',)).set_index('stok_durum')['satir']
+    sevk_gerekli = int(durum_sayilari.get('SEVK_GEREKLI', 0))
+    fazla_stok = int(durum_sayilari.get('FAZLA_STOK', 0))
+    yavas = int(durum_sayilari.get('YAVAS', 0))
+    normal = int(durum_sayilari.get('NORMAL', 0))
+    toplam_kayit = int(toplam['satir'])
     
     # Cover hesapla
     if toplam_satis > 0:
@@ -1660,47 +2708,52 @@ def genel_ozet(kup: KupVeri) -> str:
     return "\n".join(sonuc)
 
 
+def _ozet_satirlari(tablo: pd.DataFrame, kolon: str, deger) -> pd.DataFrame:
+    """Özet tablodan kolon == deger satırları (deger kolon tipine çevrilir)"""
+    return tablo[tablo[kolon] == _indeks_degeri(tablo[kolon], deger)]
+
+
 def kategori_analiz(kup: KupVeri, kategori_kod: str) -> str:
     """Belirli kategorinin detaylı analizi"""
     
-    # Kategori filtrele
-    if 'kategori_kod' in kup.stok_satis.columns:
-        kat_veri = kup.stok_satis[kup.stok_satis['kategori_kod'].astype(str) == str(kategori_kod)]
-    else:
+    # Kategori filtrele (önceden toplanmış özetlerden)
+    if 'kategori_kod' not in kup.stok_satis.columns:
         return "Kategori bilgisi mevcut değil."
+    kat_ozet = _ozet_satirlari(kup.ozet(('kategori_kod',)), 'kategori_kod', kategori_kod)
     
-    if len(kat_veri) == 0:
+    if len(kat_ozet) == 0:
         return f"Kategori '{kategori_kod}' bulunamadı."
+    kat = kat_ozet.iloc[0]
     
     sonuc = []
     sonuc.append(f"=== KATEGORİ ANALİZİ: {kategori_kod} ===\n")
     
     # Özet metrikler
-    sonuc.append(f"Toplam Satır: {len(kat_veri):,}")
-    sonuc.append(f"Benzersiz Ürün: {kat_veri['urun_kod'].nunique():,}")
-    sonuc.append(f"Benzersiz Mağaza: {kat_veri['magaza_kod'].nunique():,}")
-    sonuc.append(f"Toplam Stok: {kat_veri['stok'].sum():,.0f}")
-    sonuc.append(f"Toplam Satış: {kat_veri['satis'].sum():,.0f}")
-    sonuc.append(f"Toplam Ciro: {kat_veri['ciro'].sum():,.0f} TL")
-    sonuc.append(f"Toplam Kar: {kat_veri['kar'].sum():,.0f} TL")
+    sonuc.append(f"Toplam Satır: {int(kat['satir']):,}")
+    sonuc.append(f"Benzersiz Ürün: {int(kat['urun_sayisi']):,}")
+    sonuc.append(f"Benzersiz Mağaza: {int(kat['magaza_sayisi']):,}")
+    sonuc.append(f"Toplam Stok: {kat['stok']:,.0f}")
+    sonuc.append(f"Toplam Satış: {kat['satis']:,.0f}")
+    sonuc.append(f"Toplam Ciro: {kat['ciro']:,.0f} TL")
+    sonuc.append(f"Toplam Kar: {kat['kar']:,.0f} TL")
     
     # Stok durumu
     sonuc.append("\n--- Stok Durumu ---")
+    durum_sayilari = _ozet_satirlari(kup.ozet(('kategori_kod', 'stok_durum')), 'kategori_kod', kategori_kod)
+    durum_sayilari = durum_sayilari.set_index('stok_durum')['satir']
     for durum in ['SEVK_GEREKLI', 'FAZLA_STOK', 'YAVAS', 'NORMAL']:
-        count = len(kat_veri[kat_veri['stok_durum'] == durum])
+        count = int(durum_sayilari.get(durum, 0))
         if count > 0:
             emoji = {'SEVK_GEREKLI': '🔴', 'FAZLA_STOK': '🟡', 'YAVAS': '🟠', 'NORMAL': '✅'}[durum]
             sonuc.append(f"{emoji} {durum}: {count:,} satır")
     
     # Mal grubu kırılımı
-    if 'mg' in kat_veri.columns:
+    if 'mg' in kup.stok_satis.columns:
         sonuc.append("\n--- Mal Grubu Kırılımı ---")
-        mg_ozet = kat_veri.groupby('mg').agg({
-            'urun_kod': 'nunique',
-            'stok': 'sum',
-            'satis': 'sum'
-        }).reset_index()
+        mg_ozet = _ozet_satirlari(kup.ozet(('kategori_kod', 'mg')), 'kategori_kod', kategori_kod)
+        mg_ozet = mg_ozet[['mg', 'urun_sayisi', 'stok', 'satis']].reset_index(drop=True)
         mg_ozet.columns = ['MG', 'Urun_Sayisi', 'Stok', 'Satis']
+        mg_ozet['MG'] = mg_ozet['MG'].astype(str)  # Kodlar int32 - satır yazımında float'a dönmesin
         mg_ozet['Cover'] = mg_ozet['Stok'] / (mg_ozet['Satis'] + 0.1)
         mg_ozet = mg_ozet.nlargest(10, 'Stok')
         
@@ -1710,20 +2763,20 @@ def kategori_analiz(kup: KupVeri, kategori_kod: str) -> str:
     
     # En çok satan ürünler
     sonuc.append("\n--- En Çok Satan Ürünler ---")
-    top_satis = kat_veri.groupby('urun_kod').agg({
-        'satis': 'sum',
-        'stok': 'sum',
-        'ciro': 'sum'
-    }).reset_index().nlargest(10, 'satis')
+    urun_ozet = _ozet_satirlari(kup.ozet(('kategori_kod', 'urun_kod')), 'kategori_kod', kategori_kod)
+    top_satis = urun_ozet[['urun_kod', 'satis', 'stok', 'ciro']].reset_index(drop=True).nlargest(10, 'satis')
+    top_satis['urun_kod'] = top_satis['urun_kod'].astype(str)
     
     for _, row in top_satis.iterrows():
         sonuc.append(f"  {row['urun_kod']}: Satış {row['satis']:,.0f} | Stok {row['stok']:,.0f}")
     
     # Sevk gereken ürünler
-    sevk_gerekli = kat_veri[kat_veri['stok_durum'] == 'SEVK_GEREKLI']
+    sevk_gerekli = _ozet_satirlari(
+        kup.ozet(('kategori_kod', 'urun_kod'), durumlar=('SEVK_GEREKLI',)), 'kategori_kod', kategori_kod
+    )
     if len(sevk_gerekli) > 0:
-        sonuc.append(f"\n--- Sevk Gereken ({len(sevk_gerekli)} satır) ---")
-        top_sevk = sevk_gerekli.groupby('urun_kod').size().reset_index(name='magaza_sayisi')
+        sonuc.append(f"\n--- Sevk Gereken ({int(sevk_gerekli['satir'].sum())} satır) ---")
+        top_sevk = sevk_gerekli[['urun_kod', 'satir']].rename(columns={'satir': 'magaza_sayisi'}).reset_index(drop=True)
         top_sevk = top_sevk.nlargest(10, 'magaza_sayisi')
         for _, row in top_sevk.iterrows():
             sonuc.append(f"  🔴 {row['urun_kod']}: {row['magaza_sayisi']} mağazada stok düşük")
@@ -1734,7 +2787,7 @@ def kategori_analiz(kup: KupVeri, kategori_kod: str) -> str:
 def magaza_analiz(kup: KupVeri, magaza_kod: str) -> str:
     """Belirli mağazanın detaylı analizi"""
     
-    mag_veri = kup.stok_satis[kup.stok_satis['magaza_kod'].astype(str) == str(magaza_kod)]
+    mag_veri = kup.satirlar('stok_satis', magaza_kod=magaza_kod)
     
     if len(mag_veri) == 0:
         return f"Mağaza '{magaza_kod}' bulunamadı."
@@ -1744,7 +2797,7 @@ def magaza_analiz(kup: KupVeri, magaza_kod: str) -> str:
     
     # Mağaza bilgileri
     if len(kup.magaza_master) > 0:
-        mag_info = kup.magaza_master[kup.magaza_master['magaza_kod'].astype(str) == str(magaza_kod)]
+        mag_info = kup.satirlar('magaza_master', magaza_kod=magaza_kod)
         if len(mag_info) > 0:
             info = mag_info.iloc[0]
             sonuc.append(f"İl: {info.get('il', 'N/A')}")
@@ -1782,7 +2835,7 @@ def magaza_analiz(kup: KupVeri, magaza_kod: str) -> str:
 def urun_analiz(kup: KupVeri, urun_kod: str) -> str:
     """Belirli ürünün detaylı analizi"""
     
-    urun_veri = kup.stok_satis[kup.stok_satis['urun_kod'].astype(str) == str(urun_kod)]
+    urun_veri = kup.satirlar('stok_satis', urun_kod=urun_kod)
     
     if len(urun_veri) == 0:
         return f"Ürün '{urun_kod}' bulunamadı."
@@ -1792,7 +2845,7 @@ def urun_analiz(kup: KupVeri, urun_kod: str) -> str:
     
     # Ürün bilgileri
     if len(kup.urun_master) > 0:
-        urun_info = kup.urun_master[kup.urun_master['urun_kod'].astype(str) == str(urun_kod)]
+        urun_info = kup.satirlar('urun_master', urun_kod=urun_kod)
         if len(urun_info) > 0:
             info = urun_info.iloc[0]
             sonuc.append(f"Kategori: {info.get('kategori_kod', 'N/A')}")
@@ -1811,7 +2864,7 @@ def urun_analiz(kup: KupVeri, urun_kod: str) -> str:
     
     # Depo stok
     if len(kup.depo_stok) > 0:
-        depo_urun = kup.depo_stok[kup.depo_stok['urun_kod'].astype(str) == str(urun_kod)]
+        depo_urun = kup.satirlar('depo_stok', urun_kod=urun_kod)
         if len(depo_urun) > 0:
             sonuc.append(f"\n--- Depo Stok ---")
             for _, row in depo_urun.iterrows():
@@ -1850,32 +2903,21 @@ def sevkiyat_plani(kup: KupVeri, limit: int = 50) -> str:
     if 'stok_durum' not in kup.stok_satis.columns:
         return "❌ Stok durumu hesaplanamamış."
     
-    sevk_gerekli = kup.stok_satis[kup.stok_satis['stok_durum'] == 'SEVK_GEREKLI'].copy()
-    
-    if len(sevk_gerekli) == 0:
-        return "✅ Sevk gereken ürün bulunmuyor."
-    
-    sonuc.append(f"Toplam sevk gereken: {len(sevk_gerekli):,} mağaza×ürün kombinasyonu\n")
+    if 'urun_kod' not in kup.stok_satis.columns:
+        return "❌ Gerekli kolonlar bulunamadı."
     
-    # Ürün bazlı önceliklendirme - dinamik kolon kullanımı
-    agg_dict = {}
-    if 'magaza_kod' in sevk_gerekli.columns:
-        agg_dict['magaza_kod'] = 'count'
-    if 'satis' in sevk_gerekli.columns:
-        agg_dict['satis'] = 'sum'
-    if 'stok' in sevk_gerekli.columns:
-        agg_dict['stok'] = 'sum'
-    if 'min_deger' in sevk_gerekli.columns:
-        agg_dict['min_deger'] = 'first'
+    # Ürün bazlı önceliklendirme (önceden toplanmış özetten)
+    urun_oncelik = kup.ozet(('urun_kod',), durumlar=('SEVK_GEREKLI',))
     
-    if len(agg_dict) == 0 or 'urun_kod' not in sevk_gerekli.columns:
-        return "❌ Gerekli kolonlar bulunamadı."
+    if len(urun_oncelik) == 0:
+        return "✅ Sevk gereken ürün bulunmuyor."
     
-    urun_oncelik = sevk_gerekli.groupby('urun_kod').agg(agg_dict).reset_index()
+    sonuc.append(f"Toplam sevk gereken: {int(urun_oncelik['satir'].sum()):,} mağaza×ürün kombinasyonu\n")
     
     # Kolon isimlerini düzelt
-    rename_map = {'magaza_kod': 'magaza_sayisi', 'satis': 'toplam_satis', 'stok': 'toplam_stok'}
-    urun_oncelik = urun_oncelik.rename(columns=rename_map)
+    kolonlar = [c for c in ['urun_kod', 'satir', 'satis', 'stok', 'min_deger'] if c in urun_oncelik.columns]
+    rename_map = {'satir': 'magaza_sayisi', 'satis': 'toplam_satis', 'stok': 'toplam_stok'}
+    urun_oncelik = urun_oncelik[kolonlar].rename(columns=rename_map)
     
     # Eksik hesapla
     if 'magaza_sayisi' in urun_oncelik.columns and 'min_deger' in urun_oncelik.columns:
@@ -1897,6 +2939,7 @@ def sevkiyat_plani(kup: KupVeri, limit: int = 50) -> str:
         urun_oncelik['depo_stok'] = urun_oncelik['depo_stok'].fillna(0)
     else:
         urun_oncelik['depo_stok'] = 0
+    urun_oncelik['urun_kod'] = urun_oncelik['urun_kod'].astype(str)
     
     sonuc.append(f"{'Ürün Kodu':<12} | {'Mağaza#':>8} | {'Satış':>8} | {'Eksik':>8} | {'Depo':>8} | Durum")
     sonuc.append("-" * 75)
@@ -1939,36 +2982,22 @@ def fazla_stok_analiz(kup: KupVeri, limit: int = 50) -> str:
     if 'stok_durum' not in kup.stok_satis.columns:
         return "❌ Stok durumu hesaplanamamış."
     
-    # Fazla stok ve yavaş dönen
-    fazla = kup.stok_satis[kup.stok_satis['stok_durum'].isin(['FAZLA_STOK', 'YAVAS'])].copy()
-    
-    if len(fazla) == 0:
-        return "✅ Fazla stok bulunmuyor."
-    
-    sonuc.append(f"Toplam fazla/yavaş stok: {len(fazla):,} mağaza×ürün kombinasyonu\n")
-    
-    # Ürün bazlı özet - dinamik kolon kullanımı
-    if 'urun_kod' not in fazla.columns:
+    if 'urun_kod' not in kup.stok_satis.columns:
         return "❌ urun_kod kolonu bulunamadı."
     
-    agg_dict = {}
-    if 'magaza_kod' in fazla.columns:
-        agg_dict['magaza_kod'] = 'count'
-    if 'stok' in fazla.columns:
-        agg_dict['stok'] = 'sum'
-    if 'satis' in fazla.columns:
-        agg_dict['satis'] = 'sum'
-    if 'ciro' in fazla.columns:
-        agg_dict['ciro'] = 'sum'
-    
-    if len(agg_dict) == 0:
-        return "❌ Gerekli kolonlar bulunamadı."
+    # Fazla stok ve yavaş dönen - ürün bazlı özet (önceden toplanmış)
+    urun_ozet = kup.ozet(('urun_kod',), durumlar=('FAZLA_STOK', 'YAVAS'))
+    
+    if len(urun_ozet) == 0:
+        return "✅ Fazla stok bulunmuyor."
     
-    urun_ozet = fazla.groupby('urun_kod').agg(agg_dict).reset_index()
+    sonuc.append(f"Toplam fazla/yavaş stok: {int(urun_ozet['satir'].sum()):,} mağaza×ürün kombinasyonu\n")
     
     # Kolon isimlerini düzelt
-    rename_map = {'magaza_kod': 'magaza_sayisi', 'stok': 'toplam_stok', 'satis': 'toplam_satis', 'ciro': 'toplam_ciro'}
-    urun_ozet = urun_ozet.rename(columns=rename_map)
+    kolonlar = [c for c in ['urun_kod', 'satir', 'stok', 'satis', 'ciro'] if c in urun_ozet.columns]
+    rename_map = {'satir': 'magaza_sayisi', 'stok': 'toplam_stok', 'satis': 'toplam_satis', 'ciro': 'toplam_ciro'}
+    urun_ozet = urun_ozet[kolonlar].rename(columns=rename_map)
+    urun_ozet['urun_kod'] = urun_ozet['urun_kod'].astype(str)
     
     # Cover hesapla
     if 'toplam_stok' in urun_ozet.columns and 'toplam_satis' in urun_ozet.columns:
@@ -2011,29 +3040,16 @@ def bolge_karsilastir(kup: KupVeri) -> str:
     sonuc = []
     sonuc.append("=== BÖLGE KARŞILAŞTIRMASI ===\n")
     
-    # Dinamik agg dict
-    agg_dict = {}
-    if 'magaza_kod' in kup.stok_satis.columns:
-        agg_dict['magaza_kod'] = 'nunique'
-    if 'urun_kod' in kup.stok_satis.columns:
-        agg_dict['urun_kod'] = 'nunique'
-    if 'stok' in kup.stok_satis.columns:
-        agg_dict['stok'] = 'sum'
-    if 'satis' in kup.stok_satis.columns:
-        agg_dict['satis'] = 'sum'
-    if 'ciro' in kup.stok_satis.columns:
-        agg_dict['ciro'] = 'sum'
-    if 'kar' in kup.stok_satis.columns:
-        agg_dict['kar'] = 'sum'
-    
-    if len(agg_dict) == 0:
-        return "❌ Gerekli kolonlar bulunamadı."
+    # Bölge özeti (önceden toplanmış)
+    bolge_ozet = kup.ozet(('bolge',))
+    kolonlar = [c for c in ['bolge', 'magaza_sayisi', 'urun_sayisi', 'stok', 'satis', 'ciro', 'kar'] if c in bolge_ozet.columns]
     
-    bolge_ozet = kup.stok_satis.groupby('bolge').agg(agg_dict).reset_index()
+    if len(kolonlar) == 1:
+        return "❌ Gerekli kolonlar bulunamadı."
     
     # Kolon isimlerini düzelt
-    rename_map = {'magaza_kod': 'Magaza', 'urun_kod': 'Urun', 'stok': 'Stok', 'satis': 'Satis', 'ciro': 'Ciro', 'kar': 'Kar'}
-    bolge_ozet = bolge_ozet.rename(columns=rename_map)
+    rename_map = {'magaza_sayisi': 'Magaza', 'urun_sayisi': 'Urun', 'stok': 'Stok', 'satis': 'Satis', 'ciro': 'Ciro', 'kar': 'Kar'}
+    bolge_ozet = bolge_ozet[kolonlar].rename(columns=rename_map)
     bolge_ozet = bolge_ozet.rename(columns={'bolge': 'Bolge'})
     
     if 'Kar' in bolge_ozet.columns and 'Ciro' in bolge_ozet.columns:
@@ -2064,9 +3080,16 @@ def bolge_karsilastir(kup: KupVeri) -> str:
     return "\n".join(sonuc)
 
 
+# Mağazanın depo bilgisi yoksa sevkiyatın çıkacağı depo
+VARSAYILAN_DEPO_KOD = 9001
+
+# sevkiyat_hesapla'nın küpten kopyaladığı kolonlar
+SEVKIYAT_KOLONLARI = ['magaza_kod', 'urun_kod', 'depo_kod', 'stok', 'yol', 'satis', 'min_deger']
+
+
 def sevkiyat_hesapla(kup: KupVeri, kategori_kod = None, urun_kod: str = None, marka_kod: str = None, forward_cover: float = 7.0, export_excel: bool = False) -> str:
     """
-    Sevkiyat hesaplaması - INLINE versiyon
+    Sevkiyat hesaplaması - dağıtım sevkiyat_motoru ortak çekirdeğiyle yapılır
     
     Mantık:
     1. hedef_stok = haftalik_satis × forward_cover
@@ -2077,7 +3100,7 @@ def sevkiyat_hesapla(kup: KupVeri, kategori_kod = None, urun_kod: str = None, ma
     export_excel=True ise Excel dosyası oluşturur ve yolunu döner
     """
     print("\n" + "="*50)
-    print("🚀 SEVKIYAT_HESAPLA ÇAĞRILDI (INLINE)")
+    print("🚀 SEVKIYAT_HESAPLA ÇAĞRILDI")
     print(f"   Parametreler: kategori={kategori_kod}, urun={urun_kod}, fc={forward_cover}, excel={export_excel}")
     print("="*50)
     
@@ -2094,29 +3117,20 @@ def sevkiyat_hesapla(kup: KupVeri, kategori_kod = None, urun_kod: str = None, ma
         
         print(f"✅ Veri OK: stok_satis={len(stok_satis)}, depo_stok={len(depo_stok)}")
         
-        # 2. ANA VERİYİ HAZIRLA
-        df = stok_satis.copy()
-        df['urun_kod'] = df['urun_kod'].astype(str)
-        df['magaza_kod'] = df['magaza_kod'].astype(str)
-        print(f"   Başlangıç: {len(df)} satır")
-        
-        # Ürün filtresi
+        # 2. ANA VERİYİ HAZIRLA - filtreler indeksten çözülür, sadece seçili satır×kolon kopyalanır
         if urun_kod is not None:
             urun_kod = str(urun_kod).strip()
-            df = df[df['urun_kod'] == urun_kod]
-            print(f"   Ürün filtresi ({urun_kod}): {len(df)} satır")
-            if len(df) == 0:
-                return f"❌ {urun_kod} kodlu ürün bulunamadı."
-        
-        # Kategori filtresi
         if kategori_kod is not None:
             kategori_kod = int(kategori_kod)
-            if 'kategori_kod' in df.columns:
-                df['kategori_kod'] = pd.to_numeric(df['kategori_kod'], errors='coerce').fillna(0).astype(int)
-                df = df[df['kategori_kod'] == kategori_kod]
-                print(f"   Kategori filtresi ({kategori_kod}): {len(df)} satır")
+        
+        df = kup.secili_satirlar(SEVKIYAT_KOLONLARI, urun_kod=urun_kod, kategori_kod=kategori_kod)
+        df['urun_kod'] = df['urun_kod'].astype(str)
+        df['magaza_kod'] = df['magaza_kod'].astype(str)
+        print(f"   Filtre sonrası: {len(df)} / {len(stok_satis)} satır")
         
         if len(df) == 0:
+            if urun_kod is not None and len(kup.satir_konumlari(urun_kod=urun_kod)) == 0:
+                return f"❌ {urun_kod} kodlu ürün bulunamadı."
             return "❌ Filtrelere uygun veri bulunamadı."
         
         # 3. DEPO KODU EKLE
@@ -2126,11 +3140,11 @@ def sevkiyat_hesapla(kup: KupVeri, kategori_kod = None, urun_kod: str = None, ma
                 mag_m = mag_m.copy()
                 mag_m['magaza_kod'] = mag_m['magaza_kod'].astype(str)
                 df = df.merge(mag_m[['magaza_kod', 'depo_kod']], on='magaza_kod', how='left')
-                df['depo_kod'] = pd.to_numeric(df['depo_kod'], errors='coerce').fillna(9001).astype(int)
+                df['depo_kod'] = pd.to_numeric(df['depo_kod'], errors='coerce').fillna(VARSAYILAN_DEPO_KOD).astype(int)
             else:
-                df['depo_kod'] = 9001
+                df['depo_kod'] = VARSAYILAN_DEPO_KOD
         else:
-            df['depo_kod'] = pd.to_numeric(df['depo_kod'], errors='coerce').fillna(9001).astype(int)
+            df['depo_kod'] = pd.to_numeric(df['depo_kod'], errors='coerce').fillna(VARSAYILAN_DEPO_KOD).astype(int)
         
         print(f"   Depo kodları: {df['depo_kod'].unique().tolist()}")
         
@@ -2166,70 +3180,40 @@ def sevkiyat_hesapla(kup: KupVeri, kategori_kod = None, urun_kod: str = None, ma
             0
         )
         
-        # Final ihtiyaç = MAX(RPT, Min)
-        df['ihtiyac'] = df[['rpt_ihtiyac', 'min_ihtiyac']].max(axis=1)
-        
-        # İhtiyaç türünü belirle
-        df['ihtiyac_turu'] = np.where(
-            df['ihtiyac'] == 0, 'Yok',
-            np.where(df['ihtiyac'] == df['min_ihtiyac'], 'MIN', 'RPT')
-        )
+        # Final ihtiyaç = MAX(RPT, Min) - eşitlikte MIN sayılır
+        df = ihtiyac_birlestir(df, esitlikte='MIN', min_etiketi='MIN')
         
         print(f"   İhtiyaç hesaplandı:")
         print(f"      - RPT ihtiyaç olan: {(df['rpt_ihtiyac'] > 0).sum()}")
         print(f"      - MIN ihtiyaç olan: {(df['min_ihtiyac'] > 0).sum()}")
         print(f"      - Toplam ihtiyaç olan: {(df['ihtiyac'] > 0).sum()}")
         
-        # 7. DEPO STOK SÖZLÜĞÜ OLUŞTUR
-        depo_df = depo_stok.copy()
-        depo_df.columns = [c.lower().strip() for c in depo_df.columns]
-        depo_df['urun_kod'] = depo_df['urun_kod'].astype(str)
-        depo_df['depo_kod'] = pd.to_numeric(depo_df['depo_kod'], errors='coerce').fillna(9001).astype(int)
-        depo_df['stok'] = pd.to_numeric(depo_df['stok'], errors='coerce').fillna(0)
-        
-        depo_stok_dict = {}
-        for _, row in depo_df.iterrows():
-            key = (int(row['depo_kod']), str(row['urun_kod']))
-            depo_stok_dict[key] = depo_stok_dict.get(key, 0) + float(row['stok'])
-        
-        print(f"   Depo stok: {len(depo_stok_dict)} ürün×depo kombinasyonu")
+        # 7. DEPO STOK TABLOSU (depo×ürün başına toplam stok)
+        depo_tablosu = depo_tablosu_hazirla(depo_stok, varsayilan_depo=VARSAYILAN_DEPO_KOD, tekrar_eden='topla')
+        print(f"   Depo stok: {len(depo_tablosu)} ürün×depo kombinasyonu")
         
         # 8. SEVKİYAT DAĞIT
-        ihtiyac_df = df[df['ihtiyac'] > 0].copy()
-        ihtiyac_df = ihtiyac_df.sort_values('ihtiyac', ascending=False)
+        dagitim = depo_stok_dagit(df, depo_tablosu, varsayilan_depo=VARSAYILAN_DEPO_KOD)
         
-        sevkiyat_list = []
-        for _, row in ihtiyac_df.iterrows():
-            key = (int(row['depo_kod']), str(row['urun_kod']))
-            ihtiyac = float(row['ihtiyac'])
-            
-            mevcut_depo = depo_stok_dict.get(key, 0)
-            if mevcut_depo > 0:
-                sevk = min(ihtiyac, mevcut_depo)
-                depo_stok_dict[key] -= sevk
-            else:
-                sevk = 0
-            
-            sevkiyat_list.append({
-                'magaza_kod': row['magaza_kod'],
-                'urun_kod': row['urun_kod'],
-                'depo_kod': row['depo_kod'],
-                'stok': int(row['stok']),
-                'yol': int(row['yol']),
-                'min': int(row['min']),
-                'haftalik_satis': round(row['haftalik_satis'], 1),
-                'cover': round(row['cover'], 1),
-                'hedef_stok': int(row['hedef_stok']),
-                'ihtiyac': int(ihtiyac),
-                'ihtiyac_turu': row['ihtiyac_turu'],
-                'sevkiyat': int(sevk),
-                'karsilanamayan': int(ihtiyac - sevk)
-            })
-        
-        if not sevkiyat_list:
+        if len(dagitim) == 0:
             return "ℹ️ Sevkiyat ihtiyacı bulunamadı. Tüm mağazaların stoku yeterli."
         
-        sonuc_df = pd.DataFrame(sevkiyat_list)
+        sonuc_df = pd.DataFrame({
+            'magaza_kod': dagitim['magaza_kod'],
+            'urun_kod': dagitim['urun_kod'],
+            'depo_kod': dagitim['depo_kod'],
+            'stok': dagitim['stok'].astype('int64'),
+            'yol': dagitim['yol'].astype('int64'),
+            'min': dagitim['min'].astype('int64'),
+            'haftalik_satis': dagitim['haftalik_satis'].round(1),
+            'cover': dagitim['cover'].round(1),
+            'hedef_stok': dagitim['hedef_stok'].astype('int64'),
+            'rpt_ihtiyac': dagitim['rpt_ihtiyac'].astype('int64'),
+            'ihtiyac': dagitim['ihtiyac'].astype('int64'),
+            'ihtiyac_turu': dagitim['ihtiyac_turu'],
+            'sevkiyat': dagitim['sevkiyat_miktari'].astype('int64'),
+            'karsilanamayan': dagitim['karsilanamayan'].astype('int64')
+        })
         
         # 9. ÖZET OLUŞTUR
         toplam_ihtiyac = sonuc_df['ihtiyac'].sum()
@@ -2367,6 +3351,62 @@ def sevkiyat_hesapla(kup: KupVeri, kategori_kod = None, urun_kod: str = None, ma
         return f"❌ Sevkiyat hesaplama hatası: {str(e)}\n\nDetay:\n{error_detail[:300]}"
 
 
+def senaryo_karsilastir(kup: KupVeri, forward_cover_listesi: list = None, kategori_kod = None, urun_kod: str = None, marka_kod: str = None, min_stok_orani: float = None) -> str:
+    """
+    Aynı sevkiyat hesabını birden fazla forward cover değeriyle karşılaştırır (what-if).
+    
+    Veri bir kez hazırlanır, tüm senaryolar tek geçişte dağıtılır
+    (SevkiyatMotoru.senaryolari_hesapla).
+    """
+    if not forward_cover_listesi:
+        forward_cover_listesi = [4, 6, 7, 8, 10]
+    
+    print(f"🔀 SENARYO KARŞILAŞTIR: fc={forward_cover_listesi}, kategori={kategori_kod}, urun={urun_kod}")
+    
+    senaryolar = [{
+        'ad': f"FC {fc:g}",
+        'forward_cover': fc,
+        'kategori_kod': int(kategori_kod) if kategori_kod is not None else None,
+        'urun_kod': urun_kod,
+        'marka_kod': marka_kod,
+        'min_stok_orani': min_stok_orani
+    } for fc in sorted({float(fc) for fc in forward_cover_listesi})]  # Artan sıra: doygunluk kontrolü buna dayanır
+    
+    sonuc = kup.sevkiyat_motoru().senaryolari_hesapla(senaryolar)
+    if sonuc['hata']:
+        return f"❌ {sonuc['hata']}"
+    
+    tablo = sonuc['karsilastirma']
+    if tablo['ihtiyacli_satir'].sum() == 0:
+        return "ℹ️ Hiçbir senaryoda sevkiyat ihtiyacı bulunamadı."
+    
+    filtre_text = ""
+    if urun_kod:
+        filtre_text = f" (Ürün: {urun_kod})"
+    elif kategori_kod:
+        filtre_text = f" (Kategori: {kategori_kod})"
+    
+    rapor = [f"=== SEVKİYAT SENARYO KARŞILAŞTIRMASI{filtre_text} ===\n"]
+    rapor.append(f"{'Senaryo':<10} | {'İhtiyaç':>10} | {'Sevkiyat':>10} | {'Karşılama':>9} | {'Karşılanamayan':>14}")
+    rapor.append("-" * 65)
+    for _, row in tablo.iterrows():
+        rapor.append(
+            f"{row['senaryo']:<10} | {int(row['toplam_ihtiyac']):>10,} | {int(row['toplam_sevkiyat']):>10,} | "
+            f"{'%' + format(row['karsilama_orani'], '.1f'):>9} | {int(row['karsilanamayan']):>14,}"
+        )
+    rapor.append("")
+    
+    # Depo stoku hangi noktada tükeniyor?
+    en_iyi = tablo.loc[tablo['karsilama_orani'].idxmax()]
+    rapor.append(f"✅ En yüksek karşılama: {en_iyi['senaryo']} (%{en_iyi['karsilama_orani']:.1f})")
+    sevk_artisi = tablo['toplam_sevkiyat'].diff().fillna(tablo['toplam_sevkiyat'])
+    doygun = tablo[(sevk_artisi <= 0) & (tablo.index > 0)]
+    if len(doygun) > 0:
+        rapor.append(f"⚠️ {doygun.iloc[0]['senaryo']} ve üzerinde sevkiyat artmıyor - depo stoğu sınırda, fazlası satınalma ihtiyacı.")
+    
+    return "\n".join(rapor)
+
+
 # =============================================================================
 # CLAUDE AGENT - TOOL CALLING
 # =============================================================================
@@ -2600,6 +3640,37 @@ TOOLS = [
             },
             "required": []
         }
+    },
+    {
+        "name": "senaryo_karsilastir",
+        "description": "Sevkiyat hesaplamasını birden fazla forward cover değeri için tek seferde çalıştırır ve senaryoları karşılaştırır: toplam ihtiyaç, sevkiyat, karşılama oranı ve karşılanamayan miktar. 'Cover 4, 6, 8 hafta olsa ne olur?' gibi what-if soruları için kullan.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "forward_cover_listesi": {
+                    "type": "array",
+                    "items": {"type": "number"},
+                    "description": "Karşılaştırılacak forward cover değerleri (hafta). Varsayılan: [4, 6, 7, 8, 10]"
+                },
+                "kategori_kod": {
+                    "type": "integer",
+                    "description": "Kategori filtresi. 11=Renkli Kozmetik, 14=Saç, 16=Cilt, 19=Parfüm, 20=Kişisel Bakım"
+                },
+                "urun_kod": {
+                    "type": "string",
+                    "description": "Tek ürün filtresi (opsiyonel)"
+                },
+                "marka_kod": {
+                    "type": "string",
+                    "description": "Marka filtresi (opsiyonel)"
+                },
+                "min_stok_orani": {
+                    "type": "number",
+                    "description": "Minimum stok oranı override (opsiyonel, varsayılan 1.0)"
+                }
+            },
+            "required": []
+        }
     }
 ]
 
@@ -2801,28 +3872,446 @@ Tablodan sonra, sorunlu ana grupları kısaca yorumla:
 
 Her zaman Türkçe, detaylı ve stratejik ol!"""
 
+# Prompt caching: araç şemaları + temel sistem prompt'u her iterasyonda aynı önektir.
+# cache_control işaretli bloğa kadarki önek (tools → system sırasıyla) sağlayıcı tarafında
+# önbelleğe alınır; kullanıcı kuralları bu işaretten sonra ayrı blok olarak gider.
+ONBELLEK_ISARETI = {"type": "ephemeral"}
+TOOLS_ONBELLEKLI = TOOLS[:-1] + [{**TOOLS[-1], "cache_control": ONBELLEK_ISARETI}]
 
-def agent_calistir(api_key: str, kup: KupVeri, kullanici_mesaji: str, analiz_kurallari: dict = None) -> str:
-    """Agent'ı çalıştır ve sonuç al
-    
-    analiz_kurallari: Kullanıcının tanımladığı eşikler ve yorumlar
+
+def _araci_cagir(kup: KupVeri, tool_name: str, tool_input: dict) -> str:
+    """Araç adını ilgili fonksiyona yönlendir (önbelleksiz)"""
+    if tool_name == "web_arama":
+        return web_arama(tool_input.get("sorgu", "Türkiye enflasyon"))
+    elif tool_name == "genel_ozet":
+        return genel_ozet(kup)
+    elif tool_name == "trading_analiz":
+        return trading_analiz(
+            kup,
+            ana_grup=tool_input.get("ana_grup", None),
+            ara_grup=tool_input.get("ara_grup", None)
+        )
+    elif tool_name == "cover_analiz":
+        return cover_analiz(kup, tool_input.get("sayfa", None))
+    elif tool_name == "cover_diagram_analiz":
+        return cover_diagram_analiz(
+            kup,
+            alt_grup=tool_input.get("alt_grup", None),
+            magaza=tool_input.get("magaza", None)
+        )
+    elif tool_name == "kapasite_analiz":
+        return kapasite_analiz(
+            kup,
+            magaza=tool_input.get("magaza", None)
+        )
+    elif tool_name == "siparis_takip_analiz":
+        return siparis_takip_analiz(
+            kup,
+            ana_grup=tool_input.get("ana_grup", None)
+        )
+    elif tool_name == "ihtiyac_hesapla":
+        return ihtiyac_hesapla(kup, tool_input.get("limit", 30))
+    elif tool_name == "kategori_analiz":
+        return kategori_analiz(kup, tool_input.get("kategori_kod", ""))
+    elif tool_name == "magaza_analiz":
+        return magaza_analiz(kup, tool_input.get("magaza_kod", ""))
+    elif tool_name == "urun_analiz":
+        return urun_analiz(kup, tool_input.get("urun_kod", ""))
+    elif tool_name == "sevkiyat_plani":
+        return sevkiyat_plani(kup, tool_input.get("limit", 30))
+    elif tool_name == "fazla_stok_analiz":
+        return fazla_stok_analiz(kup, tool_input.get("limit", 30))
+    elif tool_name == "bolge_karsilastir":
+        return bolge_karsilastir(kup)
+    elif tool_name == "sevkiyat_hesapla":
+        return sevkiyat_hesapla(
+            kup,
+            kategori_kod=tool_input.get("kategori_kod", None),
+            urun_kod=tool_input.get("urun_kod", None),
+            marka_kod=tool_input.get("marka_kod", None),
+            forward_cover=tool_input.get("forward_cover", 7.0),
+            export_excel=tool_input.get("export_excel", False)
+        )
+    elif tool_name == "senaryo_karsilastir":
+        return senaryo_karsilastir(
+            kup,
+            forward_cover_listesi=tool_input.get("forward_cover_listesi", None),
+            kategori_kod=tool_input.get("kategori_kod", None),
+            urun_kod=tool_input.get("urun_kod", None),
+            marka_kod=tool_input.get("marka_kod", None),
+            min_stok_orani=tool_input.get("min_stok_orani", None)
+        )
+    else:
+        return f"Bilinmeyen araç: {tool_name}"
+
+
+def arac_calistir(kup: KupVeri, tool_name: str, tool_input: dict) -> str:
     """
-    
-    import time
-    start_time = time.time()
-    
-    print(f"\n🤖 AGENT BAŞLADI: {kullanici_mesaji[:50]}...")
-    print(f"   API Key: {api_key[:20]}...")
-    
+    Aracı çalıştır - aynı veri sürümünde aynı girdiyle yapılmış çağrının sonucu
+    kup.arac_onbellegi'nden döner. Hata fırlatan çağrılar önbelleğe alınmaz.
+
+    Araç, önbellek anahtarının üretildiği normalize girdiyle çağrılır; aynı
+    anahtarı paylaşan çağrılar aynı argümanları alır.
+    """
+    girdi = _arac_girdisi(tool_input)
+    onbellek = kup.arac_onbellegi
+    if not onbellek.onbelleklenir_mi(tool_name, girdi):
+        return _araci_cagir(kup, tool_name, girdi)
+
+    anahtar = (tool_name, _girdi_anahtari(girdi), kup.veri_surumu)
+    sonuc = onbellek.al(anahtar)
+    if sonuc is not None:
+        print(f"      ⚡ {tool_name}: önbellekten")
+        return sonuc
+    sonuc = _araci_cagir(kup, tool_name, girdi)
+    onbellek.koy(anahtar, sonuc)
+    return sonuc
+
+
+# Bir yanıttaki tool_use blokları için thread sayısı (her çağrının kendi havuzu) ve araç başına süre limiti (saniye)
+ARAC_PARALEL_SAYISI = 4
+ARAC_ZAMAN_ASIMI = {'web_arama': 15, 'sevkiyat_hesapla': 90, 'senaryo_karsilastir': 90}
+VARSAYILAN_ARAC_ZAMAN_ASIMI = 60
+ARAC_BASLAMA_YOKLAMA = 0.05  # Sırada bekleyen araç varken en uzun bekleme (saniye)
+
+
+def _arac_sonucu(kup: KupVeri, tool_name: str, tool_input: dict) -> str:
+    """Aracı çalıştır, logla ve token bütçesine sığacak şekilde özetle - hata metin olarak döner"""
     try:
-        client = anthropic.Anthropic(api_key=api_key, timeout=60.0)  # 60 saniye timeout
-        print("   ✅ Anthropic client oluşturuldu")
+        tool_result = arac_calistir(kup, tool_name, tool_input)
+        
+        # Sonucu logla
+        print(f"      🔧 {tool_name}: {len(tool_result)} karakter")
+        
+        # Sonuç bütçeyi aşıyorsa tablo satırlarını kırp (başlıklar ve özet satırları kalır)
+        ozet = sonuc_ozeti(tool_result, ARAC_SONUC_TOKEN_BUTCESI)
+        if ozet is not tool_result:
+            print(f"      🗜️ Sonuç özetlendi: {len(tool_result)} → {len(ozet)} karakter")
+            tool_result = ozet
+            
     except Exception as e:
-        print(f"   ❌ Client hatası: {e}")
-        return f"❌ API Client hatası: {str(e)}"
-    
-    # Dinamik SYSTEM_PROMPT oluştur
-    system_prompt = SYSTEM_PROMPT
+        tool_result = f"Hata: {str(e)}"
+        print(f"      ❌ Tool hatası: {e}")
+    return tool_result
+
+
+# =============================================================================
+# ARAÇ SONUCU SIKIŞTIRMA
+# =============================================================================
+
+# Token bütçeleri: yeni araç sonucu ve model tarafından okunmuş (eski) sonuç özeti.
+# Token sayısı karakterden tahmin edilir (Türkçe metin + emoji için ~3 karakter/token).
+ARAC_SONUC_TOKEN_BUTCESI = 2500
+ESKI_SONUC_TOKEN_BUTCESI = 300
+KARAKTER_PER_TOKEN = 3
+
+# Blok başına bırakılacak satır sayısı - bütçeye sığana kadar sırayla denenir
+OZET_SATIR_ADIMLARI = (10, 5, 3, 1, 0)
+
+_AYRAC_SATIRI = re.compile(r'^\s*[-=─_]{5,}\s*$')
+
+
+def token_tahmini(metin: str) -> int:
+    """Metnin yaklaşık token sayısı"""
+    return len(metin) // KARAKTER_PER_TOKEN + 1
+
+
+def _blok_kirp(satirlar: list, n: int) -> list:
+    """
+    Bir bloğun başlığını koru, gövdesinden ilk n satırı bırak.
+    Başlık: ilk 4 satırdaki son ayraç çizgisine kadar (tablo başlığı + ----),
+    ayraç yoksa ilk satır ('--- Sevk Gereken ---', '📊 ÖZET:' gibi).
+    """
+    bas = 1
+    for i, satir in enumerate(satirlar[:4]):
+        if _AYRAC_SATIRI.match(satir):
+            bas = i + 1
+    govde = satirlar[bas:]
+    if len(govde) <= n:
+        return satirlar
+    return satirlar[:bas] + govde[:n] + [f"   … (+{len(govde) - n} satır)"]
+
+
+def sonuc_ozeti(metin: str, token_butcesi: int) -> str:
+    """
+    Araç çıktısını token bütçesine sığdır.
+
+    Araçların metin çıktısı boş satırla ayrılmış bloklardan oluşur (başlık +
+    tablo/liste satırları). Bütçe aşılırsa ayraç çizgileri kısaltılır, her bloğun
+    başlığı korunup satırları OZET_SATIR_ADIMLARI ile azaltılır; tablolar en
+    üstteki (sıralı) satırlarıyla ve kırpılan satır sayısıyla kalır. Hâlâ
+    sığmıyorsa sondan kesilir.
+    Bütçe içindeki metin aynen (aynı nesne) döner.
+    """
+    sinir = token_butcesi * KARAKTER_PER_TOKEN
+    if len(metin) <= sinir:
+        return metin
+
+    baslik = f"🗜️ Özet (tam sonuç {len(metin):,} karakter; detay için aracı daha dar filtreyle çağır)\n\n"
+    sinir = max(sinir - len(baslik), 0)
+    # Uzun ayraç çizgileri (----/====) bütçeden yemesin
+    bloklar = [[satir.strip()[:10] if _AYRAC_SATIRI.match(satir) else satir for satir in blok.split('\n')]
+               for blok in re.split(r'\n\s*\n', metin.strip())]
+
+    for n in OZET_SATIR_ADIMLARI:
+        ozet = "\n\n".join("\n".join(_blok_kirp(blok, n)) for blok in bloklar)
+        if len(ozet) <= sinir:
+            break
+    else:
+        kesik = "\n... (kısaltıldı)"
+        ozet = ozet[:max(sinir - len(kesik), 0)] + kesik
+
+    return baslik + ozet
+
+
+def eski_sonuclari_ozetle(messages: list, token_butcesi: int = ESKI_SONUC_TOKEN_BUTCESI) -> int:
+    """
+    messages içindeki tool_result'ları özetleriyle değiştir (yerinde).
+
+    Model bir sonraki yanıtını verdiğinde önceki araç sonuçlarını okumuş olur;
+    sonraki iterasyonlarda tam metni tekrar göndermek sadece bağlamı büyütür.
+    Özet zaten bütçe içinde olduğu için tekrar çağrı bir şey değiştirmez.
+    Kazanılan karakter sayısı döner.
+    """
+    kazanc = 0
+    for mesaj in messages:
+        if mesaj['role'] != 'user' or not isinstance(mesaj['content'], list):
+            continue
+        for parca in mesaj['content']:
+            if parca.get('type') != 'tool_result' or not isinstance(parca.get('content'), str):
+                continue
+            ozet = sonuc_ozeti(parca['content'], token_butcesi)
+            if ozet is not parca['content']:
+                kazanc += len(parca['content']) - len(ozet)
+                parca['content'] = ozet
+    return kazanc
+
+
+# =============================================================================
+# SENARYO MODELİ (ÇEVRİMDIŞI MODEL ARKA UCU)
+# =============================================================================
+
+def _blok_sozlugu(blok):
+    """İstek gövdesini JSON'a çevirirken içerik bloklarını sözlüğe aç"""
+    if hasattr(blok, 'model_dump'):
+        return blok.model_dump()
+    return vars(blok)
+
+
+class _SenaryoAkisi:
+    """SenaryoModeli.stream() dönüşü - SDK'nın MessageStream'i gibi ham olayları üretir"""
+
+    def __init__(self, yanit, gecikme: float):
+        self.yanit = yanit
+        self.gecikme = gecikme
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *hata):
+        return False
+
+    def __aiter__(self):
+        return self._olaylar()
+
+    async def _olaylar(self):
+        if self.gecikme:
+            await asyncio.sleep(self.gecikme)
+        for i, blok in enumerate(self.yanit.content):
+            yield SimpleNamespace(type='content_block_start', index=i, content_block=blok)
+            if blok.type == 'text':
+                for parca in re.findall(r'\S+\s*', blok.text):
+                    yield SimpleNamespace(type='content_block_delta', index=i,
+                                          delta=SimpleNamespace(type='text_delta', text=parca))
+            yield SimpleNamespace(type='content_block_stop', index=i, content_block=blok)
+
+    async def get_final_message(self):
+        return self.yanit
+
+
+class SenaryoModeli:
+    """
+    Canlı API yerine önceden yazılmış tool_use dizisini oynatan deterministik model.
+
+    agent_akisi_async'in AsyncAnthropic'ten kullandığı kısmı (messages.stream)
+    taklit eder; agent döngüsünün LLM dışındaki maliyetini (araçlar, sonuç
+    sıkıştırma, istek serileştirme) ücretsiz ve tekrarlanabilir ölçmek için.
+
+    senaryo: model turu başına blok listesi
+        [{'metin': 'Bakıyorum.'}, {'arac': 'genel_ozet', 'girdi': {}}], ...
+    Hangi turda olunduğu istekteki assistant mesajı sayısından bulunur, bu
+    yüzden aynı nesne eşzamanlı oturumlarda paylaşılabilir. Senaryo bitince
+    'kapanis' metni döner. İstek gövdesi gerçek client'taki gibi JSON'a
+    çevrilir; girdi token'ı bu gövdeden tahmin edilir.
+    """
+
+    def __init__(self, senaryo: list, kapanis: str = "Analiz tamamlandı.", gecikme: float = 0.0):
+        self.senaryo = senaryo
+        self.kapanis = kapanis
+        self.gecikme = gecikme  # Model yanıt süresi (saniye) - varsayılan 0: sadece yerel maliyet
+        self.messages = self  # client.messages.stream(...) arayüzü
+        self.istatistik = {'cagri': 0, 'istek_karakter': 0, 'serilestirme_sure': 0.0}
+
+    def stream(self, **istek):
+        import time
+        bas = time.time()
+        govde = json.dumps(istek, default=_blok_sozlugu, ensure_ascii=False)
+        self.istatistik['cagri'] += 1
+        self.istatistik['istek_karakter'] += len(govde)
+        self.istatistik['serilestirme_sure'] += time.time() - bas
+
+        tur = sum(1 for mesaj in istek['messages'] if mesaj['role'] == 'assistant')
+        adimlar = self.senaryo[tur] if tur < len(self.senaryo) else [{'metin': self.kapanis}]
+
+        content = []
+        for i, adim in enumerate(adimlar):
+            if 'arac' in adim:
+                content.append(SimpleNamespace(type='tool_use', id=f"toolu_{tur:02d}_{i:02d}",
+                                               name=adim['arac'], input=adim.get('girdi', {})))
+            else:
+                content.append(SimpleNamespace(type='text', text=adim['metin']))
+
+        cikti = sum(len(json.dumps(_blok_sozlugu(b), ensure_ascii=False)) for b in content)
+        yanit = SimpleNamespace(
+            content=content,
+            stop_reason='tool_use' if any(b.type == 'tool_use' for b in content) else 'end_turn',
+            usage=SimpleNamespace(input_tokens=token_tahmini(govde), output_tokens=cikti // KARAKTER_PER_TOKEN,
+                                  cache_read_input_tokens=0, cache_creation_input_tokens=0),
+        )
+        return _SenaryoAkisi(yanit, self.gecikme)
+
+
+# =============================================================================
+# PAYLAŞILAN EVENT LOOP, CLIENT VE ARAÇ HAVUZU
+# =============================================================================
+
+_async_kilidi = threading.Lock()
+_arka_plan = {'dongu': None}
+_async_istemciler = {}  # {api_key: AsyncAnthropic} - sadece arka plan döngüsünde kullanılır
+
+
+def _arka_plan_dongusu() -> asyncio.AbstractEventLoop:
+    """
+    Süreç genelinde tek event loop - daemon thread'de sürekli çalışır.
+
+    Her Streamlit oturumu kendi script thread'inde çalışır; agent görevleri bu
+    döngüye gönderilir, böylece ağ beklemeleri birbirini bloklamaz.
+    """
+    with _async_kilidi:
+        dongu = _arka_plan['dongu']
+        if dongu is None or dongu.is_closed():
+            dongu = asyncio.new_event_loop()
+            hazir = threading.Event()
+
+            def calistir():
+                asyncio.set_event_loop(dongu)
+                dongu.call_soon(hazir.set)
+                dongu.run_forever()
+
+            threading.Thread(target=calistir, name='agent-dongusu', daemon=True).start()
+            hazir.wait()
+            _arka_plan['dongu'] = dongu
+            print("🔁 Agent event loop başlatıldı")
+    return dongu
+
+
+def _async_client(api_key: str):
+    """
+    API key başına tek AsyncAnthropic. SDK'nın HTTP client'ı bağlantı havuzu ve
+    keep-alive kullanır; client yaşadıkça TLS bağlantıları iterasyonlar ve
+    oturumlar arasında yeniden kullanılır. Sadece arka plan döngüsünden çağrılır.
+    """
+    client = _async_istemciler.get(api_key)
+    if client is None:
+        client = anthropic.AsyncAnthropic(api_key=api_key, timeout=60.0)  # 60 saniye timeout
+        _async_istemciler[api_key] = client
+        print("   ✅ Anthropic client oluşturuldu (süreç boyunca paylaşılır)")
+    return client
+
+
+async def _arac_olaylari(kup: KupVeri, tool_uses: list, tool_results: list):
+    """
+    Bir yanıttaki tool_use bloklarını eşzamanlı çalıştır (pandas işleri loop'u bloklamaz).
+
+    web_arama'nın ağ beklemesi pandas araçlarıyla örtüşür. Async generator: her
+    araç başlarken 'arac_basladi', biterken 'arac_bitti' olayı üretir; sonuçlar
+    blok sırasıyla tool_results listesine eklenir.
+
+    Havuz çağrıya aittir: bir oturumun yavaş araçları diğer oturumların araçlarını
+    sıraya sokmaz. Süre limiti (ARAC_ZAMAN_ASIMI) aracın thread'de başladığı andan
+    sayılır; aşan araç için hata metni döner, thread arka planda tamamlanır ve
+    sonucu önbelleğe yine yazılır.
+    """
+    import time
+
+    dongu = asyncio.get_running_loop()
+    havuz = ThreadPoolExecutor(max_workers=min(ARAC_PARALEL_SAYISI, len(tool_uses)), thread_name_prefix='arac')
+    baslama = {}  # {tool_use.id: thread'de başladığı an}
+
+    def calistir(tool_use):
+        baslama[tool_use.id] = time.time()
+        return _arac_sonucu(kup, tool_use.name, tool_use.input)
+
+    isler = {}  # {future: (tool_use, limit)}
+    for tool_use in tool_uses:
+        is_ = dongu.run_in_executor(havuz, calistir, tool_use)
+        isler[is_] = (tool_use, ARAC_ZAMAN_ASIMI.get(tool_use.name, VARSAYILAN_ARAC_ZAMAN_ASIMI))
+        yield {'tur': 'arac_basladi', 'id': tool_use.id, 'arac': tool_use.name, 'girdi': tool_use.input}
+
+    def son_tarih(is_) -> float:
+        tool_use, limit = isler[is_]
+        return baslama[tool_use.id] + limit if tool_use.id in baslama else float('inf')
+
+    sonuclar = {}
+    bekleyen = set(isler)
+    try:
+        while bekleyen:
+            kalan = max(0.0, min(son_tarih(is_) for is_ in bekleyen) - time.time())
+            if any(isler[is_][0].id not in baslama for is_ in bekleyen):
+                kalan = min(kalan, ARAC_BASLAMA_YOKLAMA)  # Sıradaki aracın başlama anını kaçırma
+            biten, bekleyen = await asyncio.wait(bekleyen, timeout=kalan, return_when=asyncio.FIRST_COMPLETED)
+            for is_ in biten:
+                tool_use = isler[is_][0]
+                sonuclar[is_] = is_.result()
+                yield {'tur': 'arac_bitti', 'id': tool_use.id, 'arac': tool_use.name, 'karakter': len(sonuclar[is_]),
+                       'sure': round(time.time() - baslama[tool_use.id], 3), 'zaman_asimi': False}
+
+            simdi = time.time()
+            for is_ in [is_ for is_ in bekleyen if son_tarih(is_) <= simdi]:
+                tool_use, limit = isler[is_]
+                bekleyen.discard(is_)
+                sonuclar[is_] = f"Hata: {tool_use.name} {limit} saniyede tamamlanamadı (zaman aşımı)"
+                print(f"      ⏱️ {tool_use.name}: zaman aşımı ({limit}s)")
+                yield {'tur': 'arac_bitti', 'id': tool_use.id, 'arac': tool_use.name, 'karakter': len(sonuclar[is_]),
+                       'sure': round(simdi - baslama[tool_use.id], 3), 'zaman_asimi': True}
+    finally:
+        # Zaman aşımına uğrayan thread'leri bekleme
+        havuz.shutdown(wait=False)
+
+    tool_results.extend({"type": "tool_result", "tool_use_id": tool_use.id, "content": sonuclar[is_]}
+                        for is_, (tool_use, _) in isler.items())
+
+
+def _token_logla(response, token_ozeti: dict):
+    """İterasyonun token kullanımını (prompt cache okuma/yazma dahil) logla ve toplama ekle"""
+    kullanim = getattr(response, 'usage', None)
+    if kullanim is None:
+        return
+    sayilar = {
+        'girdi': getattr(kullanim, 'input_tokens', 0) or 0,
+        'onbellek_okuma': getattr(kullanim, 'cache_read_input_tokens', 0) or 0,
+        'onbellek_yazma': getattr(kullanim, 'cache_creation_input_tokens', 0) or 0,
+        'cikti': getattr(kullanim, 'output_tokens', 0) or 0,
+    }
+    for ad, sayi in sayilar.items():
+        token_ozeti[ad] += sayi
+    print(f"   💾 Token: girdi={sayilar['girdi']:,} | önbellek okuma={sayilar['onbellek_okuma']:,} | "
+          f"önbellek yazma={sayilar['onbellek_yazma']:,} | çıktı={sayilar['cikti']:,}")
+
+
+def _sistem_bloklari(analiz_kurallari: dict = None) -> List[dict]:
+    """Sistem prompt'u: sabit SYSTEM_PROMPT (önbellekli) + kullanıcı kuralları (ayrı blok)"""
+    system_bloklari = [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": ONBELLEK_ISARETI}]
     
     if analiz_kurallari:
         kural_eki = "\n\n## 📋 KULLANICI TANIMI ANALİZ KURALLARI\n"
@@ -2867,146 +4356,230 @@ def agent_calistir(api_key: str, kup: KupVeri, kullanici_mesaji: str, analiz_kur
         if analiz_kurallari.get('ek_talimatlar'):
             kural_eki += f"\n### Ek Talimatlar:\n{analiz_kurallari['ek_talimatlar']}\n"
         
-        system_prompt = SYSTEM_PROMPT + kural_eki
+        system_bloklari.append({"type": "text", "text": kural_eki.lstrip("\n")})
         print(f"   📋 Analiz kuralları eklendi ({len(kural_eki)} karakter)")
     
+    return system_bloklari
+
+
+async def agent_akisi_async(api_key: str, kup: KupVeri, kullanici_mesaji: str, analiz_kurallari: dict = None,
+                            model=None):
+    """
+    Agent döngüsü (async generator) - olaylar oluştukça üretilir:
+
+    {'tur': 'metin', 'metin': parça}          model metni (stream delta)
+    {'tur': 'metin_sonu'}                     bir metin bloğu bitti
+    {'tur': 'arac_basladi', 'arac', 'girdi'}  araç çalışmaya başladı
+    {'tur': 'arac_bitti', 'arac', 'karakter', 'sure', 'zaman_asimi'}
+    {'tur': 'uyari', 'metin': ...}            zaman limiti / API hatası (cevaba eklenir)
+    {'tur': 'hata', 'metin': ...}             client kurulamadı, döngü çalışmadı
+    {'tur': 'iterasyon', 'no', 'sure', 'model_sure', 'arac_sure', 'ozet_sure'}
+    {'tur': 'bitti', 'token': {...}, 'arac_onbellegi': {...}}
+
+    API çağrıları süreç genelindeki AsyncAnthropic ile, araçlar çağrıya ait thread
+    havuzunda yapılır; aynı loop'taki diğer oturumlar beklemez. _arka_plan_dongusu()
+    üzerinde çalıştırılmalı - agent_akisi / agent_calistir_async bunu sağlar.
+
+    model: messages.stream(...) arayüzlü model arka ucu. Verilmezse api_key'in
+    paylaşılan AsyncAnthropic'i kullanılır; çevrimdışı ölçüm için SenaryoModeli.
+    """
+    
+    import time
+    start_time = time.time()
+    
+    print(f"\n🤖 AGENT BAŞLADI: {kullanici_mesaji[:50]}...")
+    if model is None:
+        print(f"   API Key: {api_key[:20]}...")
+    else:
+        print(f"   Model: {type(model).__name__}")
+    
+    try:
+        client = model if model is not None else _async_client(api_key)
+    except Exception as e:
+        print(f"   ❌ Client hatası: {e}")
+        yield {'tur': 'hata', 'metin': f"❌ API Client hatası: {str(e)}"}
+        return
+    
+    system_bloklari = _sistem_bloklari(analiz_kurallari)
+    
     messages = [{"role": "user", "content": kullanici_mesaji}]
     
-    tum_cevaplar = []
+    token_ozeti = {'girdi': 0, 'onbellek_okuma': 0, 'onbellek_yazma': 0, 'cikti': 0}
     max_iterasyon = 12  # 8'den 12'ye çıkardım
     iterasyon = 0
     
     while iterasyon < max_iterasyon:
         iterasyon += 1
+        iterasyon_basi = time.time()
         print(f"\n   📡 İterasyon {iterasyon}/{max_iterasyon} - API çağrısı yapılıyor...")
         
         # Süre kontrolü - 120 saniyeyi geçerse dur
         elapsed = time.time() - start_time
         if elapsed > 120:
             print(f"   ⏱️ Zaman aşımı! ({elapsed:.1f}s)")
-            tum_cevaplar.append("\n⏱️ Zaman limiti aşıldı. Mevcut bulgular yukarıda.")
+            yield {'tur': 'uyari', 'metin': "\n⏱️ Zaman limiti aşıldı. Mevcut bulgular yukarıda."}
             break
         
+        metin_blogunda = False
         try:
-            response = client.messages.create(
+            async with client.messages.stream(
                 model="claude-sonnet-4-20250514",
                 max_tokens=4096,  # Daha uzun yanıtlar için artırıldı
-                system=system_prompt,
-                tools=TOOLS,
+                system=system_bloklari,
+                tools=TOOLS_ONBELLEKLI,
                 messages=messages
-            )
+            ) as stream:
+                async for event in stream:
+                    # Ham olaylar her SDK sürümünde gelir (yeni sürümlerin ek 'text' olayı kullanılmaz)
+                    if event.type == "content_block_start":
+                        metin_blogunda = event.content_block.type == "text"
+                    elif event.type == "content_block_delta" and event.delta.type == "text_delta":
+                        yield {'tur': 'metin', 'metin': event.delta.text}
+                    elif event.type == "content_block_stop" and metin_blogunda:
+                        metin_blogunda = False
+                        yield {'tur': 'metin_sonu'}
+                response = await stream.get_final_message()
             print(f"   ✅ API yanıt aldı: stop_reason={response.stop_reason}")
+            _token_logla(response, token_ozeti)
         except Exception as api_error:
-            tum_cevaplar.append(f"\n❌ API Hatası: {str(api_error)}")
+            if metin_blogunda:
+                yield {'tur': 'metin_sonu'}
+            yield {'tur': 'uyari', 'metin': f"\n❌ API Hatası: {str(api_error)}"}
             break
-        
-        # Text içeriklerini topla
-        for block in response.content:
-            if block.type == "text":
-                tum_cevaplar.append(block.text)
+        model_sure = time.time() - iterasyon_basi
         
         # Tool kullanımlarını topla
         tool_uses = [block for block in response.content if block.type == "tool_use"]
         
         # Tool kullanımı yoksa bitir
         if not tool_uses:
+            yield {'tur': 'iterasyon', 'no': iterasyon, 'sure': model_sure,
+                   'model_sure': model_sure, 'arac_sure': 0.0, 'ozet_sure': 0.0}
             break
         
+        # Model önceki araç sonuçlarını okudu - bundan sonra özetleri yeterli
+        ozet_basi = time.time()
+        kazanc = eski_sonuclari_ozetle(messages)
+        ozet_sure = time.time() - ozet_basi
+        if kazanc:
+            print(f"   🗜️ Eski araç sonuçları özetlendi: -{kazanc:,} karakter (~{kazanc // KARAKTER_PER_TOKEN:,} token)")
+        
         # Assistant mesajını ekle
         messages.append({"role": "assistant", "content": response.content})
         
-        # Tüm tool'lar için sonuçları topla
+        # Tüm tool'lar için sonuçları topla (eşzamanlı, blok sırasıyla)
         tool_results = []
-        for tool_use in tool_uses:
-            tool_name = tool_use.name
-            tool_input = tool_use.input
-            tool_use_id = tool_use.id
-            
-            # Tool'u çağır
-            try:
-                if tool_name == "web_arama":
-                    tool_result = web_arama(tool_input.get("sorgu", "Türkiye enflasyon"))
-                elif tool_name == "genel_ozet":
-                    tool_result = genel_ozet(kup)
-                elif tool_name == "trading_analiz":
-                    tool_result = trading_analiz(
-                        kup,
-                        ana_grup=tool_input.get("ana_grup", None),
-                        ara_grup=tool_input.get("ara_grup", None)
-                    )
-                elif tool_name == "cover_analiz":
-                    tool_result = cover_analiz(kup, tool_input.get("sayfa", None))
-                elif tool_name == "cover_diagram_analiz":
-                    tool_result = cover_diagram_analiz(
-                        kup,
-                        alt_grup=tool_input.get("alt_grup", None),
-                        magaza=tool_input.get("magaza", None)
-                    )
-                elif tool_name == "kapasite_analiz":
-                    tool_result = kapasite_analiz(
-                        kup,
-                        magaza=tool_input.get("magaza", None)
-                    )
-                elif tool_name == "siparis_takip_analiz":
-                    tool_result = siparis_takip_analiz(
-                        kup,
-                        ana_grup=tool_input.get("ana_grup", None)
-                    )
-                elif tool_name == "ihtiyac_hesapla":
-                    tool_result = ihtiyac_hesapla(kup, tool_input.get("limit", 30))
-                elif tool_name == "kategori_analiz":
-                    tool_result = kategori_analiz(kup, tool_input.get("kategori_kod", ""))
-                elif tool_name == "magaza_analiz":
-                    tool_result = magaza_analiz(kup, tool_input.get("magaza_kod", ""))
-                elif tool_name == "urun_analiz":
-                    tool_result = urun_analiz(kup, tool_input.get("urun_kod", ""))
-                elif tool_name == "sevkiyat_plani":
-                    tool_result = sevkiyat_plani(kup, tool_input.get("limit", 30))
-                elif tool_name == "fazla_stok_analiz":
-                    tool_result = fazla_stok_analiz(kup, tool_input.get("limit", 30))
-                elif tool_name == "bolge_karsilastir":
-                    tool_result = bolge_karsilastir(kup)
-                elif tool_name == "sevkiyat_hesapla":
-                    tool_result = sevkiyat_hesapla(
-                        kup,
-                        kategori_kod=tool_input.get("kategori_kod", None),
-                        urun_kod=tool_input.get("urun_kod", None),
-                        marka_kod=tool_input.get("marka_kod", None),
-                        forward_cover=tool_input.get("forward_cover", 7.0),
-                        export_excel=tool_input.get("export_excel", False)
-                    )
-                else:
-                    tool_result = f"Bilinmeyen araç: {tool_name}"
-                
-                # Sonucu logla
-                print(f"      🔧 {tool_name}: {len(tool_result)} karakter")
-                
-                # Sonuç çok uzunsa kısalt (API limiti için)
-                if len(tool_result) > 8000:
-                    tool_result = tool_result[:8000] + "\n\n... (kısaltıldı)"
-                    print(f"      ⚠️ Sonuç kısaltıldı: 8000 karakter")
-                    
-            except Exception as e:
-                tool_result = f"Hata: {str(e)}"
-                print(f"      ❌ Tool hatası: {e}")
-            
-            tool_results.append({
-                "type": "tool_result",
-                "tool_use_id": tool_use_id,
-                "content": tool_result
-            })
+        arac_basi = time.time()
+        async for olay in _arac_olaylari(kup, tool_uses, tool_results):
+            yield olay
+        arac_sure = time.time() - arac_basi
         
         # Tüm tool sonuçlarını tek bir user mesajında gönder
         messages.append({
             "role": "user",
             "content": tool_results
         })
+        yield {'tur': 'iterasyon', 'no': iterasyon, 'sure': time.time() - iterasyon_basi,
+               'model_sure': model_sure, 'arac_sure': arac_sure, 'ozet_sure': ozet_sure}
         
         # Stop reason end_turn ise bitir
         if response.stop_reason == "end_turn":
             break
     
-    return "\n".join(tum_cevaplar)
+    print(f"   💾 Toplam token: girdi={token_ozeti['girdi']:,} | önbellek okuma={token_ozeti['onbellek_okuma']:,} | "
+          f"önbellek yazma={token_ozeti['onbellek_yazma']:,} | çıktı={token_ozeti['cikti']:,}")
+    ist = kup.arac_onbellegi.istatistik()
+    print(f"   ⚡ Araç önbelleği: {ist['isabet']} isabet / {ist['iska']} ıska ({ist['boyut']} kayıt)")
+    yield {'tur': 'bitti', 'token': token_ozeti, 'arac_onbellegi': ist}
+
+
+def agent_akisi(api_key: str, kup: KupVeri, kullanici_mesaji: str, analiz_kurallari: dict = None, model=None):
+    """
+    agent_akisi_async'in senkron hali: döngü paylaşılan arka plan loop'unda çalışır,
+    olaylar bu thread'e kuyrukla taşınır. Tüketici erken bırakırsa (ör. Streamlit
+    rerun) loop'taki görev iptal edilir.
+    """
+    kuyruk = queue.Queue()
+    bitti = object()
+
+    async def tasi():
+        try:
+            async for olay in agent_akisi_async(api_key, kup, kullanici_mesaji, analiz_kurallari, model):
+                kuyruk.put(olay)
+        except Exception as e:
+            kuyruk.put(e)
+        finally:
+            kuyruk.put(bitti)
+
+    gorev = asyncio.run_coroutine_threadsafe(tasi(), _arka_plan_dongusu())
+    try:
+        while True:
+            olay = kuyruk.get()
+            if olay is bitti:
+                break
+            if isinstance(olay, Exception):
+                raise olay
+            yield olay
+    finally:
+        gorev.cancel()
+
+
+class AkisCevabi:
+    """agent_akisi olaylarından cevap metnini biriktirir - arayüz her olaydan sonra .metin'i çizebilir"""
+
+    def __init__(self):
+        self.parcalar = []
+        self._blok = []
+
+    def ekle(self, olay: dict) -> bool:
+        """Olayı işle; cevap metni değiştiyse True"""
+        tur = olay['tur']
+        if tur == 'metin':
+            self._blok.append(olay['metin'])
+        elif tur == 'metin_sonu':
+            self.parcalar.append("".join(self._blok))
+            self._blok = []
+        elif tur == 'uyari':
+            self.parcalar.append(olay['metin'])
+        elif tur == 'hata':
+            self.parcalar = [olay['metin']]
+            self._blok = []
+        else:
+            return False
+        return True
+
+    @property
+    def metin(self) -> str:
+        return "\n".join(self.parcalar + (["".join(self._blok)] if self._blok else []))
+
+
+async def agent_calistir_async(api_key: str, kup: KupVeri, kullanici_mesaji: str, analiz_kurallari: dict = None,
+                               model=None) -> str:
+    """
+    agent_calistir'in async hali - birden fazla soru eşzamanlı beklenebilir.
+    Döngü her zaman paylaşılan arka plan loop'unda koşar (client o loop'a bağlı);
+    çağıranın loop'u sadece sonucu bekler.
+    """
+    async def topla():
+        cevap = AkisCevabi()
+        async for olay in agent_akisi_async(api_key, kup, kullanici_mesaji, analiz_kurallari, model):
+            cevap.ekle(olay)
+        return cevap.metin
+
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(topla(), _arka_plan_dongusu()))
+
+
+def agent_calistir(api_key: str, kup: KupVeri, kullanici_mesaji: str, analiz_kurallari: dict = None,
+                   model=None) -> str:
+    """Agent'ı çalıştır ve sonuç al (agent_akisi'nın tamamı beklenir)
+    
+    analiz_kurallari: Kullanıcının tanımladığı eşikler ve yorumlar
+    model: Model arka ucu (varsayılan: canlı API, ör. SenaryoModeli ile çevrimdışı)
+    """
+    cevap = AkisCevabi()
+    for olay in agent_akisi(api_key, kup, kullanici_mesaji, analiz_kurallari, model):
+        cevap.ekle(olay)
+    return cevap.metin
 
 
 # =============================================================================
@@ -9,6 +9,10 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 import os
+import shutil
+import tempfile
+import time
+import weakref
 import base64
 from io import BytesIO
 import asyncio
@@ -373,6 +377,39 @@ def sesli_oku(metin: str, ses: str = "tr-TR-AhmetNeural") -> str:
         return f"<p style='color: red;'>❌ Ses hatası: {str(e)}</p>"
 
 
+# ============================================
+# 📂 OTURUM VERİ KLASÖRÜ
+# ============================================
+# Yüklenen dosyalar tek bir kök altında oturum başına klasörde tutulur
+VERI_KOK_KLASORU = os.path.join(tempfile.gettempdir(), "sanal_planner_veri")
+VERI_KLASORU_OMRU = 24 * 3600  # Kapanışı kaçırmış (çöken süreç vb.) klasörler bu süre sonra silinir
+
+
+class _KlasorBekcisi:
+    """session_state'te tutulur; oturum kapanıp bekçi silinince (veya yenisiyle değişince) klasörü kaldırır"""
+    def __init__(self, klasor: str):
+        self.klasor = klasor
+        weakref.finalize(self, shutil.rmtree, klasor, True)
+
+
+def yeni_veri_klasoru() -> str:
+    """Oturum için yeni veri klasörü aç, öncekini ve kökteki sahipsiz eski klasörleri temizle"""
+    os.makedirs(VERI_KOK_KLASORU, exist_ok=True)
+    esik = time.time() - VERI_KLASORU_OMRU
+    for ad in os.listdir(VERI_KOK_KLASORU):
+        yol = os.path.join(VERI_KOK_KLASORU, ad)
+        try:
+            if os.path.getmtime(yol) < esik:
+                shutil.rmtree(yol, ignore_errors=True)
+        except OSError:
+            pass
+    
+    klasor = tempfile.mkdtemp(prefix="oturum_", dir=VERI_KOK_KLASORU)
+    st.session_state['_veri_klasoru_bekcisi'] = _KlasorBekcisi(klasor)  # Önceki bekçi klasörüyle gider
+    st.session_state['veri_klasoru'] = klasor
+    return klasor
+
+
 # ============================================
 # STREAMLIT ARAYÜZÜ
 # ============================================
@@ -437,19 +474,38 @@ with st.sidebar:
     if uploaded_files:
         if st.button("📂 Veriyi Yükle", use_container_width=True):
             try:
-                import tempfile
                 from agent_tools import KupVeri
                 
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    for uploaded_file in uploaded_files:
-                        file_path = os.path.join(temp_dir, uploaded_file.name)
-                        with open(file_path, 'wb') as f:
-                            f.write(uploaded_file.getbuffer())
-                        st.caption(f"✅ {uploaded_file.name}")
-                    
-                    with st.spinner("Veri işleniyor..."):
+                # Excel raporları ilk kullanımda okunduğu için klasör oturum boyunca yaşamalı.
+                # Aynı klasör tekrar kullanılır: sonraki yüklemede sadece değişen dosyalar işlenir.
+                temp_dir = st.session_state.get('veri_klasoru')
+                if not temp_dir or not os.path.isdir(temp_dir):
+                    temp_dir = yeni_veri_klasoru()
+                
+                # Seçimden çıkarılan dosyaları da klasörden kaldır
+                yuklenen_adlar = {f.name for f in uploaded_files}
+                for eski in os.listdir(temp_dir):
+                    if eski not in yuklenen_adlar:
+                        os.remove(os.path.join(temp_dir, eski))
+                
+                for uploaded_file in uploaded_files:
+                    file_path = os.path.join(temp_dir, uploaded_file.name)
+                    with open(file_path, 'wb') as f:
+                        f.write(uploaded_file.getbuffer())
+                    st.caption(f"✅ {uploaded_file.name}")
+                
+                with st.spinner("Veri işleniyor..."):
+                    kup = st.session_state.get('kup')
+                    if kup is not None and getattr(kup, 'veri_klasoru', None) == temp_dir:
+                        # İçerik hash'i ile değişenleri bul, sadece onları yeniden işle
+                        yenileme = kup.yenile()
+                        if yenileme['degisen_dosyalar']:
+                            st.caption(f"🔄 Güncellenen: {', '.join(yenileme['degisen_dosyalar'])}")
+                        else:
+                            st.caption("ℹ️ Dosyalarda değişiklik yok")
+                    else:
                         st.session_state['kup'] = KupVeri(temp_dir)
-                        st.session_state['kup_yuklendi'] = True
+                    st.session_state['kup_yuklendi'] = True
                 
                 st.success("✅ Veri yüklendi!")
                 st.rerun()
@@ -462,14 +518,16 @@ with st.sidebar:
     if st.session_state.get('kup_yuklendi') and 'kup' in st.session_state:
         st.success("✅ Veri hazır")
         kup = st.session_state['kup']
-        if len(kup.trading) > 0:
-            st.caption(f"📈 Trading: {len(kup.trading):,} satır")
-        if hasattr(kup, 'cover_diagram') and len(kup.cover_diagram) > 0:
-            st.caption(f"🎯 Cover Diagram: {len(kup.cover_diagram):,} satır")
-        if hasattr(kup, 'kapasite') and len(kup.kapasite) > 0:
-            st.caption(f"🏪 Kapasite: {len(kup.kapasite):,} satır")
-        if hasattr(kup, 'siparis_takip') and len(kup.siparis_takip) > 0:
-            st.caption(f"📋 Sipariş Takip: {len(kup.siparis_takip):,} satır")
+        if os.path.isdir(kup.veri_klasoru):
+            os.utime(kup.veri_klasoru)  # Kullanılan klasör sahipsiz sayılıp temizlenmesin
+        # Raporlar tembel yüklenir - sadece yüklenmiş olanların satır sayısına bak
+        for rapor, etiket in [('trading', "📈 Trading"), ('cover_diagram', "🎯 Cover Diagram"),
+                              ('kapasite', "🏪 Kapasite"), ('siparis_takip', "📋 Sipariş Takip")]:
+            if kup.rapor_yuklendi_mi(rapor):
+                if len(getattr(kup, rapor)) > 0:
+                    st.caption(f"{etiket}: {len(getattr(kup, rapor)):,} satır")
+            elif kup.rapor_mevcut_mu(rapor):
+                st.caption(f"{etiket}: ilk kullanımda yüklenecek")
     else:
         st.info("👆 Dosyaları yükleyin")
     
@@ -532,7 +590,12 @@ with st.sidebar:
     ana_grup_listesi = []
     if st.session_state.get('kup_yuklendi') and 'kup' in st.session_state:
         kup = st.session_state['kup']
-        if len(kup.trading) > 0:
+        # Trading henüz okunmadıysa sadece istenirse yükle
+        if not kup.rapor_yuklendi_mi('trading') and kup.rapor_mevcut_mu('trading'):
+            if st.button("📈 Ana grupları getir", use_container_width=True, key="btn_ana_grup_yukle"):
+                with st.spinner("Trading raporu okunuyor..."):
+                    kup.trading  # İlk erişim yüklemeyi tetikler
+        if kup.rapor_yuklendi_mi('trading') and len(kup.trading) > 0:
             # Mevcut Ana Grup kolonunu bul
             ana_grup_kolon = None
             for col in kup.trading.columns:
@@ -598,30 +661,45 @@ if mesaj:
     else:
         st.markdown(f'<div class="chat-message user-message">🧑 {mesaj}</div>', unsafe_allow_html=True)
         
-        with st.spinner("🤖 Sanal Planner düşünüyor..."):
-            try:
-                from agent_tools import agent_calistir
-                
-                analiz_kurallari = st.session_state.get('analiz_kurallari', None)
-                sonuc = agent_calistir(api_key, st.session_state['kup'], mesaj, analiz_kurallari=analiz_kurallari)
-                
-                if sonuc and len(sonuc.strip()) > 0:
-                    st.session_state['messages'].append({'role': 'user', 'content': mesaj})
-                    st.session_state['messages'].append({'role': 'agent', 'content': sonuc})
-                    st.markdown(f'<div class="chat-message agent-message">🤖 {sonuc}</div>', unsafe_allow_html=True)
-                    
-                    if st.session_state.get('sesli_aktif', False):
-                        sesli_metin = sonuc.split("📊")[0] if "📊" in sonuc else sonuc[:1500]
-                        ses_turu = st.session_state.get('ses_turu', 'tr-TR-AhmetNeural')
-                        audio_html = sesli_oku(sesli_metin.strip(), ses=ses_turu)
-                        st.markdown(audio_html, unsafe_allow_html=True)
-                else:
-                    st.warning("⚠️ Agent yanıt vermedi.")
-                    
-            except Exception as e:
-                import traceback
-                st.error(f"❌ Hata: {str(e)}")
-                st.code(traceback.format_exc())
+        # Cevap akarken parça parça çizilir, araç adımları durum kutusunda görünür
+        durum = st.status("🤖 Sanal Planner düşünüyor...", expanded=False)
+        cevap_alani = st.empty()
+        try:
+            from agent_tools import agent_akisi, AkisCevabi
+
+            analiz_kurallari = st.session_state.get('analiz_kurallari', None)
+            cevap = AkisCevabi()
+            for olay in agent_akisi(api_key, st.session_state['kup'], mesaj, analiz_kurallari=analiz_kurallari):
+                if cevap.ekle(olay):
+                    cevap_alani.markdown(f'<div class="chat-message agent-message">🤖 {cevap.metin}</div>', unsafe_allow_html=True)
+                elif olay['tur'] == 'arac_basladi':
+                    durum.update(label=f"🔧 {olay['arac']} çalışıyor...")
+                    durum.write(f"🔧 {olay['arac']} başladı")
+                elif olay['tur'] == 'arac_bitti':
+                    if olay['zaman_asimi']:
+                        durum.write(f"⏱️ {olay['arac']} zaman aşımı ({olay['sure']:.1f}s)")
+                    else:
+                        durum.write(f"✅ {olay['arac']} ({olay['sure']:.1f}s, {olay['karakter']:,} karakter)")
+            durum.update(label="✅ Analiz tamamlandı", state="complete")
+            sonuc = cevap.metin
+
+            if sonuc and len(sonuc.strip()) > 0:
+                st.session_state['messages'].append({'role': 'user', 'content': mesaj})
+                st.session_state['messages'].append({'role': 'agent', 'content': sonuc})
+
+                if st.session_state.get('sesli_aktif', False):
+                    sesli_metin = sonuc.split("📊")[0] if "📊" in sonuc else sonuc[:1500]
+                    ses_turu = st.session_state.get('ses_turu', 'tr-TR-AhmetNeural')
+                    audio_html = sesli_oku(sesli_metin.strip(), ses=ses_turu)
+                    st.markdown(audio_html, unsafe_allow_html=True)
+            else:
+                st.warning("⚠️ Agent yanıt vermedi.")
+
+        except Exception as e:
+            import traceback
+            durum.update(label="❌ Hata", state="error")
+            st.error(f"❌ Hata: {str(e)}")
+            st.code(traceback.format_exc())
 
 
 # Alt butonlar
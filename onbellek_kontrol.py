@@ -0,0 +1,76 @@
+"""
+ARAÇ ÖNBELLEĞİ KONTROLÜ
+=======================
+arac_calistir önbelleğinin, anahtarı paylaşan çağrılara aracın doğrudan
+çağrısıyla aynı sonucu verdiğini kontrol eder.
+
+Girdi normalize edilerek anahtarlanır (metinler kırpılır, None alanlar atılır).
+Her durumda önce "kirli" girdi (boşluklu metin, None alan) sonra temiz girdi
+çağrılır; ikisi de aracın temiz girdiyle doğrudan çağrısına eşit olmalı,
+ikinci çağrı önbellekten gelmeli.
+
+Kullanım:
+    python onbellek_kontrol.py
+"""
+
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+from agent_tools import KupVeri, arac_calistir, _araci_cagir
+from yenileme_kontrol import ornek_veri_yaz
+
+
+# (araç, kirli girdi, temiz girdi)
+DURUMLAR = [
+    ('urun_analiz', {'urun_kod': '1000005 '}, {'urun_kod': '1000005'}),
+    ('magaza_analiz', {'magaza_kod': ' 1003'}, {'magaza_kod': '1003'}),
+    ('kategori_analiz', {'kategori_kod': '12 '}, {'kategori_kod': '12'}),
+    ('ihtiyac_hesapla', {'limit': None}, {}),
+]
+
+
+def kontrol(kup: KupVeri) -> bool:
+    basarili = True
+    for arac, kirli, temiz in DURUMLAR:
+        kup.arac_onbellegi.temizle()
+        with contextlib.redirect_stdout(io.StringIO()):
+            beklenen = _araci_cagir(kup, arac, temiz)
+            ilk = arac_calistir(kup, arac, kirli)
+            isabet = kup.arac_onbellegi.isabet
+            ikinci = arac_calistir(kup, arac, temiz)
+
+        hatalar = []
+        if ilk != beklenen:
+            hatalar.append(f"{kirli} doğrudan çağrıdan farklı")
+        if ikinci != beklenen:
+            hatalar.append(f"{temiz} doğrudan çağrıdan farklı")
+        if kup.arac_onbellegi.isabet != isabet + 1:
+            hatalar.append("ikinci çağrı önbellekten gelmedi")
+        if hatalar:
+            basarili = False
+            print(f"❌ {arac}: {'; '.join(hatalar)}")
+        else:
+            print(f"✅ {arac}: {kirli} = {temiz}")
+    return basarili
+
+
+def main():
+    gecici = tempfile.mkdtemp(prefix='onbellek_kontrol_')
+    try:
+        klasor = os.path.join(gecici, 'veri')
+        ornek_veri_yaz(klasor)
+        with contextlib.redirect_stdout(io.StringIO()):
+            kup = KupVeri(klasor, snapshot_klasoru=os.path.join(gecici, 'snapshot'))
+        basarili = kontrol(kup)
+    finally:
+        shutil.rmtree(gecici, ignore_errors=True)
+    print("\n✅ Önbellek doğrudan çağrıyla tutarlı" if basarili else "\n❌ Önbellek doğrudan çağrıdan farklı")
+    sys.exit(0 if basarili else 1)
+
+
+if __name__ == "__main__":
+    main()
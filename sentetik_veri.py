@@ -0,0 +1,377 @@
+"""
+SENTETİK KÜP ÜRETİCİ
+====================
+Gerçek müşteri dosyaları olmadan KupVeri, SevkiyatMotoru ve rapor araçlarını
+ölçekli test etmek için veri klasörü üretir:
+
+    anlik_stok_satis_*.csv   mağaza×ürün stok/satış (parçalı)
+    urun_master.csv          kategori / ÜMG / MG / marka
+    magaza_master.csv        il / bölge / tip / depo
+    depo_stok.csv            depo×ürün stok
+    kpi.csv                  MG bazında min/max/forward cover
+    trading.xlsx             Genel Toplam / Ana / Ara / Alt grup satırları ('mtd' sayfası)
+    EVE SC Tablosu.xlsx      'LW-TW Cover Analiz' sayfası
+    Cover Diagram.xlsx       mağaza×alt grup cover
+    Kapasite Periyod.xlsx    mağaza doluluk / performans
+    siparis_takip.xlsx       alt grup bazında alım bütçesi ve sipariş
+
+Excel başlıkları RAPOR_KOLONLARI eşleştiricilerinin beklediği adlarla yazılır.
+Rapor değerleri küpün kendisinden toplanır (ciro payları, cover, marj tutarlı).
+
+Ölçek: --magaza/--urun 1× boyutu verir, --olcek satır sayısını katlar
+(mağaza ve ürün sayısı √olcek ile büyür). Çarpıklık (Zipf üssü) ürün
+popülerliğini ve mağaza büyüklüğünü belirler: 0 = düzgün, 1+ = az sayıda
+çok satan ürün / büyük mağaza. Aynı tohum aynı klasörü üretir.
+
+Kullanım:
+    python sentetik_veri.py ./veri_1x
+    python sentetik_veri.py ./veri_10x --olcek 10
+    python sentetik_veri.py ./veri_100x --olcek 100 --parca 16 --rapor-yok
+    python sentetik_veri.py ./veri --magaza 250 --urun 5000 --depo 4 --carpiklik 1.3
+"""
+
+import argparse
+import math
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# xlsxwriter yazmada openpyxl'den hızlı - yüklüyse onu kullan
+try:
+    import xlsxwriter  # noqa: F401
+    XLSXWRITER_AVAILABLE = True
+except ImportError:
+    XLSXWRITER_AVAILABLE = False
+
+EXCEL_YAZICI = 'xlsxwriter' if XLSXWRITER_AVAILABLE else 'openpyxl'
+
+
+# =============================================================================
+# VARSAYILANLAR
+# =============================================================================
+
+TEMEL_MAGAZA = 100       # 1× mağaza sayısı
+TEMEL_URUN = 2000        # 1× ürün sayısı
+BLOK_HUCRE = 2_000_000   # Bir seferde üretilen mağaza×ürün hücresi (bellek sınırı)
+
+# kategori_kod -> (ana grup adı, ara grup adları)
+KATEGORILER = {
+    11: ('RENKLİ KOZMETİK', ['Göz', 'Dudak', 'Yüz', 'Tırnak']),
+    14: ('SAÇ', ['Şampuan', 'Saç Boyası', 'Şekillendirici', 'Saç Bakım']),
+    16: ('CİLT', ['Nemlendirici', 'Temizleyici', 'Güneş', 'Serum']),
+    19: ('PARFÜM', ['Kadın', 'Erkek', 'Unisex']),
+    20: ('KİŞİSEL BAKIM', ['Deodorant', 'Duş', 'Ağız Bakım', 'Tıraş']),
+}
+KATEGORI_AGIRLIK = [0.3, 0.2, 0.2, 0.1, 0.2]
+
+# il -> bölge
+ILLER = {
+    'İSTANBUL': 'MARMARA', 'KOCAELİ': 'MARMARA', 'BURSA': 'MARMARA',
+    'ANKARA': 'İÇ ANADOLU', 'KONYA': 'İÇ ANADOLU', 'ESKİŞEHİR': 'İÇ ANADOLU',
+    'İZMİR': 'EGE', 'AYDIN': 'EGE', 'ANTALYA': 'AKDENİZ', 'ADANA': 'AKDENİZ',
+    'SAMSUN': 'KARADENİZ', 'TRABZON': 'KARADENİZ', 'GAZİANTEP': 'GÜNEYDOĞU',
+}
+IL_AGIRLIK = np.array([8, 2, 2, 4, 1, 1, 3, 1, 2, 1, 1, 1, 1], dtype=float)
+
+
+def _zipf_agirlik(rng, n: int, us: float) -> np.ndarray:
+    """Ortalaması 1 olan Zipf ağırlıkları, sıra kodlar arasında karışık"""
+    agirlik = 1.0 / (rng.permutation(n) + 1.0) ** us
+    return agirlik / agirlik.mean()
+
+
+def _oran(pay, payda) -> np.ndarray:
+    """Sıfıra bölmeden oran (payda 0 ise 0)"""
+    pay, payda = np.asarray(pay, dtype=float), np.asarray(payda, dtype=float)
+    return np.divide(pay, payda, out=np.zeros_like(pay), where=payda != 0)
+
+
+# =============================================================================
+# MASTER TABLOLAR
+# =============================================================================
+
+def _hiyerarsi(rng, urun_sayisi: int) -> pd.DataFrame:
+    """MG tablosu: mg, umg, kategori_kod, ana/ara/alt grup adı"""
+    mg_sayisi = int(np.clip(urun_sayisi // 50, 6, 300))
+    kategori = rng.choice(list(KATEGORILER), mg_sayisi, p=KATEGORI_AGIRLIK)
+    kategori[:len(KATEGORILER)] = list(KATEGORILER)  # her kategoride en az bir MG
+
+    satirlar = []
+    for kat in KATEGORILER:
+        ana, aralar = KATEGORILER[kat]
+        mg_indeksleri = np.flatnonzero(kategori == kat)
+        for j, i in enumerate(mg_indeksleri):
+            ara_no = j % len(aralar)
+            satirlar.append({'mg': 1000 + i, 'umg': kat * 10 + ara_no, 'kategori_kod': kat,
+                             'ana_grup': ana, 'ara_grup': aralar[ara_no],
+                             'alt_grup': f"{aralar[ara_no]} {j // len(aralar) + 1}"})
+    return pd.DataFrame(satirlar).sort_values('mg', ignore_index=True)
+
+
+def _urun_master(rng, urun_sayisi: int, hiyerarsi: pd.DataFrame):
+    """Ürün master + her ürünün hiyerarsi satır indeksi"""
+    mg_indeksi = rng.integers(0, len(hiyerarsi), urun_sayisi)
+    return pd.DataFrame({
+        'urun_kod': np.arange(1000000, 1000000 + urun_sayisi),
+        'kategori_kod': hiyerarsi['kategori_kod'].to_numpy()[mg_indeksi],
+        'umg': hiyerarsi['umg'].to_numpy()[mg_indeksi],
+        'mg': hiyerarsi['mg'].to_numpy()[mg_indeksi],
+        'marka_kod': rng.integers(1, max(2, urun_sayisi // 40), urun_sayisi),
+        'nitelik': rng.choice(['A', 'B', 'C'], urun_sayisi, p=[0.2, 0.5, 0.3]),
+        'durum': 'AKTIF',
+    }), mg_indeksi
+
+
+def _magaza_master(rng, magaza_sayisi: int, depo_sayisi: int) -> pd.DataFrame:
+    iller = rng.choice(list(ILLER), magaza_sayisi, p=IL_AGIRLIK / IL_AGIRLIK.sum())
+    return pd.DataFrame({
+        'magaza_kod': np.arange(1000, 1000 + magaza_sayisi),
+        'il': iller,
+        'bolge': [ILLER[il] for il in iller],
+        'tip': rng.choice(['AVM', 'CADDE'], magaza_sayisi, p=[0.7, 0.3]),
+        'depo_kod': 9001 + rng.integers(0, depo_sayisi, magaza_sayisi),
+    })
+
+
+# =============================================================================
+# ÜRETİCİ
+# =============================================================================
+
+def sentetik_kup(hedef: str, magaza: int = TEMEL_MAGAZA, urun: int = TEMEL_URUN, depo: int = 2,
+                 olcek: float = 1.0, carpiklik: float = 1.0, yogunluk: float = 0.4, parca: int = 3,
+                 tohum: int = 0, raporlar: bool = True) -> dict:
+    """
+    hedef klasörüne sentetik küp yaz, özet sözlük döndür.
+
+    magaza, urun: 1× boyut; olcek satır sayısını katlar (ikisi de √olcek ile büyür)
+    yogunluk: ortalama bir mağazanın ortalama bir ürünü bulundurma olasılığı
+    carpiklik: Zipf üssü - popülerlik/büyüklük dağılımı
+    """
+    bas = time.time()
+    rng = np.random.default_rng(tohum)
+    os.makedirs(hedef, exist_ok=True)
+
+    magaza_sayisi = max(1, round(magaza * math.sqrt(olcek)))
+    urun_sayisi = max(1, round(urun * math.sqrt(olcek)))
+    depo_sayisi = max(1, depo)
+    parca = max(1, min(parca, magaza_sayisi))
+    print(f"🧪 Sentetik küp: {magaza_sayisi:,} mağaza × {urun_sayisi:,} ürün, {depo_sayisi} depo "
+          f"(ölçek {olcek:g}×, çarpıklık {carpiklik:g})")
+
+    # Master tablolar
+    hiyerarsi = _hiyerarsi(rng, urun_sayisi)
+    urun_master, urun_mg = _urun_master(rng, urun_sayisi, hiyerarsi)
+    magaza_master = _magaza_master(rng, magaza_sayisi, depo_sayisi)
+    urun_master.to_csv(os.path.join(hedef, 'urun_master.csv'), index=False)
+    magaza_master.to_csv(os.path.join(hedef, 'magaza_master.csv'), index=False)
+
+    # Ürün ve mağaza özellikleri
+    populerlik = _zipf_agirlik(rng, urun_sayisi, carpiklik)
+    buyukluk = _zipf_agirlik(rng, magaza_sayisi, carpiklik / 2)
+    fiyat = rng.lognormal(np.log(120), 0.6, urun_sayisi).round(2)
+    maliyet_orani = rng.uniform(0.45, 0.7, urun_sayisi)
+    magaza_depo = magaza_master['depo_kod'].to_numpy() - 9001
+    mg_sayisi = len(hiyerarsi)
+
+    # Rapor toplamları (küple tutarlı)
+    urun_top = {k: np.zeros(urun_sayisi) for k in ('stok', 'satis', 'ciro', 'smm')}
+    hucre_top = {k: np.zeros(magaza_sayisi * mg_sayisi) for k in ('stok', 'yol', 'satis', 'ciro', 'smm')}
+    depo_talep = np.zeros(depo_sayisi * urun_sayisi)
+
+    # Anlık stok satış: mağazalar parçalara bölünür, her parça bloklar halinde yazılır
+    blok = max(1, BLOK_HUCRE // urun_sayisi)
+    toplam_satir = 0
+    for p, parca_magazalari in enumerate(np.array_split(np.arange(magaza_sayisi), parca)):
+        yol = os.path.join(hedef, f'anlik_stok_satis_{p}.csv')
+        ilk = True
+        for b in range(0, len(parca_magazalari), blok):
+            magazalar = parca_magazalari[b:b + blok]
+            olasilik = np.clip(yogunluk * np.sqrt(np.outer(buyukluk[magazalar], populerlik)), 0.01, 1.0)
+            mi, ui = np.nonzero(rng.random(olasilik.shape) < olasilik)
+            mi = magazalar[mi]
+
+            hiz = 1.5 * buyukluk[mi] * populerlik[ui]                     # beklenen haftalık satış
+            satis = rng.poisson(hiz)
+            vitrin = rng.integers(2, 7, len(mi)) * (rng.random(len(mi)) > 0.15)  # %15 raf boşalmış
+            stok = vitrin + rng.poisson(hiz * rng.gamma(2.0, 2.5, len(mi)))   # hedef cover ~ 5 hafta, uzun kuyruk
+            yol_adet = rng.poisson(0.1 * hiz)
+            ciro = (satis * fiyat[ui]).round(2)
+            smm = (ciro * maliyet_orani[ui]).round(2)
+
+            pd.DataFrame({
+                'magaza_kod': 1000 + mi, 'urun_kod': 1000000 + ui,
+                'stok': stok, 'yol': yol_adet, 'satis': satis, 'ciro': ciro, 'smm': smm,
+            }).to_csv(yol, mode='w' if ilk else 'a', header=ilk, index=False,
+                      encoding='utf-8-sig' if ilk else 'utf-8')
+            ilk = False
+            toplam_satir += len(mi)
+
+            for ad, deger in (('stok', stok), ('satis', satis), ('ciro', ciro), ('smm', smm)):
+                urun_top[ad] += np.bincount(ui, weights=deger, minlength=urun_sayisi)
+            hucre = mi * mg_sayisi + urun_mg[ui]
+            for ad, deger in (('stok', stok), ('yol', yol_adet), ('satis', satis), ('ciro', ciro), ('smm', smm)):
+                hucre_top[ad] += np.bincount(hucre, weights=deger, minlength=magaza_sayisi * mg_sayisi)
+            depo_talep += np.bincount(magaza_depo[mi] * urun_sayisi + ui, weights=hiz,
+                                      minlength=depo_sayisi * urun_sayisi)
+        print(f"   📄 anlik_stok_satis_{p}.csv ({len(parca_magazalari):,} mağaza)")
+
+    # Depo stok: depoya bağlı mağazaların haftalık talebinin 0.5-3 katı
+    pd.DataFrame({
+        'depo_kod': np.repeat(9001 + np.arange(depo_sayisi), urun_sayisi),
+        'urun_kod': np.tile(np.arange(1000000, 1000000 + urun_sayisi), depo_sayisi),
+        'stok': rng.poisson(depo_talep * rng.uniform(0.5, 3.0, depo_sayisi * urun_sayisi)),
+    }).to_csv(os.path.join(hedef, 'depo_stok.csv'), index=False)
+
+    pd.DataFrame({
+        'mg_id': hiyerarsi['mg'],
+        'min_deger': rng.integers(2, 6, mg_sayisi),
+        'max_deger': rng.integers(12, 30, mg_sayisi),
+        'forward_cover': rng.choice([4, 5, 6, 8], mg_sayisi),
+    }).to_csv(os.path.join(hedef, 'kpi.csv'), index=False)
+
+    if raporlar:
+        urun_top['mg'] = urun_mg
+        hucre_top = {ad: deger.reshape(magaza_sayisi, mg_sayisi) for ad, deger in hucre_top.items()}
+        _rapor_dosyalari(rng, hedef, hiyerarsi, magaza_master, urun_top, hucre_top,
+                         urun_top['stok'] * fiyat * maliyet_orani)
+
+    sure = time.time() - bas
+    print(f"✅ {toplam_satir:,} satır, {parca} parça → {hedef} ({sure:.1f}s)")
+    return {'klasor': hedef, 'satir': toplam_satir, 'magaza': magaza_sayisi, 'urun': urun_sayisi,
+            'depo': depo_sayisi, 'mg': mg_sayisi, 'sure': round(sure, 2)}
+
+
+# =============================================================================
+# RAPOR DOSYALARI (Excel)
+# =============================================================================
+
+def _excel_yaz(yol: str, sayfalar: dict):
+    with pd.ExcelWriter(yol, engine=EXCEL_YAZICI) as yazici:
+        for ad, df in sayfalar.items():
+            df.to_excel(yazici, sheet_name=ad, index=False)
+    print(f"   📗 {os.path.basename(yol)} ({sum(len(df) for df in sayfalar.values()):,} satır)")
+
+
+def _rapor_dosyalari(rng, hedef: str, hiyerarsi: pd.DataFrame, magaza_master: pd.DataFrame,
+                     urun_top: dict, hucre_top: dict, stok_maliyet: np.ndarray):
+    mg_sayisi = len(hiyerarsi)
+
+    # MG toplamları
+    mg = {ad: np.bincount(urun_top['mg'], weights=urun_top[ad], minlength=mg_sayisi)
+          for ad in ('stok', 'satis', 'ciro', 'smm')}
+    mg['stok_maliyet'] = np.bincount(urun_top['mg'], weights=stok_maliyet, minlength=mg_sayisi)
+    mg_df = hiyerarsi.assign(**mg)
+
+    # Trading: Genel Toplam + Ana + Ara + Alt satırları
+    seviyeler = [
+        mg_df.assign(ana_grup='Genel Toplam', ara_grup=None, alt_grup=None).groupby('ana_grup', sort=False),
+        mg_df.assign(ara_grup=None, alt_grup=None).groupby('ana_grup', sort=False),
+        mg_df.assign(alt_grup=None).groupby(['ana_grup', 'ara_grup'], sort=False),
+        mg_df.groupby(['ana_grup', 'ara_grup', 'alt_grup'], sort=False),
+    ]
+    olculer = ['stok', 'satis', 'ciro', 'smm', 'stok_maliyet']
+    tablo = pd.concat([g[olculer].sum().reset_index() for g in seviyeler], ignore_index=True)
+    tablo = tablo.reindex(columns=['ana_grup', 'ara_grup', 'alt_grup'] + olculer)
+    n = len(tablo)
+    genel = tablo.iloc[0]
+    ty_cover = _oran(tablo['stok'], tablo['satis']).round(1)
+    ty_marj = 1 - _oran(tablo['smm'], tablo['ciro'])
+    trading = pd.DataFrame({
+        'Mevcut Ana Grup': tablo['ana_grup'], 'Mevcut Ara Grup': tablo['ara_grup'], 'Alt Grup': tablo['alt_grup'],
+        'Achieved TY Sales Budget Value TRY': rng.normal(-0.03, 0.12, n).round(3),
+        'TY Store Back Cover TRY': ty_cover,
+        'LY Store Back Cover TRY': (ty_cover * rng.uniform(0.8, 1.25, n)).round(1),
+        'TY Gross Margin TRY': ty_marj.round(3),
+        'LY LFL Gross Margin LC%': (ty_marj + rng.normal(0, 0.02, n)).round(3),
+        'LFL Sales Value TYvsLY LC%': rng.normal(0.05, 0.15, n).round(3),
+        'LFL Sales Unit TYvsLY': rng.normal(0.0, 0.15, n).round(3),
+        'LFL Stock Unit TYvsLY': rng.normal(0.02, 0.12, n).round(3),
+        'LFL Unit Sales Price TYvsLY LC': rng.normal(0.3, 0.1, n).round(3),
+        'LFL Gross Profit TYvsLY': rng.normal(0.05, 0.2, n).round(3),
+        'TY LFL Sales Unit': _oran(tablo['satis'], genel['satis']).round(4),
+        'TY Avg Store Stock Cost LC': _oran(tablo['stok_maliyet'], genel['stok_maliyet']).round(4),
+        'TY LFL Sales Value LC': _oran(tablo['ciro'], genel['ciro']).round(4),
+        'TY LFL Gross Profit LC': _oran(tablo['ciro'] - tablo['smm'], genel['ciro'] - genel['smm']).round(4),
+    })
+    _excel_yaz(os.path.join(hedef, 'trading.xlsx'), {'mtd': trading})
+
+    # SC tablosu: alt grup cover (geçen hafta / bu hafta)
+    mg_cover = _oran(mg_df['stok'], mg_df['satis']).round(1)
+    _excel_yaz(os.path.join(hedef, 'EVE SC Tablosu.xlsx'), {'LW-TW Cover Analiz': pd.DataFrame({
+        'Ana Grup': mg_df['ana_grup'], 'Alt Grup': mg_df['alt_grup'],
+        'TW Cover': mg_cover, 'LW Cover': (mg_cover * rng.uniform(0.85, 1.15, mg_sayisi)).round(1),
+        'TW Stok': mg_df['stok'].astype(int), 'TW Satış': mg_df['satis'].astype(int),
+    })})
+
+    # Cover Diagram: stok veya satışı olan mağaza×alt grup hücreleri
+    magaza_adi = (magaza_master['il'] + ' ' + magaza_master['magaza_kod'].astype(str)).to_numpy()
+    mi, gi = np.nonzero((hucre_top['stok'] > 0) | (hucre_top['satis'] > 0))
+    stok, satis = hucre_top['stok'][mi, gi], hucre_top['satis'][mi, gi]
+    _excel_yaz(os.path.join(hedef, 'Cover Diagram.xlsx'), {'Sheet1': pd.DataFrame({
+        'Alt Grup': hiyerarsi['alt_grup'].to_numpy()[gi], 'StoreName': magaza_adi[mi],
+        'TY Back Cover': _oran(stok, satis).round(1),
+        'TY Avg Store Stock Unit': stok.astype(int), 'TY Sales Unit': satis.astype(int),
+        'TY Sales Value TRY': hucre_top['ciro'][mi, gi].round(2),
+        'Toplam Sipariş': rng.poisson(satis * 0.5),
+        'LFL Stok Değişim': rng.normal(0, 15, len(mi)).round(1),
+        'LFL Satış Değişim': rng.normal(2, 15, len(mi)).round(1),
+    })})
+
+    # Kapasite: mağaza doluluk ve performans
+    stok_m, yol_m = hucre_top['stok'].sum(axis=1), hucre_top['yol'].sum(axis=1)
+    satis_m, ciro_m, smm_m = hucre_top['satis'].sum(axis=1), hucre_top['ciro'].sum(axis=1), hucre_top['smm'].sum(axis=1)
+    doluluk = np.clip(rng.normal(0.8, 0.2, len(stok_m)), 0.3, 1.3)
+    kapasite_adet = np.maximum(_oran(stok_m, doluluk), 1)
+    marj = 1 - _oran(smm_m, ciro_m)
+    hizli = satis_m >= np.median(satis_m)
+    karli = marj >= np.median(marj)
+    _excel_yaz(os.path.join(hedef, 'Kapasite Periyod.xlsx'), {'Sheet1': pd.DataFrame({
+        'Store Name': magaza_adi,
+        'Karlı-Hızlı Metrik': np.where(karli, 'Karlı', 'Karsız') + np.where(hizli, '-Hızlı', '-Yavaş'),
+        'Capacity dm3': (kapasite_adet * 0.35).round(0),
+        '#Fiili Doluluk_': _oran(stok_m, kapasite_adet).round(3),
+        '#Nihai Doluluk_': _oran(stok_m + yol_m, kapasite_adet).round(3),
+        '#Store Cover_': _oran(stok_m, satis_m).round(1),
+        'TY Avg Store Stock Unit': stok_m.astype(int), 'TY Sales Unit': satis_m.astype(int),
+        'TY Sales Value TRY': ciro_m.round(2),
+        'LFL Satış Tutar': rng.normal(0.03, 0.12, len(stok_m)).round(3),
+        'LFL Satış Adet': rng.normal(0.0, 0.12, len(stok_m)).round(3),
+        'LFL Stok': rng.normal(0.02, 0.1, len(stok_m)).round(3),
+        'Kar Marj': marj.round(3),
+    })})
+
+    # Sipariş takip: alt grup bazında 13 haftalık alım bütçesi
+    butce = mg_df['smm'].to_numpy() * 13 * rng.uniform(0.8, 1.2, mg_sayisi)
+    siparis = butce * rng.uniform(0.6, 1.15, mg_sayisi)
+    giren = siparis * rng.uniform(0.3, 0.95, mg_sayisi)
+    _excel_yaz(os.path.join(hedef, 'siparis_takip.xlsx'), {'Sheet1': pd.DataFrame({
+        'Yeni Ana Grup': mg_df['ana_grup'], 'Ara Grup': mg_df['ara_grup'], 'Yeni Alt Grup': mg_df['alt_grup'],
+        'Onaylı Alım Bütçe Tutar': butce.round(2), 'Total Sipariş Tutar': siparis.round(2),
+        'Depoya Giren Tutar': giren.round(2), 'Bekleyen Sipariş Tutar': (siparis - giren).round(2),
+        'Depo Giriş Alım Bütçe Oran': _oran(giren, butce).round(3),
+    })})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sentetik küp üretici (ölçek testleri için)")
+    parser.add_argument('hedef', help="Yazılacak veri klasörü")
+    parser.add_argument('--magaza', type=int, default=TEMEL_MAGAZA, help=f"1× mağaza sayısı (varsayılan {TEMEL_MAGAZA})")
+    parser.add_argument('--urun', type=int, default=TEMEL_URUN, help=f"1× ürün sayısı (varsayılan {TEMEL_URUN})")
+    parser.add_argument('--depo', type=int, default=2, help="Depo sayısı")
+    parser.add_argument('--olcek', type=float, default=1.0, help="Satır sayısı çarpanı (ör. 10, 100)")
+    parser.add_argument('--carpiklik', type=float, default=1.0, help="Zipf üssü: 0 düzgün, büyüdükçe çarpık")
+    parser.add_argument('--yogunluk', type=float, default=0.4, help="Ortalama mağaza×ürün bulunma olasılığı")
+    parser.add_argument('--parca', type=int, default=3, help="anlik_stok_satis parça dosyası sayısı")
+    parser.add_argument('--tohum', type=int, default=0, help="Rastgele tohum")
+    parser.add_argument('--rapor-yok', action='store_true', help="Excel raporlarını üretme (sadece küp)")
+    args = parser.parse_args()
+
+    sentetik_kup(args.hedef, magaza=args.magaza, urun=args.urun, depo=args.depo, olcek=args.olcek,
+                 carpiklik=args.carpiklik, yogunluk=args.yogunluk, parca=args.parca, tohum=args.tohum,
+                 raporlar=not args.rapor_yok)
+
+
+if __name__ == "__main__":
+    main()
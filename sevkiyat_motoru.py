@@ -20,6 +20,220 @@ import numpy as np
 from typing import Optional, Dict, List, Tuple
 
 
+def acgozlu_dagit(ihtiyac: np.ndarray, depo_konum: np.ndarray, depo_miktar: np.ndarray) -> np.ndarray:
+    """
+    Öncelik sırasındaki ihtiyaçlara depo stoğunu açgözlü (greedy) dağıtır.
+
+    Args:
+        ihtiyac: Satır ihtiyaçları, öncelik sırasıyla (önce gelen önce alır)
+        depo_konum: Her satırın depo_miktar içindeki konumu (-1 = depoda kaydı yok)
+        depo_miktar: Depo×ürün başına başlangıç stoğu
+
+    Returns:
+        np.ndarray: Satır başına sevkiyat miktarı (ihtiyac sırasıyla)
+
+    Satır satır döngüyle (kalan -= min(ihtiyac, kalan)) birebir aynı sonucu verir.
+    Aynı depo×ürün grubundaki k. satırlar tek bir vektör adımında işlenir; döngü
+    sayısı satır sayısı değil, en kalabalık grubun satır sayısı kadardır. Kümülatif
+    toplam yerine adım adım çıkarma kullanıldığı için kesirli ihtiyaçlarda da
+    float sonuçlar döngüyle bit düzeyinde aynıdır.
+    """
+    ihtiyac = np.asarray(ihtiyac, dtype='float64')
+    depo_konum = np.asarray(depo_konum)
+    sevk = np.zeros(len(ihtiyac), dtype='float64')
+
+    gecerli = np.flatnonzero(depo_konum >= 0)
+    if len(gecerli) == 0:
+        return sevk
+
+    # Grup (depo×ürün) bazında sırala - stable sıralama grup içi önceliği korur
+    gruplar = depo_konum[gecerli]
+    sira = np.argsort(gruplar, kind='stable')
+    satirlar = gecerli[sira]
+    gruplar = gruplar[sira]
+
+    # Grup içi sıra numarası (seviye): grubun 0., 1., 2. ... satırı
+    ilk = np.r_[True, gruplar[1:] != gruplar[:-1]]
+    grup_baslangic = np.flatnonzero(ilk)
+    seviye = np.arange(len(gruplar)) - grup_baslangic[np.cumsum(ilk) - 1]
+
+    # Seviyeye göre diz: her seviyede bir grup en fazla bir kez bulunur
+    seviye_sira = np.argsort(seviye, kind='stable')
+    satirlar = satirlar[seviye_sira]
+    gruplar = gruplar[seviye_sira]
+    sinirlar = np.searchsorted(seviye[seviye_sira], np.arange(seviye.max() + 2))
+
+    kalan = np.asarray(depo_miktar, dtype='float64').copy()
+    for k in range(len(sinirlar) - 1):
+        idx = satirlar[sinirlar[k]:sinirlar[k + 1]]
+        grp = gruplar[sinirlar[k]:sinirlar[k + 1]]
+        mevcut = kalan[grp]
+        verilen = np.where(mevcut > 0, np.minimum(ihtiyac[idx], mevcut), 0.0)
+        kalan[grp] = mevcut - verilen
+        sevk[idx] = verilen
+
+    return sevk
+
+
+# ============================================
+# ORTAK DAĞITIM ÇEKİRDEĞİ
+# ============================================
+# agent_tools.sevkiyat_hesapla ve SevkiyatMotoru aynı fonksiyonları kullanır.
+# İki giriş noktasının tarihsel farkları parametre olarak korunur:
+#   - varsayilan_depo: agent 9001, motor 1
+#   - tekrar_eden: aynı depo×ürün birden fazla satırsa agent toplar, motor son kaydı alır
+#   - esitlikte: RPT = MIN olduğunda agent 'MIN', motor 'RPT' der
+
+DEPO_URUN_KOLONLARI = ['urun_kod', 'urun_kodu', 'urunkod', 'sku', 'product_code']
+DEPO_KOD_KOLONLARI = ['depo_kod', 'depo_kodu', 'depokod', 'depo', 'warehouse']
+DEPO_STOK_KOLONLARI = ['stok', 'miktar', 'adet', 'quantity', 'stock']
+
+
+def _ilk_kolon(df: pd.DataFrame, adaylar: List[str]) -> Optional[str]:
+    for col in adaylar:
+        if col in df.columns:
+            return col
+    return None
+
+
+def depo_tablosu_hazirla(depo_stok: pd.DataFrame, varsayilan_depo: int = 1, tekrar_eden: str = 'son') -> pd.DataFrame:
+    """
+    Depo stok verisini depo×ürün başına tek satırlık tabloya çevirir.
+
+    Args:
+        depo_stok: Ham depo stok verisi (kolon adları farklı yazımlarla gelebilir)
+        varsayilan_depo: depo_kod boş/eksikse kullanılacak depo
+        tekrar_eden: 'son' = tekrar eden depo×ürünün son kaydı, 'topla' = stoklar toplanır
+
+    Returns:
+        pd.DataFrame: depo_kod (int), urun_kod (str), stok (float)
+
+    Raises:
+        ValueError: Ürün veya stok kolonu bulunamazsa
+    """
+    depo_df = depo_stok.copy()
+    depo_df.columns = [c.lower().strip() for c in depo_df.columns]
+
+    urun_col = _ilk_kolon(depo_df, DEPO_URUN_KOLONLARI)
+    if urun_col is None:
+        raise ValueError("Depo stokta ürün kolonu bulunamadı")
+    stok_col = _ilk_kolon(depo_df, DEPO_STOK_KOLONLARI)
+    if stok_col is None:
+        raise ValueError("Depo stokta stok kolonu bulunamadı")
+    depo_col = _ilk_kolon(depo_df, DEPO_KOD_KOLONLARI)
+
+    if depo_col is not None:
+        depo_kod = pd.to_numeric(depo_df[depo_col], errors='coerce').fillna(varsayilan_depo).astype(int)
+    else:
+        print(f"   ⚠️ Depo stokta depo_kod kolonu yok, default {varsayilan_depo} kullanılıyor")
+        depo_kod = pd.Series(varsayilan_depo, index=depo_df.index, dtype=int)
+
+    tablo = pd.DataFrame({
+        'depo_kod': depo_kod,
+        'urun_kod': depo_df[urun_col].astype(str),
+        'stok': pd.to_numeric(depo_df[stok_col], errors='coerce').fillna(0)
+    })
+
+    if tekrar_eden == 'topla':
+        return tablo.groupby(['depo_kod', 'urun_kod'], sort=False)['stok'].sum().reset_index()
+    return tablo.drop_duplicates(['depo_kod', 'urun_kod'], keep='last').reset_index(drop=True)
+
+
+def ihtiyac_birlestir(df: pd.DataFrame, esitlikte: str = 'RPT', min_etiketi: str = 'Min') -> pd.DataFrame:
+    """
+    rpt_ihtiyac ve min_ihtiyac kolonlarından final ihtiyacı (MAX) ve türünü üretir.
+
+    esitlikte: İki ihtiyaç eşitse hangi türün yazılacağı ('RPT' veya 'MIN')
+    """
+    df['ihtiyac'] = df[['rpt_ihtiyac', 'min_ihtiyac']].max(axis=1)
+
+    if esitlikte == 'MIN':
+        tur = np.where(df['ihtiyac'] == df['min_ihtiyac'], min_etiketi, 'RPT')
+    else:
+        tur = np.where(df['ihtiyac'] == df['rpt_ihtiyac'], 'RPT', min_etiketi)
+    df['ihtiyac_turu'] = np.where(df['ihtiyac'] == 0, 'Yok', tur)
+
+    return df
+
+
+def depo_stok_dagit(df: pd.DataFrame, depo_tablosu: pd.DataFrame, varsayilan_depo: int = 1) -> pd.DataFrame:
+    """
+    Pozitif ihtiyaçlı satırlara depo stoğunu öncelik sırasıyla dağıtır.
+
+    Args:
+        df: magaza_kod, urun_kod, ihtiyac (ve varsa depo_kod) içeren ihtiyaç tablosu
+        depo_tablosu: depo_tablosu_hazirla çıktısı
+        varsayilan_depo: Satırda depo_kod yoksa kullanılacak depo
+
+    Returns:
+        pd.DataFrame: İhtiyaca göre büyükten küçüğe sıralı satırlar +
+                      sevkiyat_miktari, karsilanamayan kolonları
+    """
+    return senaryolari_dagit([df], depo_tablosu, varsayilan_depo)[0]
+
+
+def senaryolari_dagit(parcalar: List[pd.DataFrame], depo_tablosu: pd.DataFrame, varsayilan_depo: int = 1) -> List[pd.DataFrame]:
+    """
+    Birden fazla senaryonun ihtiyaç tablosunu tek dağıtım geçişinde işler.
+
+    Her senaryo depo stoğunun kendi kopyasından dağıtır (senaryolar birbirinin
+    stoğunu tüketmez). Depo×ürün grupları senaryo başına ayrıştırılıp tek bir
+    acgozlu_dagit çağrısına verilir; sonuç her senaryo için ayrı ayrı
+    depo_stok_dagit ile birebir aynıdır.
+
+    Returns:
+        List[pd.DataFrame]: parcalar sırasıyla depo_stok_dagit çıktıları
+    """
+    depo_index = pd.MultiIndex.from_arrays([depo_tablosu['depo_kod'].astype(int), depo_tablosu['urun_kod'].astype(str)])
+    depo_sayisi = len(depo_index)
+
+    sonuclar = []
+    dagitilacak = []
+    ihtiyaclar = []
+    konumlar = []
+    for i, df in enumerate(parcalar):
+        result = df[df['ihtiyac'] > 0]
+        if len(result) == 0:
+            sonuclar.append(result.assign(sevkiyat_miktari=0.0, karsilanamayan=0.0))
+            continue
+
+        # Öncelik sıralaması (ihtiyaca göre büyükten küçüğe)
+        result = result.sort_values('ihtiyac', ascending=False).reset_index(drop=True)
+
+        if 'depo_kod' not in result.columns:
+            result['depo_kod'] = varsayilan_depo
+        else:
+            result['depo_kod'] = pd.to_numeric(result['depo_kod'], errors='coerce').fillna(varsayilan_depo).astype(int)
+
+        # Her ihtiyaç satırının depo tablosundaki konumu (-1 = depoda yok),
+        # senaryo i için depo stoğunun i. kopyasına kaydırılır
+        konum = depo_index.get_indexer(
+            pd.MultiIndex.from_arrays([result['depo_kod'].astype(int), result['urun_kod'].astype(str)])
+        )
+        konumlar.append(np.where(konum >= 0, konum + i * depo_sayisi, -1))
+        ihtiyaclar.append(result['ihtiyac'].to_numpy(dtype='float64'))
+        dagitilacak.append(result)
+        sonuclar.append(result)
+
+    if not ihtiyaclar:
+        return sonuclar
+
+    sevk = acgozlu_dagit(
+        np.concatenate(ihtiyaclar),
+        np.concatenate(konumlar),
+        np.tile(depo_tablosu['stok'].to_numpy(dtype='float64'), len(parcalar))
+    )
+
+    bas = 0
+    for result in dagitilacak:
+        son = bas + len(result)
+        result['sevkiyat_miktari'] = sevk[bas:son]
+        result['karsilanamayan'] = result['ihtiyac'] - result['sevkiyat_miktari']
+        bas = son
+
+    return sonuclar
+
+
 class SevkiyatMotoru:
     """
     R4U Sevkiyat Hesaplama Motoru
@@ -29,6 +243,18 @@ class SevkiyatMotoru:
         sonuc = motor.hesapla(kategori_kod=11, forward_cover=7.0)
     """
     
+    # Senaryo hesabında hazır veriden kopyalanan kolonlar (ihtiyaç + sonuç için gerekenler)
+    SENARYO_KOLONLARI = [
+        'magaza_kod', 'urun_kod', 'depo_kod', 'kategori_kod', 'marka_kod',
+        'stok', 'yol', 'satis', 'min_deger', 'urun_segment', 'magaza_segment'
+    ]
+    
+    # Veri hazırlamada küpten kopyalanan kolonlar (ihtiyaç + sonuç).
+    # kategori_kod/marka_kod/mg kopyalanmaz: filtre indeksten çözülür, kolonlar urun_master join'inden gelir
+    HAZIRLIK_KOLONLARI = [
+        'magaza_kod', 'urun_kod', 'depo_kod', 'stok', 'yol', 'satis', 'min_deger'
+    ]
+    
     def __init__(self, kup_veri):
         """
         Args:
@@ -45,6 +271,9 @@ class SevkiyatMotoru:
         self.default_genlestirme = 1.0
         self.default_min_oran = 1.0
         
+        # Segmentasyon önbelleği: (anahtar, urun_segment, magaza_segment)
+        self._segment_onbellegi = None
+        
     def _get_stok_satis(self):
         """stok_satis veya anlik_stok_satis property'sini al"""
         if hasattr(self.kup, 'stok_satis') and self.kup.stok_satis is not None and len(self.kup.stok_satis) > 0:
@@ -138,6 +367,107 @@ class SevkiyatMotoru:
                 'hata': f'Hesaplama hatası: {str(e)}'
             }
     
+    def senaryolari_hesapla(self, senaryolar: List[Dict]) -> Dict:
+        """
+        Birden fazla parametre setini (what-if) tek seferde hesaplar.
+        
+        Veri hazırlama, master join'leri ve segmentasyon her filtre kombinasyonu
+        için bir kez yapılır; senaryolar yalnızca ihtiyaç hesabında ayrışır ve
+        depo dağıtımı tüm senaryolar için tek geçişte yapılır. Her senaryo depo
+        stoğunun tamamından dağıtır (tek tek hesapla() çağrısıyla aynı sonuç).
+        
+        Args:
+            senaryolar: Parametre setleri listesi. Her biri hesapla() ile aynı
+                anahtarları alabilir (forward_cover, sisme_orani, genlestirme_orani,
+                min_stok_orani, kategori_kod, urun_kod, marka_kod) + opsiyonel 'ad'
+                
+        Returns:
+            Dict: {
+                'karsilastirma': DataFrame (senaryo başına ihtiyaç, sevkiyat, karşılama, karşılanamayan),
+                'sonuclar': List[DataFrame] (senaryo sırasıyla sevkiyat detayları),
+                'hata': str veya None
+            }
+        """
+        try:
+            if not senaryolar:
+                return {'karsilastirma': None, 'sonuclar': [], 'hata': 'Senaryo listesi boş'}
+            
+            if not self._veri_kontrol():
+                return {
+                    'karsilastirma': None,
+                    'sonuclar': [],
+                    'hata': 'Gerekli veriler eksik (anlik_stok_satis, depo_stok)'
+                }
+            
+            # 1. FİLTRE BAŞINA BİR KEZ HAZIRLA
+            hazir = {}
+            parcalar = []
+            for senaryo in senaryolar:
+                filtre = (senaryo.get('kategori_kod'), senaryo.get('urun_kod'), senaryo.get('marka_kod'))
+                if filtre not in hazir:
+                    print(f"   [Motor] Senaryo verisi hazırlanıyor (filtre: {filtre})...")
+                    df = self._veri_hazirla(*filtre)
+                    if len(df) > 0:
+                        df = self._segmentasyon_uygula(df)
+                        df = self._matris_degerleri_ekle(df, None, None, None)
+                        if 'yol' not in df.columns:
+                            df['yol'] = 0
+                    hazir[filtre] = df
+                
+                df = hazir[filtre]
+                if len(df) == 0:
+                    parcalar.append(None)
+                    continue
+                
+                # 2. SENARYO İHTİYACI (sadece gereken kolonlar kopyalanır)
+                kolonlar = [c for c in self.SENARYO_KOLONLARI if c in df.columns]
+                sdf = df[kolonlar].assign(
+                    sisme=self.default_sisme if senaryo.get('sisme_orani') is None else senaryo['sisme_orani'],
+                    genlestirme=self.default_genlestirme if senaryo.get('genlestirme_orani') is None else senaryo['genlestirme_orani'],
+                    min_oran=self.default_min_oran if senaryo.get('min_stok_orani') is None else senaryo['min_stok_orani']
+                )
+                parcalar.append(self._ihtiyac_hesapla(sdf, senaryo.get('forward_cover', 7.0)))
+            
+            # 3. TÜM SENARYOLAR İÇİN TEK GEÇİŞTE DAĞIT
+            dagitilacak = [p for p in parcalar if p is not None]
+            depo_tekil = self._depo_tablosu() if dagitilacak else None
+            if dagitilacak and depo_tekil is None:
+                return {'karsilastirma': None, 'sonuclar': [], 'hata': 'Depo stok kolonları bulunamadı'}
+            dagitimlar = iter(senaryolari_dagit(dagitilacak, depo_tekil, varsayilan_depo=1) if dagitilacak else [])
+            
+            # 4. KARŞILAŞTIRMA TABLOSU
+            satirlar = []
+            sonuclar = []
+            for i, (senaryo, parca) in enumerate(zip(senaryolar, parcalar)):
+                sonuc = self._sonuc_kolonlari(next(dagitimlar)) if parca is not None else pd.DataFrame()
+                ozet = self._ozet_olustur(sonuc)
+                sonuclar.append(sonuc)
+                satirlar.append({
+                    'senaryo': senaryo.get('ad', f"S{i + 1}"),
+                    'forward_cover': senaryo.get('forward_cover', 7.0),
+                    'kategori_kod': senaryo.get('kategori_kod'),
+                    'urun_kod': senaryo.get('urun_kod'),
+                    'marka_kod': senaryo.get('marka_kod'),
+                    'ihtiyacli_satir': len(sonuc),
+                    'toplam_ihtiyac': ozet['toplam_ihtiyac'],
+                    'toplam_sevkiyat': ozet['toplam_sevkiyat'],
+                    'karsilama_orani': float(ozet['karsilama_orani']),
+                    'karsilanamayan': ozet.get('karsilanamayan_toplam', 0)
+                })
+            
+            return {
+                'karsilastirma': pd.DataFrame(satirlar),
+                'sonuclar': sonuclar,
+                'hata': None
+            }
+            
+        except Exception as e:
+            return {
+                'karsilastirma': None,
+                'sonuclar': [],
+                'hata': f'Senaryo hesaplama hatası: {str(e)}'
+            }
+    
     def _veri_kontrol(self) -> bool:
         """Gerekli verilerin varlığını kontrol et"""
         stok_satis = self._get_stok_satis()
@@ -149,14 +479,25 @@ class SevkiyatMotoru:
     
     def _veri_hazirla(self, kategori_kod: Optional[int], urun_kod: Optional[str], marka_kod: Optional[str]) -> pd.DataFrame:
         """Ana veriyi hazırla ve filtrele"""
-        df = self._get_stok_satis().copy()
+        stok_satis = self._get_stok_satis()
+        if urun_kod is not None:
+            urun_kod = str(urun_kod).strip()
+        
+        # Önce filtre: küpte bulunan filtre kolonları satır konum indeksinden çözülür,
+        # sadece seçili satırların motorun kullandığı kolonları kopyalanır
+        if hasattr(self.kup, 'secili_satirlar') and stok_satis is getattr(self.kup, 'stok_satis', None):
+            df = self.kup.secili_satirlar(
+                self.HAZIRLIK_KOLONLARI, urun_kod=urun_kod, kategori_kod=kategori_kod, marka_kod=marka_kod
+            )
+            print(f"   [Motor] Filtre sonrası (indeks): {len(df)} / {len(stok_satis)} satır")
+        else:
+            df = stok_satis.copy()
         print(f"   [Motor] Başlangıç df kolonları: {list(df.columns)}")
         df['urun_kod'] = df['urun_kod'].astype(str)
         df['magaza_kod'] = df['magaza_kod'].astype(str)
         
         # Tek ürün filtresi (en önce uygula)
         if urun_kod is not None:
-            urun_kod = str(urun_kod).strip()
             df = df[df['urun_kod'] == urun_kod]
             print(f"   [Motor] Ürün filtresi ({urun_kod}): {len(df)} satır")
             if len(df) == 0:
@@ -228,6 +569,37 @@ class SevkiyatMotoru:
     def _segmentasyon_uygula(self, df: pd.DataFrame) -> pd.DataFrame:
         """Ürün ve mağaza segmentasyonu uygula"""
         
+        urun_segment, magaza_segment = self._segment_tablolari()
+        
+        # Ana dataframe'e ekle (df'deki anahtarlar str)
+        df = df.reset_index(drop=True)
+        df['urun_segment'] = df['urun_kod'].map(urun_segment).fillna('0-4')
+        df['magaza_segment'] = df['magaza_kod'].map(magaza_segment).fillna('0-4')
+        
+        return df
+    
+    def _segment_anahtari(self) -> tuple:
+        """Segment tablolarının geçerlilik anahtarı: küp verisi + segment aralıkları"""
+        stok_satis = self._get_stok_satis()
+        return (
+            id(stok_satis),
+            len(stok_satis) if stok_satis is not None else 0,
+            getattr(self.kup, 'veri_surumu', None),
+            tuple(self.segment_ranges),
+            tuple(self.segment_labels)
+        )
+    
+    def _segment_tablolari(self) -> Tuple[pd.Series, pd.Series]:
+        """
+        Ürün ve mağaza segment tablolarını döndürür (urun_kod/magaza_kod -> segment).
+        
+        Tablolar tüm küp üzerinden hesaplanır ve motor üzerinde saklanır; küp
+        yenilenmedikçe veya segment_ranges değişmedikçe tekrar gruplanmaz.
+        """
+        anahtar = self._segment_anahtari()
+        if self._segment_onbellegi is not None and self._segment_onbellegi[0] == anahtar:
+            return self._segment_onbellegi[1], self._segment_onbellegi[2]
+        
         # Ana veriyi al
         stok_satis = self._get_stok_satis()
         
@@ -248,28 +620,19 @@ class SevkiyatMotoru:
         # Segment ataması
         bins = [r[0] for r in self.segment_ranges] + [self.segment_ranges[-1][1]]
         
-        urun_agg['urun_segment'] = pd.cut(
-            urun_agg['urun_oran'],
-            bins=bins,
-            labels=self.segment_labels,
-            include_lowest=True
-        ).astype(str)
-        
-        magaza_agg['magaza_segment'] = pd.cut(
-            magaza_agg['magaza_oran'],
-            bins=bins,
-            labels=self.segment_labels,
-            include_lowest=True
-        ).astype(str)
-        
-        # Ana dataframe'e ekle
-        df = df.merge(urun_agg[['urun_kod', 'urun_segment']], on='urun_kod', how='left')
-        df = df.merge(magaza_agg[['magaza_kod', 'magaza_segment']], on='magaza_kod', how='left')
+        urun_segment = pd.Series(
+            pd.cut(urun_agg['urun_oran'], bins=bins, labels=self.segment_labels, include_lowest=True).astype(str).values,
+            index=urun_agg['urun_kod'].astype(str)
+        )
+        magaza_segment = pd.Series(
+            pd.cut(magaza_agg['magaza_oran'], bins=bins, labels=self.segment_labels, include_lowest=True).astype(str).values,
+            index=magaza_agg['magaza_kod'].astype(str)
+        )
         
-        df['urun_segment'] = df['urun_segment'].fillna('0-4')
-        df['magaza_segment'] = df['magaza_segment'].fillna('0-4')
+        self._segment_onbellegi = (anahtar, urun_segment, magaza_segment)
+        print(f"   [Motor] Segment tabloları hazırlandı: {len(urun_segment)} ürün, {len(magaza_segment)} mağaza")
         
-        return df
+        return urun_segment, magaza_segment
     
     def _matris_degerleri_ekle(
         self, 
@@ -285,8 +648,10 @@ class SevkiyatMotoru:
         df['genlestirme'] = genlestirme_orani if genlestirme_orani is not None else self.default_genlestirme
         df['min_oran'] = min_stok_orani if min_stok_orani is not None else self.default_min_oran
         
-        # KPI'dan min değer
-        if self.kup.kpi is not None and 'mg' in df.columns:
+        # KPI'dan min değer (küp zenginleştirmesinden geldiyse tekrar join etme)
+        if 'min_deger' in df.columns:
+            df['min_deger'] = pd.to_numeric(df['min_deger'], errors='coerce').fillna(0)
+        elif self.kup.kpi is not None and 'mg' in df.columns:
             kpi = self.kup.kpi.copy()
             if 'mg_id' in kpi.columns and 'min_deger' in kpi.columns:
                 kpi['mg_id'] = kpi['mg_id'].astype(str)
@@ -328,107 +693,36 @@ class SevkiyatMotoru:
         df['rpt_ihtiyac'] = df['rpt_ihtiyac'].clip(lower=0)
         df['min_ihtiyac'] = df['min_ihtiyac'].clip(lower=0)
         
-        # MAX'ı al
-        df['ihtiyac'] = df[['rpt_ihtiyac', 'min_ihtiyac']].max(axis=1)
-        
-        # Hangi türden geldiğini belirle
-        df['ihtiyac_turu'] = np.where(
-            df['ihtiyac'] == 0, 'Yok',
-            np.where(df['ihtiyac'] == df['rpt_ihtiyac'], 'RPT', 'Min')
-        )
-        
-        return df
+        # MAX'ı al ve türünü belirle (eşitlikte RPT)
+        return ihtiyac_birlestir(df, esitlikte='RPT', min_etiketi='Min')
     
     def _depo_stok_dagit(self, df: pd.DataFrame) -> pd.DataFrame:
         """Depo stoğunu ihtiyaçlara göre dağıt"""
         
-        # Sadece pozitif ihtiyaçları al
-        result = df[df['ihtiyac'] > 0].copy()
-        
-        if len(result) == 0:
-            return pd.DataFrame()
-        
-        # Öncelik sıralaması (ihtiyaca göre büyükten küçüğe)
-        result = result.sort_values('ihtiyac', ascending=False).reset_index(drop=True)
-        
-        # Depo stok dictionary
-        depo_df = self.kup.depo_stok.copy()
-        
-        # Kolon adlarını küçük harfe çevir
-        depo_df.columns = [c.lower().strip() for c in depo_df.columns]
-        print(f"   [Motor] Depo stok kolonları: {list(depo_df.columns)}")
-        
-        # urun_kod kontrolü - farklı isimler olabilir
-        urun_col = None
-        for col in ['urun_kod', 'urun_kodu', 'urunkod', 'sku', 'product_code']:
-            if col in depo_df.columns:
-                urun_col = col
-                break
-        
-        if urun_col is None:
-            print(f"   ❌ [Motor] Depo stokta ürün kolonu bulunamadı!")
+        if not (df['ihtiyac'] > 0).any():
             return pd.DataFrame()
         
-        depo_df['urun_kod'] = depo_df[urun_col].astype(str)
-        
-        # depo_kod kontrolü - farklı isimler olabilir
-        depo_col = None
-        for col in ['depo_kod', 'depo_kodu', 'depokod', 'depo', 'warehouse']:
-            if col in depo_df.columns:
-                depo_col = col
-                break
-        
-        if depo_col is not None:
-            depo_df['depo_kod'] = pd.to_numeric(depo_df[depo_col], errors='coerce').fillna(1).astype(int)
-        else:
-            print(f"   ⚠️ [Motor] Depo stokta depo_kod kolonu yok, default 1 kullanılıyor")
-            depo_df['depo_kod'] = 1
-        
-        # stok kolonu kontrolü
-        stok_col = None
-        for col in ['stok', 'miktar', 'adet', 'quantity', 'stock']:
-            if col in depo_df.columns:
-                stok_col = col
-                break
-        
-        if stok_col is None:
-            print(f"   ❌ [Motor] Depo stokta stok kolonu bulunamadı!")
+        depo_tekil = self._depo_tablosu()
+        if depo_tekil is None:
             return pd.DataFrame()
         
-        depo_df['stok'] = pd.to_numeric(depo_df[stok_col], errors='coerce').fillna(0)
-        
-        # result'ta da depo_kod kontrolü
-        if 'depo_kod' not in result.columns:
-            result['depo_kod'] = 1
-        else:
-            result['depo_kod'] = pd.to_numeric(result['depo_kod'], errors='coerce').fillna(1).astype(int)
-        
-        depo_stok_dict = {}
-        for _, row in depo_df.iterrows():
-            key = (int(row['depo_kod']), str(row['urun_kod']))
-            depo_stok_dict[key] = float(row['stok'])
-        
-        print(f"   [Motor] Depo stok dict: {len(depo_stok_dict)} ürün×depo")
-        
-        # Sevkiyat hesapla
-        sevkiyat_list = []
+        result = depo_stok_dagit(df, depo_tekil, varsayilan_depo=1)
         
-        for idx, row in result.iterrows():
-            key = (int(row['depo_kod']), str(row['urun_kod']))
-            ihtiyac = float(row['ihtiyac'])
-            
-            if key in depo_stok_dict and depo_stok_dict[key] > 0:
-                sevk = min(ihtiyac, depo_stok_dict[key])
-                depo_stok_dict[key] -= sevk
-            else:
-                sevk = 0
-            
-            sevkiyat_list.append(sevk)
-        
-        result['sevkiyat_miktari'] = sevkiyat_list
-        result['karsilanamayan'] = result['ihtiyac'] - result['sevkiyat_miktari']
-        
-        # Sonuç kolonlarını düzenle
+        return self._sonuc_kolonlari(result)
+    
+    def _depo_tablosu(self) -> Optional[pd.DataFrame]:
+        """Depo stoğunu depo×ürün tablosuna çevir (kolon bulunamazsa None)"""
+        print(f"   [Motor] Depo stok kolonları: {list(self.kup.depo_stok.columns)}")
+        try:
+            depo_tekil = depo_tablosu_hazirla(self.kup.depo_stok, varsayilan_depo=1, tekrar_eden='son')
+        except ValueError as e:
+            print(f"   ❌ [Motor] {e}!")
+            return None
+        print(f"   [Motor] Depo stok dict: {len(depo_tekil)} ürün×depo")
+        return depo_tekil
+    
+    def _sonuc_kolonlari(self, result: pd.DataFrame) -> pd.DataFrame:
+        """Dağıtım sonucundan rapor kolonlarını seç"""
         output_cols = [
             'magaza_kod', 'urun_kod', 'depo_kod',
             'stok', 'yol', 'satis', 'ihtiyac', 'ihtiyac_turu',
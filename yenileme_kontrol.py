@@ -0,0 +1,131 @@
+"""
+ARTIMLI YENİLEME KONTROLÜ
+=========================
+KupVeri.yenile() sonrası küpün, aynı klasörün sıfırdan yüklenmesiyle birebir
+aynı olduğunu kontrol eder (kolonlar, sıra, tipler, değerler).
+
+Küçük, sabit tohumlu bir veri klasörü üzerinde master dosyalar sırayla düzenlenir:
+kolon silme/ekleme (şema değişimi → baştan kurulum) ve sadece değer
+değişimi (kısmi yenileme). Her adımda yenile() sonucu, ayrı snapshot
+klasörüyle açılan yeni bir KupVeri ile karşılaştırılır.
+
+Kullanım:
+    python yenileme_kontrol.py
+"""
+
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from agent_tools import KupVeri
+
+
+ILLER = {'İSTANBUL': 'MARMARA', 'BURSA': 'MARMARA', 'ANKARA': 'İÇ ANADOLU', 'İZMİR': 'EGE', 'ANTALYA': 'AKDENİZ'}
+
+
+def ornek_veri_yaz(klasor: str, magaza: int = 20, urun: int = 300, parca: int = 3, tohum: int = 0):
+    """Küçük veri klasörü yaz: parçalı anlik_stok_satis + urun/magaza master, depo_stok, kpi"""
+    rng = np.random.default_rng(tohum)
+    os.makedirs(klasor, exist_ok=True)
+
+    mg_kodlari = np.arange(1000, 1024)
+    urun_kod = np.arange(1000000, 1000000 + urun)
+    urun_mg = rng.choice(mg_kodlari, urun)
+    kategori = 11 + (urun_mg - 1000) % 4
+    pd.DataFrame({
+        'urun_kod': urun_kod, 'kategori_kod': kategori, 'umg': kategori * 10 + (urun_mg - 1000) % 3,
+        'mg': urun_mg, 'marka_kod': rng.integers(1, 8, urun),
+        'nitelik': rng.choice(['A', 'B', 'C'], urun), 'durum': 'AKTIF',
+    }).to_csv(os.path.join(klasor, 'urun_master.csv'), index=False)
+
+    magaza_kod = np.arange(1000, 1000 + magaza)
+    iller = rng.choice(list(ILLER), magaza)
+    pd.DataFrame({
+        'magaza_kod': magaza_kod, 'il': iller, 'bolge': [ILLER[il] for il in iller],
+        'tip': rng.choice(['AVM', 'CADDE'], magaza), 'depo_kod': 9001 + rng.integers(0, 2, magaza),
+    }).to_csv(os.path.join(klasor, 'magaza_master.csv'), index=False)
+
+    # Her mağaza ürünlerin ~%40'ını bulundurur; mağazalar parçalara bölünür
+    mi, ui = np.nonzero(rng.random((magaza, urun)) < 0.4)
+    satis = rng.poisson(3, len(mi))
+    ciro = (satis * rng.uniform(50, 250, urun)[ui]).round(2)
+    stok_satis = pd.DataFrame({
+        'magaza_kod': magaza_kod[mi], 'urun_kod': urun_kod[ui], 'stok': rng.poisson(12, len(mi)),
+        'yol': rng.poisson(0.3, len(mi)), 'satis': satis, 'ciro': ciro, 'smm': (ciro * 0.6).round(2),
+    })
+    for p, magazalar in enumerate(np.array_split(magaza_kod, parca)):
+        stok_satis[stok_satis['magaza_kod'].isin(magazalar)].to_csv(
+            os.path.join(klasor, f'anlik_stok_satis_{p}.csv'), index=False)
+
+    pd.DataFrame({
+        'depo_kod': np.repeat([9001, 9002], urun), 'urun_kod': np.tile(urun_kod, 2),
+        'stok': rng.poisson(40, 2 * urun),
+    }).to_csv(os.path.join(klasor, 'depo_stok.csv'), index=False)
+
+    pd.DataFrame({
+        'mg_id': mg_kodlari, 'min_deger': rng.integers(2, 6, len(mg_kodlari)),
+        'max_deger': rng.integers(12, 30, len(mg_kodlari)), 'forward_cover': rng.choice([4, 6, 8], len(mg_kodlari)),
+    }).to_csv(os.path.join(klasor, 'kpi.csv'), index=False)
+
+
+def _csv_duzenle(klasor: str, dosya: str, duzenle):
+    yol = os.path.join(klasor, dosya)
+    df = duzenle(pd.read_csv(yol))
+    df.to_csv(yol, index=False)
+
+
+# (açıklama, dosya, düzenleme) - sırayla, birikerek uygulanır
+DUZENLEMELER = [
+    ("urun_master: nitelik kolonu silindi", 'urun_master.csv', lambda df: df.drop(columns=['nitelik'])),
+    ("kpi: forward_cover kolonu silindi", 'kpi.csv', lambda df: df.drop(columns=['forward_cover'])),
+    ("magaza_master: bölge değerleri değişti", 'magaza_master.csv',
+     lambda df: df.assign(bolge=df['bolge'].where(df.index % 3 > 0, 'YENİ BÖLGE'))),
+    ("urun_master: mg değerleri değişti", 'urun_master.csv',
+     lambda df: df.assign(mg=df['mg'].where(df.index % 5 > 0, df['mg'].iloc[0]))),
+    ("urun_master: nitelik kolonu geri eklendi", 'urun_master.csv', lambda df: df.assign(nitelik='A')),
+    ("kpi: kolon sırası değişti", 'kpi.csv', lambda df: df[df.columns[::-1]]),
+]
+
+
+def kontrol(klasor: str, snapshot_koku: str) -> bool:
+    """Düzenlemeleri uygula, her adımda yenile() ile tam yüklemeyi karşılaştır"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        kup = KupVeri(klasor, snapshot_klasoru=os.path.join(snapshot_koku, 'yenilenen'))
+
+    basarili = True
+    for i, (aciklama, dosya, duzenle) in enumerate(DUZENLEMELER):
+        _csv_duzenle(klasor, dosya, duzenle)
+        with contextlib.redirect_stdout(io.StringIO()):
+            sonuc = kup.yenile()
+            taze = KupVeri(klasor, snapshot_klasoru=os.path.join(snapshot_koku, f'taze_{i}'))
+
+        try:
+            for ad in KupVeri.KUP_TABLOLARI:
+                pd.testing.assert_frame_equal(getattr(kup, ad), getattr(taze, ad), obj=ad)
+            print(f"✅ {aciklama} ({', '.join(sonuc['adimlar'])})")
+        except AssertionError as e:
+            basarili = False
+            print(f"❌ {aciklama} ({', '.join(sonuc['adimlar'])})\n   {str(e).strip()}")
+    return basarili
+
+
+def main():
+    gecici = tempfile.mkdtemp(prefix='yenileme_kontrol_')
+    try:
+        klasor = os.path.join(gecici, 'veri')
+        ornek_veri_yaz(klasor)
+        basarili = kontrol(klasor, gecici)
+    finally:
+        shutil.rmtree(gecici, ignore_errors=True)
+    print("\n✅ yenile() tam yüklemeyle aynı" if basarili else "\n❌ yenile() tam yüklemeden farklı")
+    sys.exit(0 if basarili else 1)
+
+
+if __name__ == "__main__":
+    main()